@@ -0,0 +1,1032 @@
+#!/usr/bin/env python3
+"""
+Benchmarki wydajności WikiScrapera na syntetycznych stronach
+o rozmiarze dużych artykułów Bulbapedii.
+
+Przykład:
+    python3 benchmark.py extraction --sections 200 --repeat 5
+    python3 benchmark.py suite --output wyniki.json --baseline bazowe.json
+"""
+
+import argparse
+import bz2
+import glob
+import json
+import os
+import platform
+import random
+import re
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urljoin, unquote, urlsplit, parse_qs
+
+import requests
+from bs4 import BeautifulSoup
+
+from scraper import WikiScraper
+from word_counter import WordCounter, count_texts_parallel, count_chunks
+from word_store import make_store
+from language_analyzer import LanguageAnalyzer, MODES
+from language_index import LanguageIndex, build_index
+from heavy_hitters import SpaceSaving
+from fetcher import PageFetcher
+from mediawiki_api import MediaWikiAPI
+from wikitext import wiki_links
+from dump_reader import ingest_dump, iter_dump_pages, open_dump
+from crawl_state import CrawlState
+from frontier import PriorityFrontier
+from synthetic_wiki import SyntheticWiki, serve, serve_handler
+from xml.sax.saxutils import escape
+
+WORDS = ("pokemon trainer team rocket battle type evolution move ability "
+         "kanto johto hoenn sinnoh region gym leader badge league champion "
+         "attack defense speed special wild route city town forest cave "
+         "anime manga game generation item berry stone egg shiny legendary "
+         "aleję zażółć gęślą jaźń über café naïve").split()
+
+
+def make_synthetic_page(sections=50, seed=0):
+    """
+    Generuje stronę w układzie MediaWiki: nagłówek ze skryptami,
+    nawigacja i pasek boczny z linkami, treść artykułu (paragrafy, listy,
+    tabele, linki wewnętrzne i do plików) oraz stopka.
+
+    :param sections: liczba sekcji treści (ok. 3 KB HTML na sekcję)
+    :param seed: ziarno generatora liczb losowych
+    :return: HTML jako tekst
+    """
+    rnd = random.Random(seed)
+
+    def sentence(n_words=12):
+        return ' '.join(rnd.choice(WORDS) for _ in range(n_words)).capitalize() + '.'
+
+    def link():
+        title = f"{rnd.choice(WORDS).capitalize()}_{rnd.randint(1, 500)}"
+        return f'<a href="/wiki/{title}" title="{title}">{title.replace("_", " ")}</a>'
+
+    nav = ''.join(f'<li><a href="/wiki/Special:Page{i}">Strona {i}</a></li>'
+                  f'<li>{link()}</li>' for i in range(60))
+    parts = [
+        '<!DOCTYPE html><html><head><title>Synthetic</title>',
+        '<script>var wgConfig = {"a": 1, "b": [1, 2, 3]};</script>',
+        '<style>.mw-body { color: black; }</style></head><body>',
+        f'<div id="mw-navigation"><ul>{nav}</ul></div>',
+        '<div id="content" class="mw-body"><h1>Synthetic</h1>',
+        '<div id="mw-content-text" class="mw-body-content mw-content-ltr"'
+        ' lang="en" dir="ltr"><div class="mw-parser-output">',
+        '<table class="infobox"><tr><td><p>Infobox paragraf</p></td></tr>'
+        f'<tr><th>Typ</th><td>{sentence(3)}</td></tr></table>',
+    ]
+    for i in range(sections):
+        parts.append(f'<h2><span class="mw-headline">{sentence(3)}</span></h2>')
+        for _ in range(3):
+            parts.append(f'<p>{sentence()} {link()} {sentence()} '
+                         f'<b>{sentence(4)}</b> {link()} {sentence(8)}</p>')
+        items = ''.join(f'<li>{link()} – {sentence(6)}</li>' for _ in range(5))
+        parts.append(f'<ul>{items}</ul>')
+        if i % 3 == 0:
+            rows = ''.join(f'<tr><td>{rnd.randint(1, 999)}</td><td>{link()}</td>'
+                           f'<td>{sentence(2)}</td></tr>' for _ in range(8))
+            parts.append('<table class="wikitable"><tr><th>Nr</th><th>Nazwa</th>'
+                         f'<th>Opis</th></tr>{rows}</table>')
+        parts.append(f'<p><a href="/wiki/File:Img{i}.png">plik</a></p>')
+    parts.append('</div></div></div>')
+    sidebar = ''.join(f'<li>{link()}</li>' for _ in range(80))
+    parts.append(f'<div id="mw-panel"><ul>{sidebar}</ul></div>')
+    parts.append('<div id="footer"><p>Stopka strony</p>'
+                 '<a href="/wiki/Bulbapedia:About">O nas</a></div>')
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+
+def make_synthetic_wikitext(sections=50, seed=0):
+    """
+    Generuje źródło (wikitekst) artykułu o tej samej budowie co treść
+    make_synthetic_page: infobox, sekcje z akapitami, listami, tabelami,
+    linkami i plikami – bez elementów stałych strony.
+    """
+    rnd = random.Random(seed)
+
+    def sentence(n_words=12):
+        return ' '.join(rnd.choice(WORDS) for _ in range(n_words)).capitalize() + '.'
+
+    def link():
+        return f"[[{rnd.choice(WORDS).capitalize()} {rnd.randint(1, 500)}]]"
+
+    parts = [f'{{{{Infobox|typ={sentence(3)}}}}}']
+    for i in range(sections):
+        parts.append(f'== {sentence(3)} ==')
+        for _ in range(3):
+            parts.append(f"{sentence()} {link()} {sentence()} "
+                         f"'''{sentence(4)}''' {link()} {sentence(8)}\n")
+        parts.extend(f'* {link()} – {sentence(6)}' for _ in range(5))
+        if i % 3 == 0:
+            rows = ''.join(f'|-\n| {rnd.randint(1, 999)} || {link()}'
+                           f' || {sentence(2)}\n' for _ in range(8))
+            parts.append('{| class="wikitable"\n! Nr !! Nazwa !! Opis\n'
+                         f'{rows}|}}')
+        parts.append(f'[[File:Img{i}.png|thumb|plik]]')
+    return '\n'.join(parts)
+
+
+class SourceHandler(BaseHTTPRequestHandler):
+    """
+    Lokalny serwer wiki dla benchmarku źródeł: /wiki/<tytuł> zwraca
+    pełną stronę HTML, a /w/api.php – wikitekst i linki wielu stron
+    (z limitem linków na odpowiedź, jak w MediaWiki).
+    """
+
+    pages = {}
+    links_per_response = 500
+
+    def _send(self, body, content_type):
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith('/wiki/'):
+            title = unquote(url.path[len('/wiki/'):]).replace('_', ' ')
+            self._send(self.pages[title][0], 'text/html; charset=utf-8')
+            return
+        query = parse_qs(url.query)
+        titles = query['titles'][0].split('|')
+        offset = int(query.get('plcontinue', ['0'])[0])
+        all_links = [(title, link) for title in titles
+                     for link in self.pages[title][2]]
+        end = offset + self.links_per_response
+        pages = {}
+        if offset == 0:
+            pages = {title: {'title': title, 'ns': 0, 'revisions': [
+                {'slots': {'main': {'content': self.pages[title][1]}}}]}
+                for title in titles}
+        for title, link in all_links[offset:end]:
+            page = pages.setdefault(title, {'title': title, 'ns': 0})
+            page.setdefault('links', []).append({'ns': 0, 'title': link})
+        data = {'query': {'pages': list(pages.values())}}
+        if end < len(all_links):
+            data['continue'] = {'plcontinue': str(end), 'continue': '||'}
+        self._send(json.dumps(data), 'application/json')
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_sources(n_pages=100, sections=50):
+    """
+    Porównuje pobieranie n_pages artykułów jako HTML (jedno zapytanie
+    na stronę) i przez api.php (partie po 50 tytułów): liczbę zapytań,
+    bajty treści i czas na artykuł, na lokalnym serwerze.
+
+    :return: słownik {źródło: {'requests', 'bytes', 'time'}} (na artykuł)
+    """
+    titles = [f"Artykuł {i}" for i in range(n_pages)]
+    SourceHandler.pages = {}
+    for i, title in enumerate(titles):
+        wikitext = make_synthetic_wikitext(sections, seed=i)
+        SourceHandler.pages[title] = (make_synthetic_page(sections, seed=i),
+                                      wikitext,
+                                      list(dict.fromkeys(wiki_links(wikitext))))
+    server, base_url = serve_handler(SourceHandler)
+
+    def html_source(fetcher):
+        for title in titles:
+            page = WikiScraper(base_url, title, fetcher=fetcher, parser='lxml')
+            page.get_full_text()
+            page.get_all_links()
+
+    def api_source(fetcher):
+        api = MediaWikiAPI(base_url, fetcher=fetcher)
+        for page in api.fetch_pages(titles).values():
+            ' '.join(body for _, body in page.sections)
+
+    results = {}
+    try:
+        for name, func in (('html', html_source), ('api', api_source)):
+            fetcher = PageFetcher()
+            start = time.perf_counter()
+            func(fetcher)
+            elapsed = time.perf_counter() - start
+            fetcher.close()
+            results[name] = {'requests': fetcher.requests_sent / n_pages,
+                             'bytes': fetcher.bytes_received / n_pages,
+                             'time': elapsed / n_pages}
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def write_synthetic_dump(path, n_pages=2000, sections=10):
+    """
+    Zapisuje zrzut XML MediaWiki (skompresowany bz2, jeśli ścieżka kończy
+    się na .bz2) z n_pages syntetycznymi artykułami.
+
+    :return: rozmiar nieskompresowanego XML w bajtach
+    """
+    opener = bz2.open if path.endswith('.bz2') else open
+    size = 0
+    with opener(path, 'wb') as f:
+        def write(text):
+            nonlocal size
+            data = text.encode('utf-8')
+            size += len(data)
+            f.write(data)
+
+        write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/">'
+              '\n<siteinfo><sitename>Synthetic</sitename></siteinfo>\n')
+        for i in range(n_pages):
+            write(f'<page><title>Artykuł {i}</title><ns>0</ns><revision>'
+                  f'<text xml:space="preserve">'
+                  f'{escape(make_synthetic_wikitext(sections, seed=i))}'
+                  f'</text></revision></page>\n')
+        write('</mediawiki>\n')
+    return size
+
+
+def bench_dump(n_pages=2000, sections=10, max_workers=None):
+    """
+    Mierzy przepustowość wczytywania zrzutu bz2: samo odczytanie
+    i dekompresja pliku, dekompresja z parsowaniem XML oraz pełne
+    zliczanie słów przy różnej liczbie procesów roboczych.
+
+    :return: (rozmiar XML w bajtach, lista krotek (etap, czas w s))
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dump.xml.bz2')
+        xml_size = write_synthetic_dump(path, n_pages, sections)
+
+        def read_only():
+            stream, raw = open_dump(path)
+            with raw, stream:
+                while stream.read(1 << 20):
+                    pass
+
+        def parse_only():
+            stream, raw = open_dump(path)
+            with raw, stream:
+                for _ in iter_dump_pages(stream):
+                    pass
+
+        results = [('dekompresja', _best_of(read_only, 1)),
+                   ('dekompresja + XML', _best_of(parse_only, 1))]
+        for workers in sorted({1, max_workers}):
+            def ingest():
+                wc = WordCounter(json_path=os.path.join(tmp, 'wc.json'),
+                                 flush_every=1 << 30)
+                ingest_dump(path, wc, workers=workers)
+            results.append((f'zliczanie, {workers} proc.',
+                             _best_of(ingest, 1)))
+    return xml_size, results
+
+
+def bench_frontier(n_titles=300000, n_pages=20000, links_per_page=60,
+                   seed=0):
+    """
+    Mierzy koszt obsługi kolejki przeszukiwania (CrawlState.page_done
+    i pobranie następnej strony) dla kolejki FIFO i priorytetowej.
+    Linki losowane są z n_titles tytułów z rozkładem skośnym (jak linki
+    nawigacyjne), więc kolejka rośnie do setek tysięcy pozycji, a wiele
+    linków podnosi priorytet stron już czekających.
+
+    :return: lista krotek (kolejka, czas na stronę w s, długość kolejki)
+    """
+    rng = random.Random(seed)
+    links = [[f"T{int(n_titles * rng.random() ** 2)}"
+              for _ in range(links_per_page)] for _ in range(n_pages)]
+    results = []
+    for name in ('bfs', 'priority'):
+        state = CrawlState(frontier=PriorityFrontier()
+                           if name == 'priority' else None)
+        state.start("Start", 10)
+        start = time.perf_counter()
+        for i in range(n_pages):
+            if not state.frontier:
+                break
+            title, depth = state.frontier[0]
+            state.page_done(title, links[i], depth + 1)
+        elapsed = time.perf_counter() - start
+        results.append((name, elapsed / max(1, state.pages),
+                        len(state.frontier)))
+    return results
+
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      'wiki_scraper.py')
+HEAVY_MODULES = ('requests', 'bs4', 'lxml', 'asyncio', 'numpy', 'pandas',
+                 'matplotlib', 'matplotlib.pyplot', 'wordfreq')
+_NETWORK = ('requests', 'bs4', 'lxml')
+
+# Komendy CLI mierzone przez bench_startup, w kolejności uruchamiania
+# (analiza korzysta z liczników zapisanych przez wcześniejsze komendy).
+# {url} to adres lokalnej wiki, {dir} – katalog roboczy. Budżet: moduły,
+# których komenda nie może importować, i maks. łączny czas importów (s).
+STARTUP_COMMANDS = {
+    'help': (['--help'], HEAVY_MODULES, 0.1),
+    'summary': (['--summary', 'Page 1', '--base-url', '{url}'],
+                ('asyncio', 'numpy', 'pandas', 'matplotlib', 'wordfreq'),
+                0.5),
+    'count-words': (['--count-words', 'Page 1', '--base-url', '{url}'],
+                    ('asyncio', 'numpy', 'pandas', 'matplotlib',
+                     'wordfreq'), 0.5),
+    'count-files': (['--count-files', '{dir}/tekst.txt'],
+                    _NETWORK + ('asyncio', 'numpy', 'pandas', 'matplotlib',
+                                'wordfreq'), 0.1),
+    'analyze': (['--analyze-relative-word-frequency', '--mode', 'article',
+                 '--count', '5'],
+                _NETWORK + ('asyncio', 'matplotlib', 'wordfreq'), 1.0),
+    'analyze-chart': (['--analyze-relative-word-frequency', '--mode',
+                       'article', '--count', '5', '--chart',
+                       '{dir}/wykres.png'],
+                      _NETWORK + ('asyncio', 'matplotlib.pyplot',
+                                  'wordfreq'), 2.0),
+}
+
+
+def measure_startup(argv, cwd, env=None):
+    """
+    Uruchamia wiki_scraper.py z argumentami argv w nowym procesie
+    (python -X importtime) i mierzy koszt importów.
+
+    :return: (łączny czas importów w s – bez modułów wczytywanych przy
+             starcie samego interpretera, czas całego wywołania w s,
+             zbiór zaimportowanych modułów)
+    """
+    def run(args):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-X', 'importtime'] + args,
+                             cwd=cwd, env=env, capture_output=True,
+                             text=True)
+        elapsed = time.perf_counter() - start
+        if out.returncode:
+            raise Exception(f"Błąd wywołania {args}: {out.stderr[-500:]}")
+        entries = []
+        for line in out.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, cumulative, name = line.split('|')
+                if cumulative.strip().isdigit():
+                    entries.append((name, int(cumulative)))
+        return elapsed, entries
+
+    _, base = run(['-c', 'pass'])
+    interpreter = {name.strip() for name, _ in base}
+    wall, entries = run([SCRIPT] + argv)
+    # Moduły najwyższego poziomu mają w dzienniku jedną spację wcięcia
+    imports = sum(us for name, us in entries
+                  if not name.startswith('  ')
+                  and name.strip() not in interpreter) / 1e6
+    return imports, wall, {name.strip() for name, _ in entries}
+
+
+def bench_startup(repeat=3, commands=None):
+    """
+    Mierzy czas startu każdej komendy CLI (STARTUP_COMMANDS) na lokalnej
+    wiki i sprawdza budżet: zakazane moduły i łączny czas importów.
+    Indeks języka jest budowany z małego słownika w katalogu tymczasowym,
+    żeby analiza nie wczytywała wordfreq.
+
+    :param commands: nazwy mierzonych komend (domyślnie wszystkie)
+    :return: lista słowników: name, imports, wall (najlepsze z repeat
+             wywołań, s), heavy (wczytane ciężkie moduły), forbidden
+             (wczytane zakazane moduły), over_budget (czy czas importów
+             przekroczył budżet)
+    """
+    server, base_url = serve(SyntheticWiki(n_pages=20))
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'tekst.txt'), 'w',
+                      encoding='utf-8') as f:
+                f.write("Pikachu is an Electric-type Pokémon. " * 100)
+            env = dict(os.environ, WIKI_SCRAPER_CACHE_DIR=tmp)
+            build_index(LanguageIndex('en', cache_dir=tmp).path,
+                        {'pokemon': 1e-4, 'page': 1e-3, 'is': 1e-2})
+            for name, (argv, forbidden, budget) in STARTUP_COMMANDS.items():
+                if commands is not None and name not in commands:
+                    continue
+                argv = [arg.format(url=base_url, dir=tmp) for arg in argv]
+                best_imports = best_wall = float('inf')
+                for _ in range(repeat):
+                    imports, wall, modules = measure_startup(argv, tmp, env)
+                    best_imports = min(best_imports, imports)
+                    best_wall = min(best_wall, wall)
+                results.append({
+                    'name': name,
+                    'imports': best_imports,
+                    'wall': best_wall,
+                    'budget': budget,
+                    'heavy': [m for m in HEAVY_MODULES if m in modules],
+                    'forbidden': [m for m in forbidden if m in modules],
+                    'over_budget': best_imports > budget,
+                })
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+# Komendy mierzone przez bench_session: nazwa -> linia dla i-tego zapytania
+SESSION_COMMANDS = {
+    'summary': lambda i: f'--summary "Page {i}"',
+    'analyze': lambda i: '--analyze-relative-word-frequency --mode article'
+                         ' --count 10',
+}
+
+
+def bench_session(n_requests=20):
+    """
+    Porównuje średni czas komendy: osobne wywołania CLI, jedno wywołanie
+    --batch (z czasem startu) i zapytania do serwera --serve (po
+    rozgrzewce). Strony pochodzą z lokalnej wiki, a indeks języka
+    z małego słownika w katalogu tymczasowym.
+
+    :return: słownik komenda -> {tryb: czas na komendę w s}
+    """
+    server, base_url = serve(SyntheticWiki(n_pages=n_requests + 1))
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, WIKI_SCRAPER_CACHE_DIR=tmp)
+            build_index(LanguageIndex('en', cache_dir=tmp).path,
+                        {'trainer': 1e-4, 'page': 1e-3, 'city': 1e-2})
+            cmd = [sys.executable, SCRIPT, '--base-url', base_url]
+            subprocess.run(cmd + ['--batch', '-'], cwd=tmp, env=env,
+                           check=True, capture_output=True, text=True,
+                           input='--count-words "Page 0"\n')
+            for name, make_line in SESSION_COMMANDS.items():
+                lines = [make_line(i) for i in range(1, n_requests + 1)]
+                start = time.perf_counter()
+                for line in lines:
+                    subprocess.run(cmd + shlex.split(line), cwd=tmp, env=env,
+                                   check=True, capture_output=True)
+                cli = (time.perf_counter() - start) / n_requests
+
+                start = time.perf_counter()
+                subprocess.run(cmd + ['--batch', '-'], cwd=tmp, env=env,
+                               check=True, capture_output=True, text=True,
+                               input=''.join(line + '\n' for line in lines))
+                batch = (time.perf_counter() - start) / n_requests
+
+                proc = subprocess.Popen(cmd + ['--serve', '0'], cwd=tmp,
+                                        env=env, stderr=subprocess.PIPE,
+                                        text=True)
+                try:
+                    port = re.search(r':(\d+) ', proc.stderr.readline())
+                    url = f"http://127.0.0.1:{port.group(1)}/"
+                    with requests.Session() as http:
+                        http.post(url, data=make_line(0)).raise_for_status()
+                        start = time.perf_counter()
+                        for line in lines:
+                            http.post(url, data=line).raise_for_status()
+                        served = (time.perf_counter() - start) / n_requests
+                finally:
+                    proc.terminate()
+                    proc.wait()
+                results[name] = {'cli': cli, 'batch': batch,
+                                 'serve': served}
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'fixtures')
+
+# Metody WikiScraper mierzone na świeżo sparsowanej stronie
+EXTRACT_METHODS = {
+    'first_paragraph': lambda page: page.get_first_paragraph(),
+    'full_text': lambda page: page.get_full_text(),
+    'all_links': lambda page: page.get_all_links(),
+    'text_chunks': lambda page: sum(1 for _ in page.iter_text_chunks()),
+    'canonical_title': lambda page: page.get_canonical_title(),
+    'table': lambda page: (page.extract_table_data(page.get_table(1))
+                           if page.extract().tables else None),
+}
+
+
+def load_corpus(corpus_dir=FIXTURES_DIR, sections=(20, 100)):
+    """
+    Zbiór stron do benchmarków: zapisane strony HTML z katalogu
+    (domyślnie fixtures/) i syntetyczne strony o rozmiarze artykułów
+    Bulbapedii (ok. 3 KB HTML na sekcję).
+
+    :return: słownik nazwa -> HTML
+    """
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(corpus_dir, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    for n in sections:
+        pages[f'synthetic-{n}'] = make_synthetic_page(n)
+    return pages
+
+
+def _best_of_prepared(func, setup, repeat):
+    """
+    Jak _best_of, ale mierzy func(setup()) – czas przygotowania
+    (np. parsowania strony) nie jest liczony.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _count_and_persist(corpus, kind, directory):
+    """
+    Jedno przejście: zliczenie korpusu w pamięci (z rejestrem
+    artykułów), zapis do nowego magazynu i ponowne wczytanie.
+
+    :param directory: pusty katalog na pliki magazynu
+    :return: (czasy w s: zliczanie, zapis, odczyt; słownik zliczeń)
+    """
+    path = os.path.join(directory, f'counts.{kind}')
+    counter = WordCounter(store=make_store(kind, path), flush_every=1 << 30)
+    start = time.perf_counter()
+    for i, text in enumerate(corpus):
+        counter.update_chunks([text], article=f"Artykuł {i}")
+    counted = time.perf_counter()
+    counter.close()
+    saved = time.perf_counter()
+    make_store(kind, path).load()
+    loaded = time.perf_counter()
+    return ((counted - start, saved - counted, loaded - saved),
+            counter.get_counts())
+
+
+def bench_suite(corpus_dir=FIXTURES_DIR, sections=(20, 100), repeat=5,
+                texts=20, words_per_text=20000, vocab=100000):
+    """
+    Pełny zestaw pomiarów do porównywania wersji: parsowanie stron
+    (bs4 i lxml), każda metoda ekstrakcji, tokenizacja, zliczanie
+    i zapis liczników w każdym magazynie oraz prepare_table w każdym
+    trybie. Każdy wynik to najlepszy czas z repeat powtórzeń – jest
+    najmniej wrażliwy na obciążenie maszyny.
+
+    :return: słownik z metadanymi ('meta') i czasami w sekundach
+             ('results', klucze w stylu 'parse.lxml/synthetic-100')
+    """
+    base_url = "https://bulbapedia.bulbagarden.net"
+    results = {}
+    pages = load_corpus(corpus_dir, sections)
+    for name, html in pages.items():
+        for parser in ('bs4', 'lxml'):
+            def parse(parser=parser):
+                return WikiScraper(base_url, name, html=html, parser=parser)
+            results[f'parse.{parser}/{name}'] = _best_of(parse, repeat)
+            for method, func in EXTRACT_METHODS.items():
+                results[f'extract.{parser}.{method}/{name}'] = (
+                    _best_of_prepared(func, parse, repeat))
+        text = WikiScraper(base_url, name, html=html).get_full_text()
+        results[f'tokenize/{name}'] = _best_of(
+            lambda: count_chunks([text]), repeat)
+
+    corpus = make_synthetic_corpus(texts, words_per_text)
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in ('json', 'sqlite', 'binary'):
+            runs = []
+            for run in range(repeat):
+                directory = os.path.join(tmp, f'{kind}-{run}')
+                os.mkdir(directory)
+                times, counts = _count_and_persist(corpus, kind,
+                                                   directory)
+                runs.append(times)
+                if kind == 'json':
+                    word_counts = counts
+            for i, step in enumerate(('count', 'save', 'load')):
+                results[f'persist.{kind}.{step}'] = min(t[i] for t in runs)
+
+        # Syntetyczny indeks języka o rozkładzie Zipfa
+        rnd = random.Random(1)
+        lang = {f"{rnd.choice(WORDS)}{i}": 1.0 / (i + 1)
+                for i in range(vocab)}
+        lang.update({word: 1.0 / (rank + 2)
+                     for rank, word in enumerate(sorted(word_counts))})
+        index_path = os.path.join(tmp, 'lang.idx')
+        build_index(index_path, lang)
+        index = LanguageIndex(path=index_path)
+        # Nowy analizator w każdym powtórzeniu – bez zapamiętanych tablic
+        for mode in MODES:
+            results[f'prepare_table.{mode}'] = _best_of_prepared(
+                lambda analyzer: analyzer.prepare_table(mode=mode, n=50),
+                lambda: LanguageAnalyzer(word_counts=word_counts,
+                                         index=index),
+                repeat)
+        index.close()
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+            'page_bytes': {name: len(html.encode('utf-8'))
+                           for name, html in pages.items()},
+        },
+        'results': results,
+    }
+
+
+def compare_results(current, baseline, threshold=0.25, min_seconds=1e-3):
+    """
+    Porównuje wyniki z wynikami bazowymi.
+
+    :param current: wynik bench_suite
+    :param baseline: wcześniejszy wynik bench_suite (np. z pliku JSON)
+    :param threshold: dopuszczalny względny wzrost czasu (0.25 = 25%)
+    :param min_seconds: pomiary krótsze w obu wersjach są pomijane
+                        (szum zegara)
+    :return: lista krotek (nazwa, czas bazowy, czas bieżący) dla pomiarów
+             wolniejszych niż baza o więcej niż threshold
+    """
+    regressions = []
+    for name, seconds in sorted(current['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None or max(base, seconds) < min_seconds:
+            continue
+        if seconds > base * (1 + threshold):
+            regressions.append((name, base, seconds))
+    return regressions
+
+
+def legacy_text_and_links(soup, base_url):
+    """
+    Dotychczasowa ścieżka crawlera: osobne przejście po drzewie
+    dla tekstu (find + get_text) i dla linków (find_all('a')).
+    """
+    content_div = soup.find('div', class_=re.compile(r'mw-content-?(ltr|rtl)?'))
+    text = content_div.get_text(separator=' ', strip=True)
+    links = []
+    for a in soup.find_all('a', href=True):
+        href = a['href']
+        if href.startswith('/wiki/') and ':' not in href.split('/wiki/')[1]:
+            full_url = urljoin(base_url, href)
+            links.append(full_url.split('/wiki/')[-1].replace('_', ' '))
+    return text, links
+
+
+def _best_of(func, repeat):
+    """Zwraca najkrótszy czas (s) z repeat wywołań funkcji."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_extraction(sections=200, repeat=5):
+    """
+    Porównuje czas CPU na stronę: dotychczasowe osobne przejścia
+    (tekst + linki) z jednoprzebiegowym WikiScraper.extract(),
+    a także pełną obsługę strony (parsowanie + ekstrakcja) w trybie
+    BeautifulSoup i w szybkim trybie lxml.
+
+    :return: słownik z czasami w sekundach
+    """
+    html = make_synthetic_page(sections)
+    base_url = "https://bulbapedia.bulbagarden.net"
+    scraper = WikiScraper(base_url, "Synthetic", html=html)
+    soup = scraper.soup
+
+    def extract_only():
+        scraper._extract = None
+        scraper.extract()
+
+    def full_page(parser):
+        page = WikiScraper(base_url, "Synthetic", html=html, parser=parser)
+        page.get_full_text()
+        page.get_all_links()
+
+    results = {
+        'html_bytes': len(html.encode('utf-8')),
+        'parse': _best_of(lambda: BeautifulSoup(html, 'lxml'), repeat),
+        'legacy_text_and_links': _best_of(
+            lambda: legacy_text_and_links(soup, base_url), repeat),
+        'extract': _best_of(extract_only, repeat),
+        'page_bs4': _best_of(lambda: full_page('bs4'), repeat),
+        'page_lxml': _best_of(lambda: full_page('lxml'), repeat),
+    }
+    return results
+
+
+def _peak_memory(func):
+    """Zwraca szczytowy przyrost pamięci (w bajtach) podczas wywołania."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_tokenize(sections=1000, repeat=3):
+    """
+    Porównuje zliczanie słów z całego tekstu (get_full_text +
+    count_words_in_text) ze strumieniowym count_words_in_chunks
+    na węzłach tekstowych: czas i szczytowe zużycie pamięci.
+
+    :return: słownik z czasami (s) i szczytami pamięci (bajty)
+    """
+    html = make_synthetic_page(sections)
+    page = WikiScraper("https://bulbapedia.bulbagarden.net", "Synthetic",
+                       html=html, parser='lxml')
+    chunks = list(page.iter_text_chunks())
+    wc = WordCounter.__new__(WordCounter)
+
+    def full():
+        wc.count_words_in_text(' '.join(chunks))
+
+    def streamed():
+        wc.count_words_in_chunks(iter(chunks))
+
+    return {
+        'text_chars': sum(len(c) + 1 for c in chunks),
+        'full_time': _best_of(full, repeat),
+        'stream_time': _best_of(streamed, repeat),
+        'full_peak': _peak_memory(full),
+        'stream_peak': _peak_memory(streamed),
+    }
+
+
+def make_synthetic_corpus(n_texts=200, words_per_text=20000, seed=0):
+    """
+    Generuje korpus tekstów o rozkładzie słów zbliżonym do Zipfa
+    (kilkadziesiąt tysięcy różnych słów).
+    """
+    rnd = random.Random(seed)
+    vocab = [f"{rnd.choice(WORDS)}{chr(97 + i % 26)}{chr(97 + i // 26 % 26)}"
+             f"{chr(97 + i // 676 % 26)}" for i in range(50000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+    return [' '.join(rnd.choices(vocab, weights, k=words_per_text))
+            for _ in range(n_texts)]
+
+
+def bench_parallel(n_texts=200, words_per_text=20000, max_workers=None):
+    """
+    Mierzy skalowanie count_texts_parallel względem liczby procesów
+    (1, 2, 4, ... aż do liczby rdzeni).
+
+    :return: lista krotek (procesy, czas w s, przyspieszenie)
+    """
+    corpus = make_synthetic_corpus(n_texts, words_per_text)
+    max_workers = max_workers or os.cpu_count() or 1
+    counts = sorted({1, max_workers} | {2 ** i for i in range(1, 8)
+                                        if 2 ** i < max_workers})
+    results = []
+    base = None
+    expected = None
+    for workers in counts:
+        start = time.perf_counter()
+        counter = count_texts_parallel(corpus, workers=workers,
+                                       batch_chars=1 << 18)
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = counter
+            base = elapsed
+        elif counter != expected:
+            raise Exception("Wyniki równoległego zliczania się różnią!")
+        results.append((workers, elapsed, base / elapsed))
+    return results
+
+
+def _retained_memory(build):
+    """
+    Zwraca (wynik, pamięć w bajtach zajmowaną przez wynik po zakończeniu
+    budowy – bez obiektów tymczasowych).
+    """
+    tracemalloc.start()
+    try:
+        result = build()
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_approx(n_texts=100, words_per_text=20000, capacities=(100, 1000,
+                                                                  10000),
+                 k=100):
+    """
+    Porównuje dokładny licznik (Counter) z przybliżonym Space-Saving
+    o różnych pojemnościach: pamięć, czas, trafność k najczęstszych
+    słów i faktyczny błąd oszacowań na tle gwarantowanej granicy.
+
+    :return: lista słowników z wynikami (pierwszy dotyczy licznika dokładnego)
+    """
+    wc = WordCounter.__new__(WordCounter)
+    pages = [wc.count_words_in_text(text)
+             for text in make_synthetic_corpus(n_texts, words_per_text)]
+
+    def exact():
+        counter = Counter()
+        for page in pages:
+            counter.update(page)
+        return counter
+
+    truth, memory = _retained_memory(exact)
+    results = [{'name': 'dokładny', 'memory': memory,
+                'time': _best_of(exact, 1), 'recall': 1.0,
+                'max_error': 0, 'bound': 0}]
+    true_top = {word for word, _ in truth.most_common(k)}
+
+    for capacity in capacities:
+        def approx():
+            sketch = SpaceSaving(capacity)
+            for page in pages:
+                sketch.update(page)
+            return sketch
+
+        sketch, memory = _retained_memory(approx)
+        top = sketch.top(k)
+        results.append({
+            'name': f'Space-Saving {capacity}',
+            'memory': memory,
+            'time': _best_of(approx, 1),
+            'recall': len(true_top & {word for word, _, _ in top}) / k,
+            'max_error': max((count - truth[word] for word, count, _ in top),
+                             default=0),
+            'bound': sketch.error_bound,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarki WikiScrapera')
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    extraction = sub.add_parser('extraction',
+                                help='Ekstrakcja tekstu i linków ze strony')
+    extraction.add_argument('--sections', type=int, default=200)
+    extraction.add_argument('--repeat', type=int, default=5)
+
+    tokenize = sub.add_parser('tokenize',
+                              help='Zliczanie słów: cały tekst vs strumień')
+    tokenize.add_argument('--sections', type=int, default=1000)
+    tokenize.add_argument('--repeat', type=int, default=3)
+
+    parallel = sub.add_parser('parallel',
+                              help='Skalowanie zliczania w puli procesów')
+    parallel.add_argument('--texts', type=int, default=200)
+    parallel.add_argument('--words', type=int, default=20000)
+    parallel.add_argument('--max-workers', type=int)
+
+    approx = sub.add_parser('approx',
+                            help='Przybliżone top-k (Space-Saving) vs licznik'
+                                 ' dokładny')
+    approx.add_argument('--texts', type=int, default=100)
+    approx.add_argument('--words', type=int, default=20000)
+    approx.add_argument('--capacities', type=int, nargs='+',
+                        default=[100, 1000, 10000])
+    approx.add_argument('--top', type=int, default=100)
+
+    sources = sub.add_parser('sources',
+                             help='Źródło HTML vs api.php: zapytania i bajty'
+                                  ' na artykuł')
+    sources.add_argument('--pages', type=int, default=100)
+    sources.add_argument('--sections', type=int, default=50)
+
+    dump = sub.add_parser('dump',
+                          help='Przepustowość wczytywania zrzutu XML (bz2)')
+    dump.add_argument('--pages', type=int, default=2000)
+    dump.add_argument('--sections', type=int, default=10)
+    dump.add_argument('--max-workers', type=int)
+
+    frontier = sub.add_parser('frontier',
+                              help='Koszt kolejki FIFO vs priorytetowej'
+                                   ' przy setkach tysięcy tytułów')
+    frontier.add_argument('--titles', type=int, default=300000)
+    frontier.add_argument('--pages', type=int, default=20000)
+    frontier.add_argument('--links', type=int, default=60)
+
+    startup = sub.add_parser('startup',
+                             help='Czas startu i importów każdej komendy'
+                                  ' CLI z budżetem (kod 1 po przekroczeniu)')
+    startup.add_argument('--repeat', type=int, default=3)
+
+    session = sub.add_parser('session',
+                             help='Czas komendy: osobne wywołania CLI vs'
+                                  ' --batch vs serwer --serve')
+    session.add_argument('--requests', type=int, default=20)
+
+    suite = sub.add_parser('suite',
+                           help='Pełny zestaw pomiarów z wynikiem JSON'
+                                ' i sprawdzeniem regresji')
+    suite.add_argument('--corpus', default=FIXTURES_DIR,
+                       help='Katalog zapisanych stron HTML (domyślnie'
+                            ' fixtures/)')
+    suite.add_argument('--sections', type=int, nargs='*', default=[20, 100],
+                       help='Liczba sekcji syntetycznych stron')
+    suite.add_argument('--repeat', type=int, default=5)
+    suite.add_argument('--output', metavar='PLIK',
+                       help='Zapisz wyniki jako JSON')
+    suite.add_argument('--baseline', metavar='PLIK',
+                       help='Porównaj z wcześniejszymi wynikami JSON;'
+                            ' regresja kończy program kodem 1')
+    suite.add_argument('--threshold', type=float, default=0.25,
+                       help='Dopuszczalny względny wzrost czasu'
+                            ' (domyślnie 0.25 = 25%%)')
+
+    args = parser.parse_args()
+    if args.bench == 'extraction':
+        res = bench_extraction(args.sections, args.repeat)
+        print(f"Rozmiar strony: {res['html_bytes'] / 1024:.0f} KB")
+        print(f"Parsowanie BeautifulSoup:      {res['parse'] * 1000:8.1f} ms")
+        print(f"Tekst + linki (osobno):        "
+              f"{res['legacy_text_and_links'] * 1000:8.1f} ms")
+        print(f"extract() (jedno przejście):   {res['extract'] * 1000:8.1f} ms")
+        print(f"Cała strona, parser bs4:       {res['page_bs4'] * 1000:8.1f} ms")
+        print(f"Cała strona, parser lxml:      {res['page_lxml'] * 1000:8.1f} ms")
+    elif args.bench == 'tokenize':
+        res = bench_tokenize(args.sections, args.repeat)
+        print(f"Długość tekstu: {res['text_chars'] / 1e6:.1f} mln znaków")
+        print(f"Cały tekst:   {res['full_time'] * 1000:8.1f} ms, "
+              f"szczyt pamięci {res['full_peak'] / 2 ** 20:6.1f} MB")
+        print(f"Strumień:     {res['stream_time'] * 1000:8.1f} ms, "
+              f"szczyt pamięci {res['stream_peak'] / 2 ** 20:6.1f} MB")
+    elif args.bench == 'parallel':
+        for workers, elapsed, speedup in bench_parallel(
+                args.texts, args.words, args.max_workers):
+            print(f"{workers:3d} procesów: {elapsed:7.2f} s,"
+                  f" przyspieszenie {speedup:4.2f}x")
+    elif args.bench == 'sources':
+        for name, res in bench_sources(args.pages, args.sections).items():
+            print(f"{name:>5}: {res['requests']:6.2f} zapytań,"
+                  f" {res['bytes'] / 1024:7.1f} KB,"
+                  f" {res['time'] * 1000:7.2f} ms na artykuł")
+    elif args.bench == 'dump':
+        xml_size, results = bench_dump(args.pages, args.sections,
+                                       args.max_workers)
+        print(f"Rozmiar XML: {xml_size / 2 ** 20:.1f} MB")
+        for name, elapsed in results:
+            print(f"{name:>22}: {elapsed:6.2f} s,"
+                  f" {xml_size / 2 ** 20 / elapsed:6.1f} MB/s XML")
+    elif args.bench == 'suite':
+        res = bench_suite(args.corpus, args.sections, args.repeat)
+        for name, seconds in sorted(res['results'].items()):
+            print(f"{name:<45} {seconds * 1000:10.3f} ms")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(res, f, indent=2, ensure_ascii=False)
+            print(f"Wyniki zapisane do {args.output}")
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = compare_results(res, baseline, args.threshold)
+            for name, base, seconds in regressions:
+                print(f"REGRESJA {name}: {base * 1000:.3f} ms ->"
+                      f" {seconds * 1000:.3f} ms"
+                      f" (+{seconds / base - 1:.0%})")
+            if regressions:
+                sys.exit(1)
+            print(f"Brak regresji powyżej {args.threshold:.0%}.")
+    elif args.bench == 'startup':
+        results = bench_startup(args.repeat)
+        for res in results:
+            print(f"{res['name']:>14}: importy {res['imports'] * 1000:7.1f} ms,"
+                  f" całość {res['wall'] * 1000:7.1f} ms"
+                  f" [{', '.join(res['heavy'])}]")
+            for module in res['forbidden']:
+                print(f"{'':>16}PRZEKROCZONY BUDŻET: import {module}")
+            if res['over_budget']:
+                print(f"{'':>16}PRZEKROCZONY BUDŻET: importy"
+                      f" {res['imports'] * 1000:.0f} ms >"
+                      f" {res['budget'] * 1000:.0f} ms")
+        if any(res['forbidden'] or res['over_budget'] for res in results):
+            sys.exit(1)
+    elif args.bench == 'session':
+        for name, res in bench_session(args.requests).items():
+            print(f"{name:>8}: CLI {res['cli'] * 1000:7.1f} ms,"
+                  f" --batch {res['batch'] * 1000:7.1f} ms,"
+                  f" --serve {res['serve'] * 1000:7.1f} ms na komendę")
+    elif args.bench == 'frontier':
+        for name, per_page, queued in bench_frontier(args.titles, args.pages,
+                                                      args.links):
+            print(f"{name:>8}: {per_page * 1e6:7.1f} µs na stronę,"
+                  f" w kolejce {queued} tytułów")
+    elif args.bench == 'approx':
+        for res in bench_approx(args.texts, args.words, args.capacities,
+                                args.top):
+            print(f"{res['name']:>20}: {res['memory'] / 2 ** 20:7.2f} MB,"
+                  f" {res['time']:6.2f} s, trafność top-{args.top}"
+                  f" {res['recall']:6.1%}, maks. błąd {res['max_error']}"
+                  f" (granica {res['bound']:.0f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+Zwarty, dokładny słownik zliczeń słów oparty na tablicach.
+
+Słowa są przechowywane w jednym bloku UTF-8 (posortowane bajtowo, więc
+wyszukiwanie jest binarne), a liczby w tablicy int64 – bez obiektów
+Pythona na każde słowo. Plik jest mapowany do pamięci, więc otwarcie
+zajmuje stały czas niezależnie od rozmiaru słownika.
+
+Układ pliku (little-endian):
+    nagłówek    MAGIC, liczba słów n, długość bloku słów
+    counts      int64[n]
+    offsets     uint64[n+1] – początki słów w bloku
+    blob        słowa w kodowaniu UTF-8, posortowane bajtowo
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import ItemsView, MutableMapping, ValuesView
+
+MAGIC = b'WSVOC001'
+HEADER = struct.Struct('<8sQQ')
+
+
+def _native_copy(typecode, view):
+    """Kopia tablicy z pliku (little-endian) w kolejności bajtów maszyny."""
+    arr = array(typecode)
+    arr.frombytes(view.tobytes())
+    arr.byteswap()
+    return arr
+
+
+class _ItemsView(ItemsView):
+    def __iter__(self):
+        return self._mapping._iter_items()
+
+
+class _ValuesView(ValuesView):
+    def __iter__(self):
+        return (count for _, count in self._mapping._iter_items())
+
+
+class CompactCounts(MutableMapping):
+    """
+    Słownik {słowo: liczba} z bazą zmapowaną z pliku i małą nakładką
+    w pamięci na słowa dodane od ostatniego zapisu.
+
+    Liczby słów z bazy są zmieniane w prywatnej kopii mapowania
+    (copy-on-write), więc plik zmienia się dopiero przy save().
+    Przechowywane liczby muszą być dodatnie – słowo z liczbą 0 jest
+    traktowane jak usunięte.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: plik do zmapowania (brak pliku daje pusty słownik)
+        """
+        self.path = path
+        self._mm = None
+        self._n = 0
+        self._live = 0
+        self._new = {}
+        if path is not None and os.path.exists(path):
+            self._map(path)
+
+    def _map(self, path):
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, n, blob_len = HEADER.unpack_from(mm)
+        if magic != MAGIC:
+            mm.close()
+            raise Exception(f"Nieprawidłowy plik słownika: {path}")
+        view = memoryview(mm)
+        pos = HEADER.size
+        self._counts = view[pos:pos + 8 * n].cast('q')
+        pos += 8 * n
+        self._offsets = view[pos:pos + 8 * (n + 1)].cast('Q')
+        self._blob_start = pos + 8 * (n + 1)
+        if sys.byteorder == 'big':
+            self._counts = _native_copy('q', self._counts)
+            self._offsets = _native_copy('Q', self._offsets)
+        self._view = view
+        self._mm = mm
+        self._n = self._live = n
+
+    def _unmap(self):
+        if self._mm is None:
+            return
+        for arr in (self._counts, self._offsets):
+            if isinstance(arr, memoryview):
+                arr.release()
+        self._view.release()
+        self._mm.close()
+        self._mm = None
+        self._n = self._live = 0
+
+    def _word_bytes(self, i):
+        start = self._blob_start
+        return self._mm[start + self._offsets[i]:start + self._offsets[i + 1]]
+
+    def _find(self, word):
+        """Numer słowa w bazie (także usuniętego) lub -1."""
+        if not self._n:
+            return -1
+        target = word.encode('utf-8')
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n and self._word_bytes(lo) == target:
+            return lo
+        return -1
+
+    def __getitem__(self, word):
+        i = self._find(word)
+        if i >= 0:
+            if self._counts[i] > 0:
+                return self._counts[i]
+            raise KeyError(word)
+        return self._new[word]
+
+    def __setitem__(self, word, count):
+        if count <= 0:
+            raise Exception("Liczba wystąpień słowa musi być dodatnia")
+        i = self._find(word)
+        if i < 0:
+            self._new[word] = count
+            return
+        if self._counts[i] <= 0:
+            self._live += 1
+        self._counts[i] = count
+
+    def __delitem__(self, word):
+        i = self._find(word)
+        if i >= 0 and self._counts[i] > 0:
+            self._counts[i] = 0
+            self._live -= 1
+        else:
+            del self._new[word]
+
+    def __len__(self):
+        return self._live + len(self._new)
+
+    def _iter_items(self):
+        if self._n:
+            blob = self._mm[self._blob_start:]
+            offsets = self._offsets
+            counts = self._counts
+            for i in range(self._n):
+                if counts[i] > 0:
+                    yield (blob[offsets[i]:offsets[i + 1]].decode('utf-8'),
+                           counts[i])
+        yield from self._new.items()
+
+    def __iter__(self):
+        return (word for word, _ in self._iter_items())
+
+    def items(self):
+        return _ItemsView(self)
+
+    def values(self):
+        return _ValuesView(self)
+
+    def arrays(self):
+        """
+        Zwraca słowa i liczby jako (lista słów, np.ndarray float64) –
+        dla obliczeń wektorowych (LanguageAnalyzer).
+        """
+        import numpy as np
+        words = []
+        counts = np.empty(len(self))
+        for i, (word, count) in enumerate(self._iter_items()):
+            words.append(word)
+            counts[i] = count
+        return words, counts
+
+    def save(self, path=None):
+        """
+        Zapisuje słownik do pliku (atomowo) i mapuje nowy plik.
+        Jeśli od otwarcia zmieniły się tylko liczby istniejących słów,
+        blok słów jest kopiowany bez przeglądania słowo po słowie.
+
+        :param path: plik docelowy (domyślnie ten, z którego wczytano)
+        """
+        path = path or self.path
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            if self._n and not self._new and self._live == self._n:
+                self._write_counts_only(f)
+            else:
+                self._write_merged(f)
+            f.flush()
+            os.fsync(f.fileno())
+        self._unmap()
+        os.replace(tmp, path)
+        self.path = path
+        self._new = {}
+        self._map(path)
+
+    def _write_counts_only(self, f):
+        counts_end = HEADER.size + 8 * self._n
+        f.write(self._mm[:HEADER.size])
+        counts = self._counts
+        if sys.byteorder == 'big':
+            counts = array('q', counts)
+            counts.byteswap()
+        f.write(counts)
+        f.write(self._mm[counts_end:])
+
+    def _write_merged(self, f):
+        """Scala bazę z nowymi słowami w porządku bajtowym."""
+        new_items = sorted((word.encode('utf-8'), count)
+                           for word, count in self._new.items())
+        counts = array('q')
+        offsets = array('Q', [0])
+        blob = bytearray()
+
+        def emit(word_bytes, count):
+            blob.extend(word_bytes)
+            counts.append(count)
+            offsets.append(len(blob))
+
+        j = 0
+        for i in range(self._n):
+            count = self._counts[i]
+            if count <= 0:
+                continue
+            word_bytes = self._word_bytes(i)
+            while j < len(new_items) and new_items[j][0] < word_bytes:
+                emit(*new_items[j])
+                j += 1
+            emit(word_bytes, count)
+        for word_bytes, count in new_items[j:]:
+            emit(word_bytes, count)
+
+        if sys.byteorder == 'big':
+            counts.byteswap()
+            offsets.byteswap()
+        f.write(HEADER.pack(MAGIC, len(counts), len(blob)))
+        f.write(counts)
+        f.write(offsets)
+        f.write(blob)
+
+    def close(self):
+        """Zwalnia mapowanie pliku (niezapisane zmiany przepadają)."""
+        self._unmap()
+        self._new = {}
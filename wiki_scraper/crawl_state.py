@@ -0,0 +1,270 @@
+"""
+Trwały stan przeszukiwania BFS (--auto-count-words --resume).
+
+Stan to kolejka stron do odwiedzenia (z głębokościami) i zbiór stron już
+odkrytych. Zapisywany jest jako migawka JSON oraz dziennik dopisywany
+na końcu pliku: każda przetworzona strona to jedna linia (tytuł strony
+zdjętej z kolejki i nowe linki). Dziennik jest okresowo zwijany do
+migawki, więc koszt zapisu na stronę jest stały.
+
+Zamiast kolejki FIFO można użyć frontier.PriorityFrontier – wtedy dziennik
+zapisuje też strony, którym nowy link podniósł priorytet.
+"""
+
+import json
+import os
+from collections import deque
+
+import metrics
+from dedup import normalize_title
+from word_store import atomic_write_json, read_json_counts
+
+
+class CrawlState:
+    """
+    Kolejka BFS i zbiór odwiedzonych stron z punktami kontrolnymi.
+
+    Punkt kontrolny najpierw zapisuje liczniki słów (word_counter.flush),
+    a dopiero potem dopisuje do dziennika strony zliczone od poprzedniego
+    punktu – strona oznaczona w dzienniku jako gotowa ma więc na pewno
+    utrwalone liczniki. Strona zliczona, ale nieoznaczona (przerwanie
+    między tymi krokami), zostanie po wznowieniu pobrana ponownie,
+    a rejestr artykułów nie pozwoli policzyć jej drugi raz.
+    """
+
+    def __init__(self, path=None, checkpoint_every=20, visited=None,
+                 frontier=None):
+        """
+        :param path: plik migawki (dziennik to <path>.journal);
+                     None oznacza stan tylko w pamięci
+        :param checkpoint_every: co ile przetworzonych stron zapisywać
+                                 punkt kontrolny
+        :param visited: trwały zbiór odwiedzonych (dedup.VisitedSet)
+                        zamiast zbioru w pamięci; nie trafia do migawki,
+                        bo sam zapisuje się przy punktach kontrolnych
+        :param frontier: kolejka priorytetowa (frontier.PriorityFrontier)
+                         zamiast kolejki FIFO
+        """
+        self.path = path
+        self.journal_path = f"{path}.journal" if path else None
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._priority = frontier
+        self.frontier = deque() if frontier is None else frontier
+        self._visited_store = visited
+        self.visited = set() if visited is None else visited
+        self.pages = 0
+        self.stats = {'links': 0, 'duplicates': 0,
+                      'normalized_duplicates': 0, 'alias_duplicates': 0}
+        self._unsaved = []
+        self._journal_lines = 0
+        self._journal = None
+
+    def start(self, poczatkowa, depth, resume=False):
+        """
+        Przygotowuje stan nowego przeszukiwania albo wczytuje zapisany.
+
+        :param poczatkowa: tytuł artykułu startowego
+        :param depth: maksymalna głębokość
+        :param resume: wczytaj zapisany stan (jeśli istnieje)
+        :return: True, jeśli wznowiono zapisane przeszukiwanie
+        :raises Exception: gdy zapisany stan dotyczy innego przeszukiwania
+        """
+        poczatkowa = normalize_title(poczatkowa)
+        self.start_title = poczatkowa
+        self.depth = depth
+        snapshot = read_json_counts(self.path) if resume and self.path else {}
+        resumed = bool(snapshot)
+        if resumed:
+            if (snapshot['start'], snapshot['depth']) != (poczatkowa, depth):
+                raise Exception(
+                    f"Zapisany stan dotyczy przeszukiwania od"
+                    f" '{snapshot['start']}' z głębokością"
+                    f" {snapshot['depth']}")
+            if self._priority is not None:
+                self.frontier.load(snapshot['frontier'])
+            else:
+                self.frontier = deque(tuple(item[:2])
+                                      for item in snapshot['frontier'])
+            if snapshot['visited'] is not None:
+                self.visited = set(snapshot['visited'])
+            self.pages = snapshot['pages']
+            self._replay()
+        else:
+            if self._priority is not None:
+                self.frontier.clear()
+                self.frontier.append((poczatkowa, 0))
+            else:
+                self.frontier = deque([(poczatkowa, 0)])
+            if self._visited_store is None:
+                self.visited = set()
+            else:
+                self.visited.clear()
+            self.visited.add(poczatkowa)
+            self.pages = 0
+        if self.path:
+            self._compact()
+        return resumed
+
+    def _replay(self):
+        """Odtwarza zmiany z dziennika zapisane po migawce."""
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # urwana ostatnia linia
+                if entry['n'] <= self.pages:
+                    continue
+                self._apply(entry['t'], entry['l'], entry['d'],
+                            entry.get('a'), entry.get('b', ()))
+
+    def _apply(self, title, links, depth, alias=None, bumps=()):
+        if self._priority is not None:
+            if not self.frontier.remove(title):
+                raise Exception(f"Niespójny dziennik przeszukiwania: brak"
+                                f" '{title}' w kolejce")
+        else:
+            head, _ = self.frontier.popleft()
+            if head != title:
+                raise Exception(f"Niespójny dziennik przeszukiwania:"
+                                f" oczekiwano '{head}', zapisano '{title}'")
+        if alias is not None:
+            self.visited.add(alias)
+        for link in links:
+            self.visited.add(link)
+            self.frontier.append((link, depth))
+        for link in bumps:
+            self.frontier.bump(link)
+        self.pages += 1
+
+    def page_done(self, title, links=(), depth=0, canonical=None):
+        """
+        Zdejmuje przetworzoną stronę z początku kolejki i dodaje do niej
+        nieodwiedzone jeszcze linki (po normalizacji tytułów). W kolejce
+        priorytetowej link do strony już czekającej podnosi jej priorytet
+        (raz na stronę źródłową).
+
+        Jeśli strona wskazuje inny tytuł kanoniczny (np. jest
+        przekierowaniem), zliczana jest pod tym tytułem, a gdy był on już
+        odwiedzony, jest duplikatem: nie jest zliczana, a jej linki
+        są pomijane.
+
+        :param title: tytuł przetworzonej strony (początek kolejki)
+        :param links: linki znalezione na stronie
+        :param depth: głębokość, z jaką trafią do kolejki
+        :param canonical: tytuł z <link rel="canonical"> (opcjonalnie)
+        :return: tytuł, pod którym należy zliczyć stronę, lub None
+                 dla duplikatu
+        """
+        article = title
+        alias = None
+        if canonical:
+            canonical = normalize_title(canonical)
+            if canonical and canonical != title:
+                if canonical in self.visited:
+                    self.stats['alias_duplicates'] += 1
+                    article = None
+                    links = ()
+                else:
+                    article = alias = canonical
+
+        new_links = []
+        bumps = []
+        linked = set()
+        for link in links:
+            normalized = normalize_title(link)
+            if not normalized:
+                continue
+            self.stats['links'] += 1
+            if normalized in self.visited:
+                self.stats['duplicates'] += 1
+                if normalized != link:
+                    self.stats['normalized_duplicates'] += 1
+                if self._priority is not None and normalized not in linked:
+                    linked.add(normalized)
+                    bumps.append(normalized)
+                continue
+            self.visited.add(normalized)
+            linked.add(normalized)
+            new_links.append(normalized)
+        self._apply(title, new_links, depth, alias)
+        metrics.count('crawl.pages')
+        metrics.count('crawl.links', len(new_links))
+        # Do dziennika trafiają tylko strony czekające w kopcu – te
+        # odtwarzanie podniesie tak samo
+        bumps = [link for link in bumps if self.frontier.bump(link)]
+        if self.path:
+            entry = {'n': self.pages, 't': title, 'l': new_links, 'd': depth}
+            if alias is not None:
+                entry['a'] = alias
+            if bumps:
+                entry['b'] = bumps
+            self._unsaved.append(entry)
+        return article
+
+    def maybe_checkpoint(self, word_counter):
+        """Zapisuje punkt kontrolny co checkpoint_every stron."""
+        if len(self._unsaved) >= self.checkpoint_every:
+            self.checkpoint(word_counter)
+
+    def checkpoint(self, word_counter):
+        """
+        Utrwala liczniki słów, a potem stan przeszukiwania.
+        Dziennik jest zwijany do migawki, gdy urośnie do rozmiaru
+        porównywalnego z samym stanem.
+        """
+        if not self.path:
+            return
+        word_counter.flush()
+        if not self._unsaved:
+            return
+        self._journal.write(''.join(json.dumps(entry, ensure_ascii=False)
+                                    + '\n' for entry in self._unsaved))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        if self._visited_store is not None:
+            self._visited_store.commit()
+        self._journal_lines += len(self._unsaved)
+        self._unsaved = []
+        if self._journal_lines >= max(1000, len(self.visited)):
+            self._compact()
+
+    def _compact(self):
+        """Zapisuje migawkę i zaczyna pusty dziennik."""
+        atomic_write_json(self.path, {
+            'start': self.start_title,
+            'depth': self.depth,
+            'pages': self.pages,
+            'frontier': (self.frontier.snapshot()
+                         if self._priority is not None
+                         else list(self.frontier)),
+            'visited': (list(self.visited) if self._visited_store is None
+                        else None),
+        })
+        if self._visited_store is not None:
+            self._visited_store.commit()
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, 'w', encoding='utf-8')
+        self._journal_lines = 0
+
+    def close(self, word_counter):
+        """Zapisuje ostatni punkt kontrolny i zamyka dziennik."""
+        self.checkpoint(word_counter)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def summary(self):
+        """Opis liczników duplikatów do wypisania po przeszukiwaniu."""
+        text = (f"Linki: {self.stats['links']}, pominięte duplikaty:"
+                f" {self.stats['duplicates']} (w tym"
+                f" {self.stats['normalized_duplicates']} wykrytych dzięki"
+                f" normalizacji tytułów), przekierowania do odwiedzonych"
+                f" stron: {self.stats['alias_duplicates']}")
+        false_positives = getattr(self.visited, 'false_positives', None)
+        if false_positives is not None:
+            text += f", fałszywe trafienia filtru Blooma: {false_positives}"
+        return text
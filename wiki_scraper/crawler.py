@@ -0,0 +1,439 @@
+"""
+Asynchroniczny silnik przechodzenia po linkach (BFS) dla --auto-count-words.
+
+Strona przechodzi przez potok trzech etapów:
+    pobieranie (wątki, I/O) -> parsowanie i zliczanie słów (pula procesów
+    lub wątków) -> zapis (jeden zapisujący w pętli głównej).
+Każdy etap ma ograniczoną liczbę miejsc, a okno pobierania ogranicza
+liczbę stron w całym potoku, więc zużycie pamięci jest stałe.
+"""
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from crawl_state import CrawlState
+from dedup import normalize_title
+from fetcher import get_default_fetcher
+from mediawiki_api import ApiScraper
+from scraper import WikiScraper, build_page_url
+from word_counter import count_chunks, hash_chunks
+
+
+def _summarize(scraper, fraza, need_links, known_hash):
+    # Z linkami tekst pochodzi z tego samego przejścia (extract()),
+    # bez nich tekst regionu treści jest czytany strumieniowo
+    links = scraper.get_all_links() if need_links else []
+    chunks = list(scraper.iter_text_chunks())
+    content_hash = hash_chunks(chunks)
+    canonical = scraper.get_canonical_title()
+    alias = normalize_title(canonical) if canonical else None
+    if content_hash == known_hash and alias in (None, '', fraza):
+        counts = None
+    else:
+        counts = dict(count_chunks(chunks))
+    return content_hash, counts, links, canonical
+
+
+def parse_page(base_url, fraza, html, parser, need_links, known_hash=None):
+    """
+    Parsuje pobraną stronę i zlicza jej słowa (funkcja modułu, więc może
+    działać w procesie roboczym – do procesu głównego wracają tylko
+    zliczenia, a nie tekst).
+
+    :param known_hash: skrót treści strony z rejestru artykułów; gdy
+                       strona się nie zmieniła (i nie jest przekierowaniem),
+                       słowa nie są zliczane
+    :return: krotka (skrót treści, {słowo: liczba} lub None dla
+             niezmienionej strony, linki, tytuł kanoniczny)
+    """
+    return _summarize(WikiScraper(base_url, fraza, html=html, parser=parser),
+                      fraza, need_links, known_hash)
+
+
+def parse_api_page(fraza, page, need_links, known_hash=None):
+    """Jak parse_page, ale dla artykułu pobranego przez API (ApiPage)."""
+    return _summarize(ApiScraper(None, fraza, page=page), fraza, need_links,
+                      known_hash)
+
+
+class StageStats:
+    """
+    Statystyki etapu potoku: liczba obsłużonych elementów, łączny czas
+    pracy oraz długość kolejki (maksymalna i średnia ważona czasem).
+    Elementy porzucone w kolejce (przeszukiwanie przerwane budżetem)
+    są liczone osobno.
+    """
+
+    def __init__(self):
+        self.items = 0
+        self.dropped = 0
+        self.busy = 0.0
+        self.waiting = 0
+        self.max_waiting = 0
+        self._area = 0.0
+        self._last = None
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self._last is not None:
+            self._area += self.waiting * (now - self._last)
+        self._last = now
+
+    def enqueue(self):
+        """Element czeka na wolne miejsce w etapie."""
+        self._tick()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def dequeue(self):
+        """Element zaczyna być obsługiwany."""
+        self._tick()
+        self.waiting -= 1
+
+    def drop(self):
+        """Element opuszcza kolejkę bez obsługi."""
+        self._tick()
+        self.waiting -= 1
+        self.dropped += 1
+
+    def record(self, seconds):
+        """Element został obsłużony w podanym czasie."""
+        self.items += 1
+        self.busy += seconds
+
+    def mean_waiting(self, elapsed):
+        return self._area / elapsed if elapsed > 0 else 0.0
+
+
+class PipelineStats:
+    """Statystyki etapów fetch, parse i write jednego przeszukiwania."""
+
+    STAGES = ('fetch', 'parse', 'write')
+
+    def __init__(self):
+        self.stages = {name: StageStats() for name in self.STAGES}
+        self.started = None
+        self.elapsed = 0.0
+
+    def begin(self):
+        self.started = time.perf_counter()
+
+    def end(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def report(self, workers):
+        """
+        Opis etapów do wypisania po przeszukiwaniu.
+
+        :param workers: {etap: liczba wykonawców} – do wyliczenia
+                        wykorzystania etapu
+        """
+        lines = []
+        elapsed = self.elapsed or 1e-9
+        for name in self.STAGES:
+            stage = self.stages[name]
+            busy = stage.busy / (elapsed * workers.get(name, 1))
+            lines.append(
+                f"{name:>5}: {stage.items} el."
+                f" ({stage.items / elapsed:.1f}/s), śr. czas"
+                f" {stage.busy / max(stage.items, 1) * 1000:.1f} ms,"
+                f" wykorzystanie {busy:.0%}, kolejka śr."
+                f" {stage.mean_waiting(elapsed):.1f}"
+                f" / maks. {stage.max_waiting}"
+                + (f", porzucone {stage.dropped}" if stage.dropped else ""))
+        return '\n'.join(lines)
+
+
+class HostBudget:
+    """
+    Limit zapytań na host: maksymalna liczba zapytań w locie
+    oraz minimalny odstęp między rozpoczęciem kolejnych zapytań.
+    Zastępuje globalne time.sleep(wait) po każdej stronie.
+    """
+
+    def __init__(self, max_in_flight=4, min_interval=0.0):
+        """
+        :param max_in_flight: maks. liczba równoczesnych zapytań do jednego hosta
+        :param min_interval: minimalny odstęp (w sekundach) między zapytaniami
+                             do jednego hosta
+        """
+        self.max_in_flight = max_in_flight
+        self.min_interval = min_interval
+        self._semaphores = {}
+        self._locks = {}
+        self._next_start = {}
+
+    async def acquire(self, host):
+        """Czeka, aż budżet hosta pozwoli wysłać kolejne zapytanie."""
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_in_flight)
+            self._locks[host] = asyncio.Lock()
+            self._next_start[host] = 0.0
+        await self._semaphores[host].acquire()
+        if self.min_interval > 0:
+            loop = asyncio.get_running_loop()
+            async with self._locks[host]:
+                now = loop.time()
+                start = max(now, self._next_start[host])
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                await asyncio.sleep(start - now)
+
+    def release(self, host):
+        """Zwalnia miejsce w budżecie hosta."""
+        self._semaphores[host].release()
+
+
+class AsyncCrawler:
+    """
+    Przechodzi po linkach wszerz (BFS), pobierając wiele stron naraz.
+    Parsowanie i zliczanie słów może odbywać się w puli procesów,
+    a liczniki i stan aktualizuje wyłącznie pętla główna.
+
+    Kolejność przetwarzania, limit głębokości i zbiór odwiedzonych stron
+    są takie same jak w wersji sekwencyjnej: strony z kolejki są pobierane
+    z wyprzedzeniem (w oknie), ale wyniki są konsumowane ściśle w kolejności
+    kolejki, więc nowe linki trafiają do niej w tym samym porządku.
+    Z kolejką priorytetową (frontier.PriorityFrontier) kolejność stron
+    w oknie ustala się w chwili ich pobrania, więc nowe linki zmieniają
+    dopiero kolejność stron spoza okna.
+    """
+
+    def __init__(self, base_url, word_counter, concurrency=8,
+                 per_host=None, min_interval=0.0, window=None,
+                 fetcher=None, parser='bs4', api=None, processes=0,
+                 history=1000):
+        """
+        :param base_url: bazowy adres wiki
+        :param word_counter: obiekt WordCounter aktualizowany po każdej stronie
+        :param concurrency: maks. liczba pobieranych równocześnie stron
+        :param per_host: maks. liczba zapytań w locie do jednego hosta
+                         (domyślnie równa concurrency)
+        :param min_interval: minimalny odstęp między zapytaniami do hosta
+        :param window: ile stron z kolejki pobierać z wyprzedzeniem
+                       (domyślnie 4 * concurrency, a ze źródłem API
+                       co najmniej dwie partie tytułów)
+        :param fetcher: współdzielony PageFetcher (opcjonalnie)
+        :param parser: parser stron ('bs4' lub szybki 'lxml')
+        :param api: MediaWikiAPI – strony są wtedy pobierane przez api.php
+                    partiami po api.batch_size tytułów zamiast jako HTML
+        :param processes: liczba procesów parsujących strony i zliczających
+                          słowa (0 – parsowanie w wątkach, jak pobieranie)
+        :param history: ile ostatnich przetworzonych tytułów zwraca crawl()
+        """
+        self.base_url = base_url
+        self.word_counter = word_counter
+        self.concurrency = max(1, concurrency)
+        self.budget = HostBudget(per_host or self.concurrency, min_interval)
+        self.api = api
+        self.window = window or 4 * self.concurrency
+        if api is not None and window is None:
+            self.window = max(self.window, 2 * api.batch_size)
+        self.host = urlparse(base_url).netloc
+        self.fetcher = fetcher
+        self.parser = parser
+        self.processes = processes
+        self.history = history
+        self.stats = PipelineStats()
+
+    def _fetch_html(self, fraza):
+        """Pobiera HTML strony (etap pobierania, w wątku roboczym)."""
+        fetcher = self.fetcher or get_default_fetcher()
+        return fetcher.fetch_html(build_page_url(self.base_url, fraza), fraza)
+
+    async def _run_stage(self, name, executor, limit, func, *args,
+                         host=None):
+        """
+        Wywołuje func w executorze jako etap potoku: czeka na miejsce
+        (limit, a dla pobierania także budżet hosta) i zapisuje statystyki.
+        """
+        stage = self.stats.stages[name]
+        stage.enqueue()
+        queued = True
+        try:
+            async with limit:
+                if host is not None:
+                    await self.budget.acquire(host)
+                stage.dequeue()
+                queued = False
+                loop = asyncio.get_running_loop()
+                start = time.perf_counter()
+                try:
+                    return await loop.run_in_executor(executor, func, *args)
+                finally:
+                    stage.record(time.perf_counter() - start)
+                    if host is not None:
+                        self.budget.release(host)
+        finally:
+            # Zadanie anulowane w kolejce (przerwane przeszukiwanie)
+            if queued:
+                stage.drop()
+
+    async def _page(self, pools, fraza, need_links, known_hash):
+        """Pobiera stronę jako HTML i parsuje ją w puli parsowania."""
+        html = await self._run_stage(
+            'fetch', pools['fetch'], pools['fetch_limit'], self._fetch_html,
+            fraza, host=self.host)
+        result = await self._run_stage(
+            'parse', pools['parse'], pools['parse_limit'], parse_page,
+            self.base_url, fraza, html, self.parser, need_links, known_hash)
+        self.stats.stages['write'].enqueue()
+        return result
+
+    async def _from_batch(self, pools, batch, fraza, need_links, known_hash):
+        """Wynik dla jednej strony z partii pobranej przez API."""
+        pages = await batch
+        result = await self._run_stage(
+            'parse', pools['parse'], pools['parse_limit'], parse_api_page,
+            fraza, pages[fraza], need_links, known_hash)
+        self.stats.stages['write'].enqueue()
+        return result
+
+    async def _crawl(self, state, depth, budget=None):
+        # Kolejka to state.frontier: strony w oknie pobierania zostają w niej,
+        # dopóki nie zostaną przetworzone, więc punkt kontrolny jej nie gubi.
+        # Okno obejmuje zawsze len(pending) pierwszych pozycji kolejki
+        # i ogranicza liczbę stron (i ich HTML) w całym potoku.
+        frontier = state.frontier
+        pending = deque()
+        processed = deque(maxlen=self.history)
+        write = self.stats.stages['write']
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as fetch_pool, \
+                self._parse_executor() as parse_pool:
+            # Dla procesów dwa zadania na proces – jedno liczone, jedno
+            # gotowe do wysłania; reszta stron czeka z pobranym HTML
+            parse_slots = (2 * self.processes if self.processes
+                           else self.concurrency)
+            pools = {
+                'fetch': fetch_pool,
+                'fetch_limit': asyncio.Semaphore(self.concurrency),
+                'parse': parse_pool,
+                'parse_limit': asyncio.Semaphore(parse_slots),
+            }
+
+            def window_size():
+                # Z limitem stron nie pobieramy stron ponad limit
+                remaining = (budget.remaining_pages()
+                             if budget is not None else None)
+                if remaining is None:
+                    return self.window
+                return min(self.window, remaining)
+
+            def fill_window():
+                if self.api is not None:
+                    fill_window_batched()
+                    return
+                window = window_size()
+                while (len(pending) < len(frontier)
+                       and len(pending) < window):
+                    fraza, curr_depth = frontier[len(pending)]
+                    # Skrót z rejestru pozwala procesowi roboczemu pominąć
+                    # zliczanie niezmienionej strony
+                    task = asyncio.ensure_future(self._page(
+                        pools, fraza, curr_depth < depth,
+                        self.word_counter.article_hash(fraza)))
+                    pending.append((fraza, curr_depth, task))
+
+            def fill_window_batched():
+                # Niepełną partię wysyłamy dopiero, gdy nic nie czeka
+                # na wynik – do tego czasu kolejka może się wydłużyć
+                size = self.api.batch_size
+                start = len(pending)
+                end = min(len(frontier), window_size())
+                if end - start < size and pending:
+                    return
+                for first in range(start, end, size):
+                    items = [frontier[i]
+                             for i in range(first, min(end, first + size))]
+                    batch = asyncio.ensure_future(self._run_stage(
+                        'fetch', fetch_pool, pools['fetch_limit'],
+                        self.api.fetch_pages, [fraza for fraza, _ in items],
+                        host=self.host))
+                    for fraza, curr_depth in items:
+                        task = asyncio.ensure_future(self._from_batch(
+                            pools, batch, fraza, curr_depth < depth,
+                            self.word_counter.article_hash(fraza)))
+                        pending.append((fraza, curr_depth, task))
+
+            self.stats.begin()
+            fill_window()
+            while pending:
+                if budget is not None and budget.exhausted():
+                    # Strony z okna zostają w kolejce (do wznowienia)
+                    for _, _, task in pending:
+                        task.cancel()
+                    await asyncio.gather(*(task for _, _, task in pending),
+                                         return_exceptions=True)
+                    # Strony już sparsowane czekały na zapis – nie zostaną
+                    # zapisane, więc opuszczają kolejkę etapu zapisu
+                    for _, _, task in pending:
+                        if not task.cancelled() and task.exception() is None:
+                            write.drop()
+                    break
+                fraza, curr_depth, task = pending.popleft()
+                print(f"Przetwarzanie: {fraza} (głębokość {curr_depth})")
+                try:
+                    content_hash, counts, links, canonical = await task
+                except Exception as e:
+                    print(f"Błąd dla {fraza}: {e}")
+                    state.page_done(fraza)
+                    if budget is not None:
+                        budget.page_done()
+                    fill_window()
+                    continue
+
+                # Jedyny zapisujący: liczniki zmienia tylko ta pętla
+                write.dequeue()
+                start = time.perf_counter()
+                article = state.page_done(fraza, links, curr_depth + 1,
+                                          canonical=canonical)
+                if article is not None:
+                    self.word_counter.update_counted(
+                        counts, article=article, content_hash=content_hash)
+                    processed.append(fraza)
+                state.maybe_checkpoint(self.word_counter)
+                if budget is not None:
+                    budget.page_done()
+                write.record(time.perf_counter() - start)
+                fill_window()
+            self.stats.end()
+
+        reason = budget.exhausted() if budget is not None else None
+        if reason and frontier:
+            print(f"Zatrzymano przeszukiwanie: {reason}.")
+
+        return list(processed)
+
+    def _parse_executor(self):
+        """Pula parsowania: procesy (processes > 0) albo wątki."""
+        if self.processes:
+            return ProcessPoolExecutor(max_workers=self.processes)
+        return ThreadPoolExecutor(max_workers=self.concurrency)
+
+    def crawl(self, poczatkowa, depth, state=None, budget=None):
+        """
+        Uruchamia przechodzenie od strony początkowej.
+
+        :param poczatkowa: tytuł artykułu startowego
+        :param depth: maksymalna głębokość
+        :param state: CrawlState po start() (np. wczytany przy wznawianiu);
+                      domyślnie nowy stan w pamięci
+        :param budget: frontier.CrawlBudget – limit stron i czasu
+        :return: lista tytułów ostatnich (najwyżej history) przetworzonych
+                 stron, w kolejności kolejki
+        """
+        if state is None:
+            state = CrawlState()
+            state.start(poczatkowa, depth)
+        return asyncio.run(self._crawl(state, depth, budget))
+
+    def stats_report(self):
+        """Statystyki etapów potoku z ostatniego przeszukiwania."""
+        return self.stats.report({
+            'fetch': self.concurrency,
+            'parse': self.processes or self.concurrency,
+        })
@@ -0,0 +1,130 @@
+"""
+Wykrywanie duplikatów stron przy przeszukiwaniu: normalizacja tytułów
+i zbiór odwiedzonych stron o ograniczonej pamięci (filtr Blooma
+z dokładnym sprawdzeniem w SQLite).
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+from urllib.parse import unquote
+
+SPACES_RE = re.compile(r'[\s_]+')
+
+
+def normalize_title(title):
+    """
+    Sprowadza tytuł artykułu do postaci kanonicznej, jak robi to MediaWiki:
+    usuwa fragment (#Sekcja), dekoduje %XX, zamienia podkreślenia
+    na spacje, scala białe znaki i zmienia pierwszą literę na wielką.
+
+    :param title: tytuł lub ścieżka z linku
+    :return: tytuł kanoniczny ('' dla linku do sekcji tej samej strony)
+    """
+    title = title.split('#', 1)[0]
+    title = unquote(title)
+    title = SPACES_RE.sub(' ', title).strip()
+    return title[:1].upper() + title[1:]
+
+
+class BloomFilter:
+    """
+    Filtr Blooma: zbiór bez fałszywych odpowiedzi negatywnych
+    i z ograniczonym odsetkiem fałszywych pozytywnych, w stałej pamięci.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        :param capacity: spodziewana liczba elementów
+        :param error_rate: docelowy odsetek fałszywych pozytywnych
+        """
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate)
+                                     / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7))
+                   for pos in self._positions(item))
+
+
+class VisitedSet:
+    """
+    Zbiór odwiedzonych tytułów dla bardzo dużych przeszukiwań.
+
+    W pamięci trzymany jest tylko filtr Blooma; pełna lista tytułów leży
+    w tabeli SQLite na dysku i jest sprawdzana wyłącznie wtedy, gdy filtr
+    odpowie „może być” – fałszywe pozytywy nie gubią więc stron.
+    Zmiany są zatwierdzane przy commit() (punkt kontrolny przeszukiwania),
+    a filtr jest odbudowywany z bazy przy otwarciu.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001, path=None):
+        """
+        :param capacity: spodziewana liczba stron
+        :param error_rate: odsetek fałszywych pozytywnych filtru Blooma
+        :param path: plik bazy (None – tymczasowa baza na dysku)
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.conn = sqlite3.connect(path or '')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS visited ('
+                          'title TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.conn.commit()
+        self.false_positives = 0
+        self._load()
+
+    def _load(self):
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        self._len = 0
+        for (title,) in self.conn.execute('SELECT title FROM visited'):
+            self.bloom.add(title)
+            self._len += 1
+
+    def __contains__(self, title):
+        if title not in self.bloom:
+            return False
+        row = self.conn.execute('SELECT 1 FROM visited WHERE title = ?',
+                                (title,)).fetchone()
+        if row is None:
+            self.false_positives += 1
+            return False
+        return True
+
+    def add(self, title):
+        # Przynależność sprawdza wołający (title in visited) – tu tylko
+        # wstawienie, bez drugiego zapytania i liczenia fałszywych pozytywów
+        self.bloom.add(title)
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO visited(title) VALUES (?)', (title,))
+        self._len += cursor.rowcount
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        """Usuwa wszystkie tytuły (nowe przeszukiwanie)."""
+        self.conn.execute('DELETE FROM visited')
+        self.conn.commit()
+        self._load()
+
+    def commit(self):
+        """Utrwala dodane tytuły."""
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
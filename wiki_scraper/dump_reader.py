@@ -0,0 +1,123 @@
+"""
+Strumieniowe wczytywanie zrzutów XML MediaWiki (Special:Export,
+pages-articles.xml[.bz2|.gz]) i zliczanie słów bez pobierania stron.
+
+Plik jest czytany przyrostowo (iterparse), a każdy element <page> jest
+usuwany z drzewa zaraz po odczytaniu, więc zużycie pamięci nie zależy
+od rozmiaru zrzutu. Zamiana wikitekstu na tekst i tokenizacja mogą
+odbywać się w procesach roboczych – proces główny tylko dekompresuje
+i parsuje XML.
+"""
+
+import bz2
+import gzip
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+from wikitext import strip_wikitext
+from word_counter import iter_counts_parallel
+
+
+def open_dump(path):
+    """
+    Otwiera zrzut do odczytu binarnego (z dekompresją według
+    rozszerzenia .bz2 / .gz).
+
+    :return: krotka (strumień zdekompresowany, surowy plik) – pozycja
+             surowego pliku to liczba przeczytanych bajtów z dysku
+    """
+    raw = open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.BZ2File(raw), raw
+    if path.endswith('.gz'):
+        return gzip.GzipFile(fileobj=raw), raw
+    return raw, raw
+
+
+def iter_dump_pages(stream, namespaces=(0,), skip_redirects=True,
+                    stats=None):
+    """
+    Zwraca kolejne strony zrzutu.
+
+    :param stream: strumień binarny z XML zrzutu
+    :param namespaces: numery przestrzeni nazw do zwrócenia
+                       (None – wszystkie)
+    :param skip_redirects: czy pomijać przekierowania
+    :param stats: słownik, w którym zliczane są strony ('pages')
+                  i pominięte strony ('skipped')
+    :return: generator krotek (tytuł, wikitekst ostatniej wersji)
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault('pages', 0)
+    stats.setdefault('skipped', 0)
+    context = iter(ET.iterparse(stream, events=('start', 'end')))
+    _, root = next(context)
+    # Znaczniki mają przestrzeń nazw schematu eksportu, np.
+    # {http://www.mediawiki.org/xml/export-0.11/}page
+    prefix = root.tag[:root.tag.index('}') + 1] if '}' in root.tag else ''
+    page_tag = prefix + 'page'
+    title_tag, ns_tag = prefix + 'title', prefix + 'ns'
+    redirect_tag, text_tag = prefix + 'redirect', prefix + 'text'
+
+    for event, elem in context:
+        if event != 'end' or elem.tag != page_tag:
+            continue
+        ns = elem.findtext(ns_tag)
+        if ((namespaces is not None and int(ns or 0) not in namespaces)
+                or (skip_redirects and elem.find(redirect_tag) is not None)):
+            stats['skipped'] += 1
+        else:
+            text = None
+            for text_elem in elem.iter(text_tag):
+                text = text_elem.text
+            stats['pages'] += 1
+            yield elem.findtext(title_tag), text or ''
+        # Usuwamy przetworzoną stronę (i puste elementy potomne korzenia)
+        root.clear()
+
+
+def ingest_dump(path, word_counter, workers=1, batch_chars=1 << 22,
+                namespaces=(0,), flush_batches=64):
+    """
+    Zlicza słowa ze wszystkich artykułów zrzutu i dodaje je do licznika.
+    Zliczenia paczek są scalane w pamięci, a licznik jest aktualizowany
+    i zapisywany co flush_batches paczek oraz na końcu – przy zapisie
+    pełnego pliku (magazyn json) koszt nie rośnie z każdą paczką.
+
+    Zrzut nie korzysta z rejestru artykułów – ponowne wczytanie tego
+    samego zrzutu doliczy słowa drugi raz.
+
+    :param path: plik zrzutu (.xml, .xml.bz2 lub .xml.gz)
+    :param word_counter: obiekt WordCounter
+    :param workers: liczba procesów zamieniających wikitekst na tekst
+                    i zliczających słowa (1 – w procesie głównym)
+    :param batch_chars: przybliżony rozmiar paczki wikitekstu w znakach
+    :param namespaces: przestrzenie nazw do zliczenia
+    :param flush_batches: co ile paczek zapisywać liczniki (domyślnie
+                          ok. 256 mln znaków wikitekstu)
+    :return: słownik statystyk: pages, skipped, words, bytes (przeczytane
+             z dysku), seconds
+    """
+    start = time.perf_counter()
+    stats = {'words': 0}
+    stream, raw = open_dump(path)
+    with raw, stream:
+        texts = (text for _, text in iter_dump_pages(
+            stream, namespaces=namespaces, stats=stats))
+        merged = Counter()
+        for number, counts in enumerate(iter_counts_parallel(
+                texts, workers=workers, batch_chars=batch_chars,
+                preprocess=strip_wikitext), 1):
+            stats['words'] += sum(counts.values())
+            merged.update(counts)
+            if number % flush_batches == 0:
+                word_counter.update_counts(merged)
+                word_counter.flush()
+                merged = Counter()
+        stats['bytes'] = raw.tell()
+    if merged:
+        word_counter.update_counts(merged)
+    word_counter.flush()
+    stats['seconds'] = time.perf_counter() - start
+    return stats
@@ -0,0 +1,100 @@
+"""
+Szybki parser stron oparty bezpośrednio na lxml.
+
+Drzewo buduje libxml2 (w C), a obiekty Pythona powstają tylko dla tekstu
+regionu treści (div mw-content-ltr/rtl), adresów linków i wskazanych tabel.
+Wyniki są takie same jak przy pełnym drzewie BeautifulSoup.
+"""
+
+import lxml.etree
+import lxml.html
+from bs4 import BeautifulSoup
+
+# Tagi, których tekst BeautifulSoup trzyma w osobnych typach napisów
+# (Script, Stylesheet, TemplateString, ...) i pomija w get_text()
+SKIP_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+
+def parse_html(html):
+    """
+    Parsuje HTML do drzewa lxml.
+
+    :param html: treść HTML (str)
+    :return: korzeń dokumentu (lxml.html.HtmlElement) lub None dla pustego
+             dokumentu
+    """
+    parser = lxml.html.HTMLParser(encoding='utf-8')
+    try:
+        return lxml.html.document_fromstring(html.encode('utf-8'),
+                                             parser=parser)
+    except lxml.etree.ParserError:
+        return None
+
+
+def iter_stripped_strings(element):
+    """
+    Zwraca niepuste, obcięte napisy z poddrzewa w kolejności dokumentu –
+    odpowiednik Tag.stripped_strings z BeautifulSoup (bez komentarzy
+    oraz tekstu skryptów, stylów i szablonów).
+    """
+    skip_depth = 0
+    for event, el in lxml.etree.iterwalk(element, events=('start', 'end')):
+        is_element = isinstance(el.tag, str)
+        if event == 'start':
+            if is_element and el.tag in SKIP_TEXT_TAGS:
+                skip_depth += 1
+            elif is_element and not skip_depth and el.text:
+                stripped = el.text.strip()
+                if stripped:
+                    yield stripped
+        else:
+            if is_element and el.tag in SKIP_TEXT_TAGS:
+                skip_depth -= 1
+            if el is not element and not skip_depth and el.tail:
+                stripped = el.tail.strip()
+                if stripped:
+                    yield stripped
+
+
+def get_text(element):
+    """Odpowiednik Tag.get_text(separator=' ', strip=True)."""
+    return ' '.join(iter_stripped_strings(element))
+
+
+def has_table_ancestor(element):
+    """Czy element leży wewnątrz tabeli."""
+    return any(parent.tag == 'table' for parent in element.iterancestors())
+
+
+def table_to_soup(table):
+    """
+    Zamienia tabelę lxml na obiekt BeautifulSoup (na potrzeby get_table
+    i extract_table_data), parsując tylko jej fragment HTML.
+    """
+    html = lxml.html.tostring(table, encoding='unicode', with_tail=False)
+    soup_table = BeautifulSoup(html, 'lxml').table
+    # Serializer HTML z libxml2 koduje znaki spoza ASCII w atrybutach URI
+    # (np. href) jako %XX – przywracamy oryginalne wartości atrybutów
+    elements = [el for el in table.iter() if isinstance(el.tag, str)]
+    tags = [soup_table] + soup_table.find_all(True)
+    if len(elements) == len(tags):
+        for el, tag in zip(elements, tags):
+            for key, value in el.attrib.items():
+                current = tag.get(key)
+                if isinstance(current, str) and current != value:
+                    tag[key] = value
+    return soup_table
+
+
+def find_content_div(root, is_content_class):
+    """
+    Zwraca pierwszy div z treścią artykułu.
+
+    :param root: korzeń dokumentu lxml
+    :param is_content_class: funkcja przyjmująca listę klas elementu
+    """
+    for div in root.iter('div'):
+        classes = div.get('class')
+        if classes is not None and is_content_class(classes.split()):
+            return div
+    return None
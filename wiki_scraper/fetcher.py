@@ -0,0 +1,202 @@
+"""
+Wspólna warstwa pobierania stron HTTP (pula połączeń keep-alive).
+"""
+
+import email.utils
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+try:
+    import brotli  # noqa: F401 – urllib3 dekoduje 'br', jeśli moduł jest dostępny
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+# Kody odpowiedzi, po których warto ponowić zapytanie
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PageFetcher:
+    """
+    Pobiera strony przez współdzieloną sesję requests.
+    Zapewnia pulę połączeń, kompresję transferu, limity czasu
+    oraz ograniczoną liczbę ponowień z wykładniczym odczekiwaniem.
+    Jeden obiekt powinien być współdzielony przez wszystkie scrapery.
+    """
+
+    def __init__(self, timeout=(5, 30), max_retries=3, backoff=0.5,
+                 max_backoff=60.0, pool_size=16, user_agent=None, cache=None,
+                 rate=None):
+        """
+        :param timeout: limit czasu (połączenie, odczyt) w sekundach
+        :param max_retries: maks. liczba ponowień po 429/5xx lub błędzie sieci
+        :param backoff: bazowe opóźnienie ponowienia (rośnie 2x co próbę)
+        :param max_backoff: górny limit pojedynczego opóźnienia
+        :param pool_size: maks. liczba połączeń utrzymywanych na host
+        :param user_agent: nagłówek User-Agent (opcjonalnie)
+        :param cache: obiekt PageCache (opcjonalnie) – strony są wtedy
+                      zwracane z dysku lub rewalidowane zapytaniem warunkowym
+        :param rate: politeness.RateController (opcjonalnie) – ustala
+                     odstęp przed każdym zapytaniem wysyłanym do sieci
+                     i dostaje czas oraz kod każdej odpowiedzi
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache = cache
+        self.rate = rate
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries = 0
+        # Bajty treści odebranych odpowiedzi (po dekompresji)
+        self.bytes_received = 0
+
+    def _retry_after(self, response):
+        """
+        Zwraca opóźnienie z nagłówka Retry-After (sekundy lub data HTTP)
+        ograniczone do max_backoff albo None, jeśli nagłówka nie ma.
+        """
+        retry_after = response.headers.get('Retry-After')
+        if not retry_after:
+            return None
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                parsed = email.utils.parsedate_to_datetime(retry_after)
+                delay = parsed.timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(delay, 0.0), self.max_backoff)
+
+    def _retry_delay(self, attempt, response=None):
+        """
+        Wylicza opóźnienie przed kolejną próbą.
+        Nagłówek Retry-After (sekundy lub data HTTP) ma pierwszeństwo.
+        """
+        if response is not None:
+            delay = self._retry_after(response)
+            if delay is not None:
+                return delay
+        return min(self.backoff * (2 ** attempt), self.max_backoff)
+
+    def get(self, url, headers=None):
+        """
+        Wysyła zapytanie GET z ponowieniami.
+
+        :param url: adres strony
+        :param headers: dodatkowe nagłówki zapytania
+        :return: obiekt requests.Response (ostatnia odpowiedź)
+        """
+        attempt = 0
+        while True:
+            if self.rate is not None:
+                self.rate.wait()
+            with self._lock:
+                self.requests_sent += 1
+            start = time.monotonic()
+            try:
+                with metrics.stage('fetch'):
+                    response = self.session.get(url, headers=headers,
+                                                timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                metrics.count('fetch.errors')
+                if self.rate is not None:
+                    self.rate.on_response(None, None)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(attempt)
+            else:
+                if self.rate is not None:
+                    self.rate.on_response(time.monotonic() - start,
+                                          response.status_code,
+                                          self._retry_after(response))
+                metrics.count(f"fetch.status.{response.status_code}")
+                if (response.status_code not in RETRY_STATUSES
+                        or attempt >= self.max_retries):
+                    size = len(response.content)
+                    with self._lock:
+                        self.bytes_received += size
+                    metrics.count('fetch.bytes', size)
+                    return response
+                delay = self._retry_delay(attempt, response)
+                response.close()
+            with self._lock:
+                self.retries += 1
+            metrics.count('fetch.retries')
+            # Z kontrolerem tempa ponowienie wstrzymuje rate.wait() (pauza
+            # z Retry-After i zwiększony odstęp) – bez drugiego czekania
+            if self.rate is None:
+                time.sleep(delay)
+            attempt += 1
+
+    def fetch_html(self, url, title=None):
+        """
+        Pobiera HTML strony (z uwzględnieniem cache, jeśli jest ustawiony).
+
+        :param url: adres strony
+        :param title: tytuł artykułu (do komunikatu błędu)
+        :return: treść HTML jako tekst
+        :raises Exception: jeśli artykuł nie istnieje (404) lub w trybie
+                           offline nie ma go w cache
+        """
+        meta = None
+        headers = None
+        if self.cache is not None:
+            meta = self.cache.lookup(url)
+            if meta is not None and self.cache.is_fresh(meta):
+                html = self.cache.read(meta)
+                if html is not None:
+                    metrics.count('cache.hits')
+                    return html
+            if self.cache.offline:
+                raise Exception(f"Artykułu '{title or url}' nie ma w cache"
+                                " (tryb offline).")
+            if meta is not None:
+                headers = self.cache.conditional_headers(meta)
+
+        response = self.get(url, headers=headers)
+        if response.status_code == 304 and meta is not None:
+            html = self.cache.read(meta, revalidated=True)
+            if html is not None:
+                return html
+            response = self.get(url)
+        if response.status_code == 404:
+            raise Exception(f"Artykuł '{title or url}' nie istnieje (404).")
+        response.raise_for_status()
+        if self.cache is not None:
+            self.cache.store(url, response.text,
+                             etag=response.headers.get('ETag'),
+                             last_modified=response.headers.get('Last-Modified'))
+        return response.text
+
+    def close(self):
+        """Zamyka połączenia w puli."""
+        self.session.close()
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_default_fetcher():
+    """Zwraca współdzielony obiekt PageFetcher (tworzony przy pierwszym użyciu)."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = PageFetcher()
+        return _default_fetcher
@@ -0,0 +1,188 @@
+"""
+Kolejka priorytetowa przeszukiwania (--frontier priority) i limity
+przeszukiwania (--max-pages, --max-seconds).
+
+PriorityFrontier zastępuje kolejkę FIFO w CrawlState: najpierw odwiedzane
+są strony pasujące do filtra tytułów, potem te, do których prowadzi
+najwięcej odnalezionych dotąd linków, a przy remisie – płytsze i wcześniej
+odkryte. Kolejka jest kopcem z leniwym usuwaniem: podniesienie priorytetu
+dodaje nowy wpis, a stary jest pomijany przy zdejmowaniu, więc każda
+operacja kosztuje O(log n) także przy setkach tysięcy tytułów.
+
+Kolejka udaje deque używane przez pętle przeszukiwania: frontier[i]
+przenosi z kopca i zwraca i-tą stronę w kolejności odwiedzania. Strony
+raz przeniesione („głowa” – np. okno pobierania crawlera) mają już
+ustaloną kolejność i nie zmieniają jej przy nowych linkach.
+"""
+
+import heapq
+import itertools
+import re
+import time
+from collections import deque
+
+
+class PriorityFrontier:
+    """Kopiec stron do odwiedzenia z aktualizowanymi priorytetami."""
+
+    def __init__(self, title_filter=None):
+        """
+        :param title_filter: wyrażenie regularne – pasujące tytuły
+                             są odwiedzane przed wszystkimi innymi
+        """
+        self.title_filter = (re.compile(title_filter)
+                             if title_filter else None)
+        self.clear()
+
+    def clear(self):
+        """Opróżnia kolejkę."""
+        self._head = deque()
+        self._heap = []
+        # tytuł -> aktualny wpis kopca (klucz, tytuł, głębokość, liczba
+        # linków); wpisy kopca spoza słownika są nieaktualne. Krotki
+        # (a nie listy) nie obciążają odśmiecacza przy dużych kolejkach.
+        self._entries = {}
+        self._seq = itertools.count()
+
+    def _key(self, title, depth, inlinks, seq):
+        matches = (self.title_filter is not None
+                   and self.title_filter.search(title) is not None)
+        return (not matches, -inlinks, depth, seq)
+
+    def _push(self, title, depth, inlinks, seq=None):
+        if seq is None:
+            seq = next(self._seq)
+        entry = (self._key(title, depth, inlinks, seq), title, depth, inlinks)
+        self._entries[title] = entry
+        heapq.heappush(self._heap, entry)
+
+    def append(self, item):
+        """Dodaje stronę (tytuł, głębokość) – jak deque.append."""
+        title, depth = item[0], item[1]
+        inlinks = item[2] if len(item) > 2 else 1
+        self._push(title, depth, inlinks)
+
+    def bump(self, title):
+        """
+        Zwiększa liczbę linków prowadzących do strony czekającej
+        w kopcu (podnosi jej priorytet).
+
+        :return: True, jeśli strona czekała w kopcu
+        """
+        entry = self._entries.get(title)
+        if entry is None:
+            return False
+        self._push(title, entry[2], entry[3] + 1, seq=entry[0][3])
+        # Kopiec z przewagą nieaktualnych wpisów budujemy od nowa
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._heap = [e for e in self._heap
+                          if self._entries.get(e[1]) is e]
+            heapq.heapify(self._heap)
+        return True
+
+    def _pop_heap(self):
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if self._entries.get(entry[1]) is entry:
+                del self._entries[entry[1]]
+                return entry
+        raise IndexError("pusta kolejka")
+
+    def __len__(self):
+        return len(self._head) + len(self._entries)
+
+    def __getitem__(self, index):
+        if index < 0:
+            raise IndexError("ujemne indeksy nie są obsługiwane")
+        while len(self._head) <= index:
+            entry = self._pop_heap()
+            self._head.append((entry[1], entry[2], entry[3], entry[0][3]))
+        title, depth = self._head[index][:2]
+        return title, depth
+
+    def __iter__(self):
+        index = 0
+        while index < len(self):
+            yield self[index]
+            index += 1
+
+    def popleft(self):
+        """Zdejmuje następną stronę – jak deque.popleft."""
+        item = self[0]
+        self._head.popleft()
+        return item
+
+    def remove(self, title):
+        """
+        Usuwa stronę z kolejki, gdziekolwiek czeka (przy odtwarzaniu
+        dziennika kolejność przeniesień do głowy może być inna niż
+        w przerwanym przeszukiwaniu).
+
+        :return: True, jeśli strona była w kolejce
+        """
+        if self._head and self._head[0][0] == title:
+            self._head.popleft()
+            return True
+        for i, item in enumerate(self._head):
+            if item[0] == title:
+                del self._head[i]
+                return True
+        return self._entries.pop(title, None) is not None
+
+    def snapshot(self):
+        """
+        Lista [tytuł, głębokość, liczba linków] w kolejności odkrycia
+        (do migawki stanu; load() odtwarza z niej kolejkę).
+        """
+        items = [(seq, title, depth, inlinks)
+                 for title, depth, inlinks, seq in self._head]
+        items.extend((e[0][3], e[1], e[2], e[3])
+                     for e in self._entries.values())
+        items.sort()
+        return [[title, depth, inlinks] for _, title, depth, inlinks in items]
+
+    def load(self, items):
+        """Wypełnia kolejkę elementami migawki (także z kolejki FIFO)."""
+        self.clear()
+        for item in items:
+            self.append(tuple(item))
+
+
+class CrawlBudget:
+    """Limit liczby stron i czasu jednego uruchomienia przeszukiwania."""
+
+    def __init__(self, max_pages=None, max_seconds=None,
+                 clock=time.monotonic):
+        """
+        :param max_pages: maks. liczba stron przetworzonych w tym
+                          uruchomieniu (None – bez limitu)
+        :param max_seconds: maks. czas przeszukiwania w sekundach
+        :param clock: zegar monotoniczny (do testów)
+        """
+        self.max_pages = max_pages
+        self.max_seconds = max_seconds
+        self.clock = clock
+        self.pages = 0
+        self._started = clock()
+
+    def page_done(self):
+        """Zalicza przetworzoną stronę."""
+        self.pages += 1
+
+    def remaining_pages(self):
+        """Ile stron można jeszcze przetworzyć (None – bez limitu)."""
+        if self.max_pages is None:
+            return None
+        return max(0, self.max_pages - self.pages)
+
+    def exhausted(self):
+        """
+        Zwraca opis wyczerpanego limitu albo None, jeśli można
+        przetwarzać dalej.
+        """
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            return f"limit {self.max_pages} stron"
+        if (self.max_seconds is not None
+                and self.clock() - self._started >= self.max_seconds):
+            return f"limit {self.max_seconds:g} s"
+        return None
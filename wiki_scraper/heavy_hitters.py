@@ -0,0 +1,223 @@
+"""
+Przybliżone zliczanie najczęstszych słów (heavy hitters) w stałej pamięci
+algorytmem Space-Saving (Metwally, Agrawal, El Abbadi).
+"""
+
+import heapq
+from collections import OrderedDict
+
+from word_counter import WordCounter
+from word_store import JsonStore
+
+
+class SpaceSaving:
+    """
+    Monitoruje co najwyżej capacity słów. Słowo spoza zbioru zastępuje
+    słowo o najmniejszej liczbie i dziedziczy tę liczbę jako błąd.
+
+    Gwarancje dla strumienia o łącznej liczbie słów N:
+    - oszacowanie nigdy nie jest mniejsze od prawdziwej liczby,
+    - oszacowanie przekracza prawdziwą liczbę najwyżej o błąd słowa,
+      a ten nie przekracza N / capacity,
+    - każde słowo występujące więcej niż N / capacity razy jest monitorowane.
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        :param capacity: liczba liczników (budżet pamięci)
+        :raises Exception: dla pojemności mniejszej niż 1
+        """
+        if capacity < 1:
+            raise Exception("Pojemność Space-Saving musi być dodatnia")
+        self.capacity = capacity
+        self.total = 0
+        # słowo -> [oszacowana liczba, błąd]
+        self._counters = {}
+        # Kopiec (liczba, słowo) z jednym wpisem na monitorowane słowo;
+        # liczby tylko rosną, więc klucz jest dolnym ograniczeniem
+        # i jest odświeżany dopiero, gdy wpis trafi na szczyt kopca
+        self._heap = []
+
+    def __len__(self):
+        return len(self._counters)
+
+    def _evict_min(self):
+        """Usuwa słowo o najmniejszej liczbie i zwraca tę liczbę."""
+        heap = self._heap
+        while True:
+            key, word = heap[0]
+            current = self._counters[word][0]
+            if key == current:
+                heapq.heappop(heap)
+                del self._counters[word]
+                return current
+            heapq.heapreplace(heap, (current, word))
+
+    def add(self, word, count=1):
+        """
+        Dodaje count wystąpień słowa (wartości niedodatnie są pomijane –
+        Space-Saving nie obsługuje odejmowania).
+        """
+        if count <= 0:
+            return
+        self.total += count
+        entry = self._counters.get(word)
+        if entry is not None:
+            entry[0] += count
+        elif len(self._counters) < self.capacity:
+            self._counters[word] = [count, 0]
+            heapq.heappush(self._heap, (count, word))
+        else:
+            floor = self._evict_min()
+            self._counters[word] = [floor + count, floor]
+            heapq.heappush(self._heap, (floor + count, word))
+
+    def update(self, counts):
+        """
+        Dodaje zliczenia jednej strony.
+
+        :param counts: słownik lub Counter {słowo: liczba}
+        """
+        counters = self._counters
+        add = self.add
+        for word, count in counts.items():
+            entry = counters.get(word)
+            if entry is not None and count > 0:
+                entry[0] += count
+                self.total += count
+            else:
+                add(word, count)
+
+    @property
+    def error_bound(self):
+        """Górne ograniczenie błędu oszacowania każdego słowa (N / capacity)."""
+        return self.total / self.capacity
+
+    def top(self, n):
+        """
+        Zwraca n słów o największych oszacowaniach.
+
+        Słowo na pozycji i na pewno należy do prawdziwych n najczęstszych,
+        jeśli liczba - błąd jest nie mniejsza od oszacowania słowa n+1.
+
+        :param n: liczba słów
+        :return: lista krotek (słowo, oszacowana liczba, błąd) malejąco
+        """
+        return [(word, count, error) for word, (count, error) in
+                heapq.nlargest(n, self._counters.items(),
+                               key=lambda item: item[1][0])]
+
+    def counts(self):
+        """Zwraca słownik {słowo: oszacowana liczba} monitorowanych słów."""
+        return {word: entry[0] for word, entry in self._counters.items()}
+
+    def to_dict(self):
+        """Stan do zapisu w JSON."""
+        return {
+            'capacity': self.capacity,
+            'total': self.total,
+            'items': self._counters,
+        }
+
+    @classmethod
+    def from_dict(cls, state, capacity=None):
+        """
+        Odtwarza stan zapisany przez to_dict.
+
+        :param state: słownik ze stanem (pusty daje pustą strukturę)
+        :param capacity: żądana pojemność; mniejsza od zapisanej jest
+                         ignorowana (zmniejszenie unieważniłoby granice błędu)
+        """
+        capacity = max(capacity or 0, state.get('capacity', 0)) or 1000
+        sketch = cls(capacity)
+        sketch.total = state.get('total', 0)
+        sketch._counters = {word: list(entry)
+                            for word, entry in state.get('items', {}).items()}
+        sketch._heap = [(entry[0], word)
+                        for word, entry in sketch._counters.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+
+class ApproxWordCounter(WordCounter):
+    """
+    WordCounter w trybie przybliżonym: zamiast pełnego słownika zliczeń
+    trzyma strukturę Space-Saving o stałej liczbie liczników.
+
+    Stan jest zapisywany do osobnego pliku JSON (domyślnie
+    word-counts.topk.json) razem z rejestrem artykułów. Rejestr
+    przechowuje same skróty treści – niezmieniona strona jest pomijana,
+    ale zmieniona strona jest doliczana ponownie (jej poprzedniego wkładu
+    nie da się odjąć) – i obejmuje tylko ledger_size ostatnio widzianych
+    artykułów (LRU), więc pamięć i rozmiar pliku są stałe jak sama
+    struktura. Artykuł usunięty z rejestru jest przy następnej wizycie
+    doliczany ponownie, czyli oszacowania mogą rosnąć ponad prawdziwe
+    liczby, ale nigdy nie spadają poniżej nich; filtr Blooma dałby
+    odwrotny błąd – pominięte strony i zaniżone liczby.
+    """
+
+    def __init__(self, json_path='word-counts.topk.json', capacity=1000,
+                 flush_every=1, ledger_size=100_000):
+        """
+        :param json_path: plik ze stanem struktury Space-Saving
+        :param capacity: liczba monitorowanych słów (budżet pamięci)
+        :param flush_every: co ile wywołań update zapisywać stan
+        :param ledger_size: ile ostatnio widzianych artykułów pamiętać
+                            w rejestrze skrótów
+        """
+        self.capacity = capacity
+        self.ledger_size = ledger_size
+        super().__init__(json_path, store=JsonStore(json_path),
+                         flush_every=flush_every)
+
+    def _load(self):
+        state = self.store.load()
+        self.sketch = SpaceSaving.from_dict(state, self.capacity)
+        if 'articles' in state:
+            self._hashes = OrderedDict(state['articles'])
+        else:
+            # Stan sprzed rejestru LRU – skróty z dziennika artykułów
+            self._hashes = OrderedDict(
+                (title, entry['hash'])
+                for title, entry in self.store._load_ledger().items())
+        self._trim_ledger()
+        return {}
+
+    def _trim_ledger(self):
+        while len(self._hashes) > self.ledger_size:
+            self._hashes.popitem(last=False)
+
+    def _get_article(self, article):
+        if article in self._pending_articles:
+            return self._pending_articles[article]
+        content_hash = self._hashes.get(article)
+        if content_hash is None:
+            return None
+        self._hashes.move_to_end(article)
+        return content_hash, {}
+
+    def _save(self):
+        for article, (content_hash, _) in self._pending_articles.items():
+            self._hashes[article] = content_hash
+            self._hashes.move_to_end(article)
+        self._trim_ledger()
+        state = self.sketch.to_dict()
+        state['articles'] = list(self._hashes.items())
+        self.store.save(state, {})
+        self._pending_articles = {}
+        self._updates_since_flush = 0
+
+    def _apply(self, deltas):
+        self.sketch.update(deltas)
+
+    def _ledger_entry(self, content_hash, counts):
+        return content_hash, {}
+
+    def get_counts(self):
+        """Zwraca oszacowane liczby monitorowanych słów."""
+        return self.sketch.counts()
+
+    def error_bound(self):
+        """Górne ograniczenie błędu oszacowań (zob. SpaceSaving)."""
+        return self.sketch.error_bound
+
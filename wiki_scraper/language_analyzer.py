@@ -1,6 +1,33 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-from wordfreq import get_frequency_dict
+import numpy as np
+
+import metrics
+from language_index import LanguageIndex
+
+# Tryby porównawcze prepare_table i nazwy ich kolumn z wynikiem
+SCORE_MODES = {
+    'log-ratio': 'log_ratio',
+    'keyness': 'keyness',
+    'kl': 'kl',
+    'js': 'js',
+}
+MODES = ('article', 'language') + tuple(SCORE_MODES)
+
+
+def _top_indices(values, n):
+    """
+    Zwraca indeksy n największych wartości, malejąco. Remisy są
+    rozstrzygane pozycją, tak jak przy stabilnym sortowaniu całości,
+    ale pełne sortowanie dotyczy tylko kandydatów z argpartition.
+    """
+    if n <= 0 or not len(values):
+        return np.empty(0, dtype=np.intp)
+    if n < len(values):
+        part = np.argpartition(-values, n - 1)[:n]
+        candidates = np.flatnonzero(values >= values[part].min())
+    else:
+        candidates = np.arange(len(values))
+    order = np.argsort(-values[candidates], kind='stable')
+    return candidates[order][:n]
 
 
 class LanguageAnalyzer:
@@ -8,17 +35,38 @@ class LanguageAnalyzer:
     Klasa do analizy częstotliwości słów w artykule w porównaniu z językiem.
     """
 
-    def __init__(self, language_code='en', word_counts=None):
+    def __init__(self, language_code='en', word_counts=None, index=None,
+                 reference_size=1e9):
         """
         Inicjalizuje analizator.
 
         :param language_code: kod języka (np. 'en', 'pl')
         :param word_counts: słownik zliczeń słów z artykułu
+        :param index: indeks częstotliwości języka (LanguageIndex);
+                      domyślnie indeks z katalogu cache, budowany
+                      przy pierwszym użyciu
+        :param reference_size: przyjęta liczba słów korpusu języka
+                               (dla trybu 'keyness')
         """
         self.language_code = language_code
         self.word_counts = word_counts or {}
-        # Pobranie słownika częstotliwości dla danego języka z biblioteki wordfreq
-        self.lang_freq = get_frequency_dict(lang=language_code, wordlist='best')
+        self.index = index or LanguageIndex(language_code)
+        self.reference_size = reference_size
+        self._lang_freq = None
+
+    @property
+    def lang_freq(self):
+        """
+        Pełny słownik częstotliwości języka z biblioteki wordfreq
+        (wczytywany dopiero przy pierwszym odwołaniu; prepare_table
+        korzysta z indeksu).
+        """
+        if self._lang_freq is None:
+            from wordfreq import get_frequency_dict
+            with metrics.stage('wordfreq_load'):
+                self._lang_freq = get_frequency_dict(
+                    lang=self.language_code, wordlist='best')
+        return self._lang_freq
 
     def normalize(self, freq_dict):
         """
@@ -35,41 +83,134 @@ class LanguageAnalyzer:
             return freq_dict
         return {k: v / max_val for k, v in freq_dict.items()}
 
+    def _article_arrays(self):
+        """Słowa i liczby wystąpień z artykułu jako tablice NumPy."""
+        if hasattr(self.word_counts, 'arrays'):
+            # Zwarty słownik (CompactCounts) oddaje tablice bezpośrednio
+            words, counts = self.word_counts.arrays()
+            return np.array(words, dtype=object), counts
+        words = np.array(list(self.word_counts), dtype=object)
+        counts = np.fromiter(self.word_counts.values(), dtype=np.float64,
+                             count=len(words))
+        return words, counts
+
+    @staticmethod
+    def _normalized(values):
+        """Wektorowy odpowiednik normalize()."""
+        max_val = values.max() if len(values) else 0
+        return values / max_val if max_val else values
+
+    def scores(self, mode):
+        """
+        Liczy wynik porównania dla każdego słowa artykułu.
+
+        Rozkład artykułu P to liczby wystąpień podzielone przez ich sumę,
+        rozkład języka Q to prawdopodobieństwa z wordfreq (słowa spoza
+        słownika dostają połowę najmniejszego prawdopodobieństwa).
+
+        - 'log-ratio' – log2(P / Q),
+        - 'keyness' – statystyka log-likelihood G2 (korpus języka liczy
+          reference_size słów), ze znakiem minus dla słów rzadszych
+          w artykule niż w języku,
+        - 'kl', 'js' – wkład słowa do dywergencji Kullbacka-Leiblera
+          KL(P || Q) i Jensena-Shannona (w bitach); Q jest przy tym
+          zawężony do słownika artykułu i ponownie znormalizowany.
+
+        :param mode: jeden z kluczy SCORE_MODES
+        :return: krotka (słowa, liczby wystąpień, prawdopodobieństwa
+                 z wordfreq bez wygładzenia, wyniki) – tablice NumPy
+        :raises Exception: dla nieznanego trybu
+        """
+        if mode not in SCORE_MODES:
+            raise Exception(f"Nieznany tryb analizy: {mode}")
+        words, counts = self._article_arrays()
+        lang = self.index.lookup(words, normalized=False)
+        if not len(words):
+            return words, counts, lang, counts
+
+        total = counts.sum()
+        p = counts / total
+        q = np.where(lang > 0, lang, self.index.min_frequency / 2)
+        if mode == 'log-ratio':
+            result = np.log2(p / q)
+        elif mode == 'keyness':
+            ref_size = self.reference_size
+            ref = q * ref_size
+            both = (counts + ref) / (total + ref_size)
+            g2 = 2 * (counts * np.log(counts / (total * both))
+                      + ref * np.log(ref / (ref_size * both)))
+            result = np.where(p >= q, g2, -g2)
+        else:
+            q = q / q.sum()
+            if mode == 'kl':
+                result = p * np.log2(p / q)
+            else:
+                m = (p + q) / 2
+                result = (p * np.log2(p / m) + q * np.log2(q / m)) / 2
+        return words, counts, lang, result
+
+    def divergence(self, kind='kl'):
+        """
+        Zwraca dywergencję rozkładu słów artykułu od rozkładu języka.
+
+        :param kind: 'kl' (Kullback-Leibler) lub 'js' (Jensen-Shannon)
+        :return: wartość w bitach
+        :raises Exception: dla innego rodzaju dywergencji
+        """
+        if kind not in ('kl', 'js'):
+            raise Exception(f"Nieznany rodzaj dywergencji: {kind}")
+        return float(self.scores(kind)[3].sum())
+
+    @metrics.timed('prepare_table')
     def prepare_table(self, mode='article', n=10):
         """
         Przygotowuje tabelę porównawczą dla n najczęstszych słów
-        w wybranym trybie ('article' lub 'language').
+        w wybranym trybie ('article' lub 'language') albo n słów
+        o najwyższym wyniku w trybach porównawczych (zob. scores()).
 
         :param mode: 'article' – sortowanie wg artykułu,
-                     'language' – sortowanie wg języka
+                     'language' – sortowanie wg języka,
+                     'log-ratio', 'keyness', 'kl', 'js' – sortowanie
+                     wg wyniku
         :param n: liczba słów do uwzględnienia
         :return: pandas.DataFrame z kolumnami:
                  word, frequency_in_article, frequency_in_language
+                 (oraz kolumną wyniku w trybach porównawczych)
+        :raises Exception: dla nieznanego trybu
         """
-        norm_article = self.normalize(self.word_counts)
-        norm_lang = self.normalize(self.lang_freq)
-
+        import pandas as pd
         if mode == 'article':
-            # Pobierz n najczęstszych słów z artykułu
-            top = sorted(norm_article.items(),
-                         key=lambda x: x[1], reverse=True)[:n]
-            words = [w for w, _ in top]
+            # n najczęstszych słów artykułu bez sortowania całości
+            words, counts = self._article_arrays()
+            norm_article = self._normalized(counts)
+            top = _top_indices(norm_article, n)
+            top_words = words[top]
+            df = pd.DataFrame({
+                'word': top_words,
+                'frequency_in_article': norm_article[top],
+                'frequency_in_language': self.index.lookup(top_words),
+            })
+        elif mode == 'language':
+            # n najczęstszych słów języka – wprost z indeksu
+            top = self.index.top(n)
+            max_val = max(self.word_counts.values(), default=0) or 1
+            df = pd.DataFrame({
+                'word': [w for w, _ in top],
+                'frequency_in_article': np.fromiter(
+                    (self.word_counts.get(w, 0) for w, _ in top),
+                    dtype=np.float64, count=len(top)) / max_val,
+                'frequency_in_language': [v for _, v in top],
+            })
         else:
-            # Pobierz n najczęstszych słów z języka
-            top = sorted(norm_lang.items(),
-                         key=lambda x: x[1], reverse=True)[:n]
-            words = [w for w, _ in top]
-
-        data = []
-        for word in words:
-            data.append({
-                'word': word,
-                'frequency_in_article': norm_article.get(word, 0),
-                'frequency_in_language': norm_lang.get(word, 0)
+            words, counts, lang, result = self.scores(mode)
+            top = _top_indices(result, n)
+            return pd.DataFrame({
+                'word': words[top],
+                'frequency_in_article': self._normalized(counts)[top],
+                'frequency_in_language': lang[top] / self.index.max_frequency,
+                SCORE_MODES[mode]: result[top],
             })
 
-        df = pd.DataFrame(data)
-
         # Posortuj zgodnie z wybranym trybem
         if mode == 'article':
             df = df.sort_values('frequency_in_article', ascending=False)
@@ -77,6 +218,7 @@ class LanguageAnalyzer:
             df = df.sort_values('frequency_in_language', ascending=False)
         return df
 
+    @metrics.timed('plot_chart')
     def plot_chart(self, df, output_path):
         """
         Tworzy wykres słupkowy porównujący częstotliwości słów
@@ -89,10 +231,15 @@ class LanguageAnalyzer:
         freq_article = df['frequency_in_article'].tolist()
         freq_lang = df['frequency_in_language'].tolist()
 
+        # Figure bez pyplot rysuje nieinteraktywnie (Agg) i nie wczytuje
+        # ani nie przełącza backendu GUI
+        from matplotlib.figure import Figure
+
         x = range(len(words))
         width = 0.35
 
-        fig, ax = plt.subplots(figsize=(12, 6))
+        fig = Figure(figsize=(12, 6))
+        ax = fig.subplots()
         ax.bar([i - width / 2 for i in x],
                freq_article, width, label='Artykuł')
         ax.bar([i + width / 2 for i in x],
@@ -105,6 +252,5 @@ class LanguageAnalyzer:
         ax.set_xticklabels(words, rotation=45, ha='right')
         ax.legend()
 
-        plt.tight_layout()
-        plt.savefig(output_path)
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(output_path)
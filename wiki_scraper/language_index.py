@@ -0,0 +1,272 @@
+"""
+Trwały indeks częstotliwości słów języka (z biblioteki wordfreq).
+
+Indeks jest budowany raz dla danego języka i zapisywany w zwartym
+formacie binarnym, a później mapowany do pamięci (mmap) – odczyt
+n najczęstszych słów i wyszukiwanie pojedynczych słów nie wymagają
+wczytywania, normalizowania ani sortowania całego słownika.
+
+Układ pliku (little-endian):
+    nagłówek    MAGIC, liczba słów n, długość bloku słów
+    freqs       float64[n]  – częstotliwości malejąco (kolejność wordfreq)
+    offsets     uint32[n+1] – początki słów w bloku UTF-8
+    order       uint32[n]   – numery słów posortowane po bajtach UTF-8
+    blob        słowa w kodowaniu UTF-8, jedno za drugim
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from importlib.metadata import version, PackageNotFoundError
+
+import numpy as np
+
+import metrics
+
+MAGIC = b'WSLIDX01'
+HEADER = struct.Struct('<8sII')
+# Do tylu słów lookup() szuka binarnie; powyżej łączy przez indeks pandas
+SMALL_LOOKUP = 2000
+
+
+def default_cache_dir():
+    """Katalog na indeksy: $WIKI_SCRAPER_CACHE_DIR lub ~/.cache/wiki_scraper."""
+    return os.environ.get('WIKI_SCRAPER_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'wiki_scraper')
+
+
+def _typed_array(typecode, values):
+    """
+    Tablica z zamienioną kolejnością bajtów na maszynach big-endian
+    (plik indeksu jest zawsze little-endian).
+    """
+    arr = array(typecode, values)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+def build_index(path, freq_dict):
+    """
+    Zapisuje indeks dla słownika częstotliwości (atomowo).
+
+    Kolejność słów jest taka sama jak przy stabilnym sortowaniu malejąco
+    znormalizowanego słownika, czyli taka jak w dotychczasowym
+    LanguageAnalyzer.prepare_table.
+
+    :param path: ścieżka do pliku indeksu
+    :param freq_dict: słownik {słowo: częstotliwość}
+    """
+    max_val = max(freq_dict.values(), default=0) or 1
+    items = sorted(freq_dict.items(), key=lambda x: x[1] / max_val,
+                   reverse=True)
+    encoded = [word.encode('utf-8') for word, _ in items]
+    offsets = [0]
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+    order = sorted(range(len(encoded)), key=encoded.__getitem__)
+    blob = b''.join(encoded)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(items), len(blob)))
+        _typed_array('d', (freq for _, freq in items)).tofile(f)
+        _typed_array('I', offsets).tofile(f)
+        _typed_array('I', order).tofile(f)
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class LanguageIndex:
+    """
+    Zmapowany do pamięci indeks częstotliwości słów jednego języka.
+    Plik jest otwierany (i w razie potrzeby budowany) dopiero przy
+    pierwszym użyciu. Wartości są normalizowane do przedziału [0, 1]
+    względem najczęstszego słowa, tak jak w LanguageAnalyzer.normalize.
+    """
+
+    def __init__(self, language_code='en', wordlist='best', cache_dir=None,
+                 path=None):
+        """
+        :param language_code: kod języka (np. 'en', 'pl')
+        :param wordlist: lista słów wordfreq ('best', 'large', 'small')
+        :param cache_dir: katalog na indeksy (domyślnie default_cache_dir())
+        :param path: jawna ścieżka do pliku indeksu (zamiast katalogu cache)
+        """
+        self.language_code = language_code
+        self.wordlist = wordlist
+        if path is None:
+            try:
+                source = version('wordfreq')
+            except PackageNotFoundError:
+                source = 'unknown'
+            path = os.path.join(cache_dir or default_cache_dir(),
+                                f"wordfreq-{language_code}-{wordlist}"
+                                f"-{source}.idx")
+        self.path = path
+        self._mm = None
+        self._words = None
+        self._word_index = None
+
+    @metrics.timed('index_build')
+    def _build(self):
+        from wordfreq import get_frequency_dict
+        build_index(self.path, get_frequency_dict(lang=self.language_code,
+                                                  wordlist=self.wordlist))
+
+    def _open(self):
+        if self._mm is not None:
+            return
+        if not os.path.exists(self.path):
+            self._build()
+        metrics.count('index.opened')
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, blob_len = HEADER.unpack_from(mm)
+        if magic != MAGIC:
+            mm.close()
+            raise Exception(f"Nieprawidłowy plik indeksu: {self.path}")
+        view = memoryview(mm)
+        pos = HEADER.size
+        self._freqs = view[pos:pos + 8 * n].cast('d')
+        pos += 8 * n
+        self._offsets = view[pos:pos + 4 * (n + 1)].cast('I')
+        pos += 4 * (n + 1)
+        self._order = view[pos:pos + 4 * n].cast('I')
+        self._blob_start = pos + 4 * n
+        self._n = n
+        self._max = (self._freqs[0] if n else 0) or 1
+        self._view = view
+        self._mm = mm
+        if sys.byteorder == 'big':
+            # mmap nie odwraca bajtów – na maszynach big-endian kopiujemy
+            self._freqs = _typed_array('d', self._freqs.tolist())
+            self._offsets = _typed_array('I', self._offsets.tolist())
+            self._order = _typed_array('I', self._order.tolist())
+
+    def _word_bytes(self, i):
+        start = self._blob_start
+        return self._mm[start + self._offsets[i]:start + self._offsets[i + 1]]
+
+    def _find(self, word):
+        """Wyszukiwanie binarne; zwraca numer słowa lub -1."""
+        self._open()
+        target = word.encode('utf-8')
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_bytes(self._order[mid]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n and self._word_bytes(self._order[lo]) == target:
+            return self._order[lo]
+        return -1
+
+    def __len__(self):
+        self._open()
+        return self._n
+
+    def __contains__(self, word):
+        return self._find(word) >= 0
+
+    def get(self, word, default=0):
+        """
+        Zwraca znormalizowaną częstotliwość słowa.
+
+        :param word: słowo
+        :param default: wartość dla słowa spoza indeksu
+        """
+        i = self._find(word)
+        if i < 0:
+            return default
+        return self._freqs[i] / self._max
+
+    def top(self, n):
+        """
+        Zwraca n najczęstszych słów języka.
+
+        :param n: liczba słów
+        :return: lista krotek (słowo, znormalizowana częstotliwość)
+        """
+        self._open()
+        return [(self._word_bytes(i).decode('utf-8'),
+                 self._freqs[i] / self._max)
+                for i in range(min(max(n, 0), self._n))]
+
+    @property
+    def max_frequency(self):
+        """Surowa częstotliwość (prawdopodobieństwo) najczęstszego słowa."""
+        self._open()
+        return self._max
+
+    @property
+    def min_frequency(self):
+        """Surowa częstotliwość najrzadszego słowa indeksu."""
+        self._open()
+        return self._freqs[self._n - 1] if self._n else 0.0
+
+    def frequencies(self, normalized=True):
+        """
+        Zwraca częstotliwości wszystkich słów w kolejności rang.
+
+        :param normalized: True – względem najczęstszego słowa,
+                           False – surowe prawdopodobieństwa z wordfreq
+        :return: np.ndarray (kopia, niezależna od mapowania pliku)
+        """
+        self._open()
+        freqs = np.frombuffer(self._freqs, dtype=np.float64)
+        return freqs / self._max if normalized else freqs.copy()
+
+    def words(self):
+        """Zwraca listę wszystkich słów w kolejności rang (zapamiętywaną)."""
+        if self._words is None:
+            self._open()
+            blob = self._mm[self._blob_start:]
+            offsets = self._offsets.tolist()
+            self._words = [blob[start:end].decode('utf-8')
+                           for start, end in zip(offsets, offsets[1:])]
+        return self._words
+
+    def lookup(self, words, normalized=True):
+        """
+        Zwraca częstotliwości wielu słów naraz (0 dla słów spoza indeksu).
+
+        Małe zbiory są wyszukiwane binarnie, duże – złączeniem przez
+        pandas.Index (jednorazowo budowanym dla całego słownika).
+
+        :param words: sekwencja słów
+        :param normalized: jak w frequencies()
+        :return: np.ndarray wyrównany z words
+        """
+        self._open()
+        if len(words) <= SMALL_LOOKUP:
+            positions = np.fromiter((self._find(w) for w in words),
+                                    dtype=np.int64, count=len(words))
+        else:
+            if self._word_index is None:
+                import pandas as pd
+                self._word_index = pd.Index(self.words())
+            positions = self._word_index.get_indexer(words)
+        freqs = np.frombuffer(self._freqs, dtype=np.float64)
+        result = np.zeros(len(words))
+        found = positions >= 0
+        result[found] = freqs[positions[found]]
+        return result / self._max if normalized else result
+
+    def close(self):
+        """Zwalnia mapowanie pliku."""
+        if self._mm is None:
+            return
+        for name in ('_freqs', '_offsets', '_order'):
+            arr = getattr(self, name)
+            if isinstance(arr, memoryview):
+                arr.release()
+        self._view.release()
+        self._mm.close()
+        self._mm = None
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test obciążeniowy przeszukiwania (--auto-count-words) na lokalnej
+generowanej wiki (synthetic_wiki.py) – bez sieci i powtarzalnie.
+
+Serwer wiki działa w procesie głównym, a każde przeszukiwanie (głębokości
+1–3) w osobnym procesie, żeby szczytowe RSS dotyczyło tylko jego.
+Raport: strony/s, bajty/s, mediana i 99. percentyl czasu pobrania
+strony (z ponowieniami) oraz szczytowe RSS.
+
+Przykład:
+    python3 load_test.py --pages 5000 --latency-ms 20 --concurrency 16
+    python3 load_test.py --throttle-rate 0.02 --source api --output wyniki.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic_wiki import add_wiki_arguments, serve, wiki_from_args
+
+
+def run_crawl(base_url, depth, concurrency=None, source='html',
+              parse_workers=0, fast_parse=False, flush_every=20):
+    """
+    Przeszukuje wiki spod base_url tak jak --auto-count-words
+    (strona startowa 'Page 0') i mierzy wydajność.
+
+    :return: słownik: pages, seconds, bytes, p50 i p99 (czas pobrania
+             w s), peak_rss (bajty)
+    """
+    import wiki_scraper
+    from crawl_state import CrawlState
+    from fetcher import PageFetcher
+    from mediawiki_api import MediaWikiAPI
+    from word_counter import WordCounter
+
+    class TimedFetcher(PageFetcher):
+        """PageFetcher zapisujący czas każdego pobrania."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.latencies = []
+
+        def get(self, url, headers=None):
+            start = time.perf_counter()
+            try:
+                return super().get(url, headers)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.latencies.append(elapsed)
+
+    wiki_scraper.BASE_URL = base_url
+    fetcher = TimedFetcher(max_retries=5, backoff=0.1)
+    api = (MediaWikiAPI(base_url, fetcher=fetcher) if source == 'api'
+           else None)
+    state = CrawlState()
+    with tempfile.TemporaryDirectory() as tmp:
+        wc = WordCounter(json_path=os.path.join(tmp, 'word-counts.json'),
+                         flush_every=flush_every)
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull):
+            wiki_scraper.cmd_auto_count_words(
+                "Page 0", depth, 0, concurrency=concurrency, fetcher=fetcher,
+                word_counter=wc, parser='lxml' if fast_parse else 'bs4',
+                state=state, api=api, parse_workers=parse_workers)
+        seconds = time.perf_counter() - start
+        wc.close()
+    latencies = fetcher.latencies or [0.0]
+    quantiles = (statistics.quantiles(latencies, n=100)
+                 if len(latencies) > 1 else latencies * 99)
+    return {
+        'depth': depth,
+        'pages': state.pages,
+        'seconds': seconds,
+        'bytes': fetcher.bytes_received,
+        'requests': fetcher.requests_sent,
+        'p50': statistics.median(latencies),
+        'p99': quantiles[98],
+        # ru_maxrss w Linuksie jest w KB
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def crawl_in_subprocess(base_url, depth, args):
+    """Uruchamia run_crawl w nowym procesie i zwraca jego wynik."""
+    cmd = [sys.executable, os.path.abspath(__file__), '--worker',
+           '--base-url', base_url, '--depth', str(depth),
+           '--source', args.source, '--parse-workers', str(args.parse_workers),
+           '--flush-every', str(args.flush_every)]
+    if args.concurrency:
+        cmd += ['--concurrency', str(args.concurrency)]
+    if args.fast_parse:
+        cmd.append('--fast-parse')
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Test obciążeniowy przeszukiwania na lokalnej wiki')
+    add_wiki_arguments(parser)
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 2, 3],
+                        help='Głębokości przeszukiwania do zmierzenia')
+    parser.add_argument('--concurrency', type=int,
+                        help='Tryb asynchroniczny z podaną liczbą pobrań'
+                             ' naraz (domyślnie sekwencyjnie)')
+    parser.add_argument('--source', choices=['html', 'api'], default='html')
+    parser.add_argument('--parse-workers', type=int, default=0)
+    parser.add_argument('--fast-parse', action='store_true')
+    parser.add_argument('--flush-every', type=int, default=20)
+    parser.add_argument('--output', metavar='PLIK',
+                        help='Zapisz wyniki jako JSON')
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--depth', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--worker', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_crawl(args.base_url, args.depth,
+                                   concurrency=args.concurrency,
+                                   source=args.source,
+                                   parse_workers=args.parse_workers,
+                                   fast_parse=args.fast_parse,
+                                   flush_every=args.flush_every)))
+        return
+
+    wiki = wiki_from_args(args)
+    server, base_url = serve(wiki)
+    results = []
+    try:
+        print(f"{'głęb.':>5} {'strony':>7} {'czas s':>8} {'strony/s':>9}"
+              f" {'KB/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>7}"
+              f" {'429':>5} {'503':>5}")
+        for depth in args.depths:
+            before = wiki.stats.copy()
+            res = crawl_in_subprocess(base_url, depth, args)
+            res['server'] = {str(k): v - before[k]
+                             for k, v in wiki.stats.items()}
+            results.append(res)
+            seconds = max(res['seconds'], 1e-9)
+            print(f"{depth:>5} {res['pages']:>7} {seconds:>8.2f}"
+                  f" {res['pages'] / seconds:>9.1f}"
+                  f" {res['bytes'] / 1024 / seconds:>9.1f}"
+                  f" {res['p50'] * 1000:>8.1f} {res['p99'] * 1000:>8.1f}"
+                  f" {res['peak_rss'] / 2 ** 20:>7.1f}"
+                  f" {res['server'].get('429', 0):>5}"
+                  f" {res['server'].get('503', 0):>5}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': {k: v for k, v in vars(args).items()
+                                  if k not in ('worker', 'base_url',
+                                               'depth', 'output')},
+                       'results': results}, f, indent=2)
+        print(f"Wyniki zapisane do {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+Źródło artykułów przez API MediaWiki (api.php) zamiast renderowanego HTML.
+
+Jedno zapytanie action=query zwraca źródło (wikitekst) i linki nawet
+50 artykułów naraz – bez menu, pasków bocznych i skryptów strony.
+Wikitekst jest zamieniany na zwykły tekst i sekcje lokalnie (wikitext.py).
+
+Pełne wyciągi tekstowe (prop=extracts) API zwraca tylko dla jednej strony
+na zapytanie, dlatego pobierane jest źródło strony (prop=revisions),
+które można pobierać partiami.
+"""
+
+import re
+import threading
+from collections import namedtuple
+from urllib.parse import urlencode, quote
+
+from fetcher import get_default_fetcher
+from wikitext import strip_wikitext, split_sections
+
+# Maksymalna liczba tytułów w jednym zapytaniu (limit MediaWiki
+# dla zwykłych użytkowników)
+MAX_TITLES = 50
+
+# Granica akapitów w tekście sekcji: pusta linia
+PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+
+# Artykuł pobrany przez API: tytuł docelowy (po normalizacji
+# i przekierowaniach), sekcje [(nagłówek, tekst)], linki do artykułów
+# i znacznik braku strony
+ApiPage = namedtuple('ApiPage', ['title', 'sections', 'links', 'missing'])
+
+
+class MediaWikiAPI:
+    """
+    Klient api.php pobierający artykuły partiami.
+
+    Zapytanie obejmuje do batch_size tytułów; gdy odpowiedź nie mieści
+    wszystkich danych (np. linków), kolejne części są dociągane według
+    pola 'continue' i scalane.
+    """
+
+    def __init__(self, base_url, fetcher=None, api_path='/w/api.php',
+                 batch_size=MAX_TITLES):
+        """
+        :param base_url: bazowy adres wiki
+        :param fetcher: współdzielony PageFetcher (domyślnie globalny)
+        :param api_path: ścieżka do api.php
+        :param batch_size: maks. liczba tytułów w zapytaniu (1–50)
+        """
+        self.api_url = base_url.rstrip('/') + api_path
+        self.fetcher = fetcher
+        self.batch_size = max(1, min(batch_size, MAX_TITLES))
+        # Artykuły pobrane z wyprzedzeniem (zob. page)
+        self._ready = {}
+        self._lock = threading.Lock()
+
+    def _get(self, params):
+        fetcher = self.fetcher or get_default_fetcher()
+        response = fetcher.get(f"{self.api_url}?"
+                               f"{urlencode(params, quote_via=quote)}")
+        response.raise_for_status()
+        data = response.json()
+        if 'error' in data:
+            raise Exception(f"Błąd API MediaWiki: "
+                            f"{data['error'].get('info', data['error'])}")
+        return data
+
+    def _query(self, titles):
+        """Zwraca kolejne odpowiedzi zapytania (z kontynuacjami)."""
+        base = {
+            'action': 'query',
+            'format': 'json',
+            'formatversion': '2',
+            'redirects': '1',
+            'prop': 'revisions|links',
+            'rvprop': 'content',
+            'rvslots': 'main',
+            'plnamespace': '0',
+            'pllimit': 'max',
+            'titles': '|'.join(titles),
+        }
+        params = base
+        while True:
+            data = self._get(params)
+            yield data
+            if 'continue' not in data:
+                return
+            params = {**base, **data['continue']}
+
+    def fetch_pages(self, titles):
+        """
+        Pobiera artykuły (po batch_size w zapytaniu).
+
+        :param titles: tytuły artykułów
+        :return: słownik {tytuł z listy: ApiPage}
+        """
+        result = {}
+        titles = list(dict.fromkeys(titles))
+        for i in range(0, len(titles), self.batch_size):
+            result.update(self._fetch_batch(titles[i:i + self.batch_size]))
+        return result
+
+    def _fetch_batch(self, titles):
+        aliases = {}
+        pages = {}
+        for data in self._query(titles):
+            query = data.get('query', {})
+            for key in ('normalized', 'redirects'):
+                for item in query.get(key, []):
+                    aliases[item['from']] = item['to']
+            for page in query.get('pages', []):
+                merged = pages.setdefault(page['title'], {
+                    'content': None, 'links': [],
+                    'missing': 'missing' in page or 'invalid' in page})
+                for rev in page.get('revisions', []):
+                    merged['content'] = rev['slots']['main']['content']
+                merged['links'].extend(link['title']
+                                       for link in page.get('links', []))
+
+        result = {}
+        for title in titles:
+            target = title
+            seen = {target}
+            while target in aliases and aliases[target] not in seen:
+                target = aliases[target]
+                seen.add(target)
+            page = pages.get(target)
+            if page is None or page['missing']:
+                result[title] = ApiPage(target, [], [], True)
+                continue
+            result[title] = ApiPage(
+                target, split_sections(strip_wikitext(page['content'] or '')),
+                page['links'], False)
+        return result
+
+    def page(self, title, ahead=()):
+        """
+        Zwraca artykuł; jeśli nie był pobrany wcześniej, pobiera go
+        jednym zapytaniem razem z tytułami z ahead (do batch_size),
+        które czekają potem na kolejne wywołania.
+
+        :param title: tytuł artykułu
+        :param ahead: tytuły, które będą potrzebne wkrótce
+        :return: ApiPage
+        """
+        with self._lock:
+            page = self._ready.pop(title, None)
+            if page is not None:
+                return page
+            batch = [title]
+            for other in ahead:
+                if len(batch) >= self.batch_size:
+                    break
+                if other != title and other not in self._ready:
+                    batch.append(other)
+        pages = self._fetch_batch(batch)
+        with self._lock:
+            for other in batch[1:]:
+                self._ready[other] = pages[other]
+        return pages[title]
+
+
+class ApiScraper:
+    """
+    Artykuł pobrany przez MediaWikiAPI z interfejsem WikiScrapera
+    (pierwszy paragraf, tekst, linki, tytuł kanoniczny).
+    Tabele wymagają renderowanego HTML, więc nie są dostępne.
+    """
+
+    def __init__(self, api, page_title, page=None, ahead=()):
+        """
+        :param api: obiekt MediaWikiAPI
+        :param page_title: tytuł artykułu
+        :param page: gotowy ApiPage (wtedy nic nie jest pobierane)
+        :param ahead: tytuły do pobrania w tym samym zapytaniu
+                      (zob. MediaWikiAPI.page)
+        :raises Exception: jeśli artykuł nie istnieje
+        """
+        self.page_title = page_title
+        self.page = page if page is not None else api.page(page_title, ahead)
+        if self.page.missing:
+            raise Exception(f"Artykuł '{page_title}' nie istnieje (404).")
+
+    def get_first_paragraph(self):
+        """
+        Zwraca pierwszy niepusty akapit artykułu (jak WikiScraper: ze wstępu,
+        a bez wstępu – z pierwszej sekcji z treścią). Wiersze akapitu
+        (do pustej linii) są sklejane spacją.
+        """
+        for _, body in self.page.sections:
+            for paragraph in PARAGRAPH_BREAK_RE.split(body):
+                lines = [line.strip() for line in paragraph.split('\n')]
+                text = ' '.join(line for line in lines if line)
+                if text:
+                    return text
+        return ""
+
+    def iter_text_chunks(self):
+        """Zwraca kolejne fragmenty tekstu (nagłówki i wiersze sekcji)."""
+        for heading, body in self.page.sections:
+            if heading:
+                yield heading
+            for line in body.split('\n'):
+                line = line.strip()
+                if line:
+                    yield line
+
+    def get_full_text(self):
+        """Zwraca cały tekst artykułu."""
+        return ' '.join(self.iter_text_chunks())
+
+    def get_all_links(self):
+        """Zwraca tytuły artykułów, do których prowadzą linki."""
+        return list(self.page.links)
+
+    def get_canonical_title(self):
+        """Zwraca tytuł docelowy (po przekierowaniach)."""
+        return self.page.title
+
+    def get_table(self, table_index):
+        raise Exception("Tabele są dostępne tylko ze źródła HTML"
+                        " (--source html).")
@@ -0,0 +1,241 @@
+"""
+Lekkie pomiary etapów przetwarzania (--metrics) i profilowanie
+(--profile).
+
+Etapy (pobieranie, parsowanie, ekstrakcja, tokenizacja, zapis liczników,
+wczytanie wordfreq, komendy CLI) mierzy się przez::
+
+    with metrics.stage('parse'):
+        ...
+
+albo dekorator @metrics.timed('save'). Dopóki pomiary nie są włączone
+(enable()), stage() zwraca wspólny pusty obiekt, a timed() tylko
+sprawdza flagę – narzut to jedno wywołanie funkcji. Po włączeniu każdy
+etap ma licznik wywołań i histogram czasów, a count() zlicza dowolne
+wartości (np. pobrane bajty). Pomiary z procesów roboczych (pule
+procesów) nie są zbierane.
+"""
+
+import bisect
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Górne granice przedziałów histogramu czasów (sekundy)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+_enabled = False
+
+
+class Histogram:
+    """Histogram czasów etapu o stałych przedziałach (BUCKETS)."""
+
+    __slots__ = ('counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+
+class Registry:
+    """Liczniki i histogramy etapów (bezpieczne dla wątków)."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def json_lines(self):
+        """Pomiary jako JSON lines – jeden obiekt na licznik lub etap."""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines.append(json.dumps({'name': name, 'type': 'counter',
+                                     'value': value}))
+        for name, h in sorted(self.histograms.items()):
+            lines.append(json.dumps({
+                'name': name, 'type': 'histogram', 'count': h.count,
+                'sum': h.sum, 'min': h.min, 'max': h.max,
+                'buckets': {('+Inf' if bound == float('inf') else str(bound)):
+                            n for bound, n in zip(BUCKETS, h.counts) if n},
+            }))
+        return ''.join(line + '\n' for line in lines)
+
+    def prometheus(self, prefix='wiki_scraper'):
+        """Pomiary w formacie tekstowym Prometheusa."""
+        out = []
+        for name, value in sorted(self.counters.items()):
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            out.append(f"# TYPE {metric} counter")
+            out.append(f"{metric} {value}")
+        if self.histograms:
+            metric = f"{prefix}_stage_seconds"
+            out.append(f"# TYPE {metric} histogram")
+        for name, h in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                out.append(f'{metric}_bucket{{stage="{name}",le="{le}"}}'
+                           f' {cumulative}')
+            out.append(f'{metric}_sum{{stage="{name}"}} {h.sum}')
+            out.append(f'{metric}_count{{stage="{name}"}} {h.count}')
+        return ''.join(line + '\n' for line in out)
+
+
+def _metric_name(name):
+    return ''.join(c if c.isalnum() else '_' for c in name)
+
+
+REGISTRY = Registry()
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enable():
+    """Włącza zbieranie pomiarów."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Wyłącza zbieranie pomiarów (zebrane zostają w REGISTRY)."""
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    """Czy pomiary są włączone."""
+    return _enabled
+
+
+def stage(name):
+    """Kontekst mierzący czas etapu (pusty, gdy pomiary są wyłączone)."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+def timed(name):
+    """Dekorator mierzący czas każdego wywołania funkcji jako etap name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """Dodaje value do licznika name (gdy pomiary są włączone)."""
+    if _enabled:
+        REGISTRY.count(name, value)
+
+
+def write(path, fmt='jsonl'):
+    """
+    Zapisuje zebrane pomiary do pliku.
+
+    :param fmt: 'jsonl' (JSON lines) lub 'prometheus' (format tekstowy
+                Prometheusa, np. dla node_exporter textfile)
+    """
+    text = REGISTRY.prometheus() if fmt == 'prometheus' else \
+        REGISTRY.json_lines()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+@contextmanager
+def profile(path, mode='cpu', top=50):
+    """
+    Profiluje blok kodu i zapisuje wynik do pliku.
+
+    :param path: plik wynikowy
+    :param mode: 'cpu' – cProfile (plik pstats, np. dla
+                 python -m pstats lub snakeviz),
+                 'memory' – tracemalloc (tekst: szczyt i top miejsc
+                 alokacji)
+    :param top: ile miejsc alokacji zapisać w trybie 'memory'
+    """
+    if mode == 'cpu':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+    elif mode == 'memory':
+        import tracemalloc
+        tracemalloc.start(10)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"Pamięć: bieżąca {current / 2 ** 20:.1f} MB,"
+                        f" szczyt {peak / 2 ** 20:.1f} MB\n\n")
+                for stat in snapshot.statistics('lineno')[:top]:
+                    f.write(f"{stat}\n")
+    else:
+        raise Exception(f"Nieznany tryb profilowania: {mode}")
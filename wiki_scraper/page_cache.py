@@ -0,0 +1,190 @@
+"""
+Trwały, dyskowy cache stron HTML z rewalidacją warunkową i usuwaniem LRU.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class PageCache:
+    """
+    Przechowuje surowy HTML stron na dysku (skompresowany gzipem)
+    razem z nagłówkami ETag/Last-Modified.
+
+    Wpisy są adresowane skrótem SHA-256 adresu URL: dla każdego wpisu
+    istnieją pliki <klucz>.html.gz oraz <klucz>.json (metadane).
+    Czas modyfikacji pliku .html.gz służy jako znacznik ostatniego użycia
+    przy usuwaniu najdawniej używanych wpisów (LRU) po przekroczeniu limitu.
+    """
+
+    def __init__(self, cache_dir='.page-cache', max_bytes=512 * 1024 * 1024,
+                 ttl=None, offline=False):
+        """
+        :param cache_dir: katalog z plikami cache
+        :param max_bytes: maks. łączny rozmiar plików cache w bajtach
+        :param ttl: czas (s), przez który wpis jest świeży i zwracany bez
+                    zapytania do serwera; None oznacza, że każdy wpis jest
+                    rewalidowany zapytaniem warunkowym
+        :param offline: zwracaj wpisy bez względu na wiek i nigdy nie łącz się
+                        z siecią
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.offline = offline
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_saved = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = self._scan_size()
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + '.html.gz', base + '.json'
+
+    def _scan_size(self):
+        """Sumuje rozmiar wszystkich plików w katalogu cache."""
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                total += os.path.getsize(os.path.join(root, name))
+        return total
+
+    def lookup(self, url):
+        """
+        Zwraca metadane wpisu dla adresu URL lub None, jeśli go nie ma.
+        Brak wpisu jest liczony jako chybienie.
+        """
+        _, meta_path = self._paths(self._key(url))
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+    def is_fresh(self, meta):
+        """Czy wpis można zwrócić bez kontaktu z serwerem."""
+        if self.offline:
+            return True
+        if self.ttl is None:
+            return False
+        return time.time() - meta['stored_at'] < self.ttl
+
+    def conditional_headers(self, meta):
+        """Nagłówki zapytania warunkowego (If-None-Match / If-Modified-Since)."""
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def read(self, meta, revalidated=False):
+        """
+        Odczytuje HTML wpisu i oznacza go jako ostatnio użyty.
+
+        :param meta: metadane zwrócone przez lookup
+        :param revalidated: True, jeśli serwer potwierdził wpis odpowiedzią 304
+        :return: treść HTML lub None, jeśli plik zniknął z dysku
+        """
+        html_path, meta_path = self._paths(meta['key'])
+        try:
+            with gzip.open(html_path, 'rt', encoding='utf-8') as f:
+                html = f.read()
+            os.utime(html_path)
+        except OSError:
+            return None
+        if revalidated:
+            meta['stored_at'] = time.time()
+            self._write_json(meta_path, meta)
+        with self._lock:
+            if revalidated:
+                self.revalidated += 1
+            else:
+                self.hits += 1
+            self.bytes_saved += meta['size']
+        return html
+
+    def store(self, url, html, etag=None, last_modified=None):
+        """Zapisuje stronę w cache i w razie potrzeby usuwa stare wpisy."""
+        key = self._key(url)
+        html_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(html_path), exist_ok=True)
+        old_size = self._files_size(html_path, meta_path)
+
+        data = gzip.compress(html.encode('utf-8'))
+        tmp = f"{html_path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, html_path)
+        self._write_json(meta_path, {
+            'key': key,
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': time.time(),
+            'size': len(html.encode('utf-8')),
+        })
+
+        with self._lock:
+            self.total_bytes += self._files_size(html_path, meta_path) - old_size
+            over_limit = self.total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def _write_json(self, path, obj):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(obj, f)
+        os.replace(tmp, path)
+
+    def _files_size(self, *paths):
+        return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+    def evict(self, target_ratio=0.9):
+        """
+        Usuwa najdawniej używane wpisy, aż rozmiar cache spadnie
+        poniżej target_ratio * max_bytes.
+        """
+        with self._lock:
+            entries = []
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if name.endswith('.html.gz'):
+                        path = os.path.join(root, name)
+                        entries.append((os.path.getmtime(path), path))
+            entries.sort()
+            target = self.max_bytes * target_ratio
+            for _, html_path in entries:
+                if self.total_bytes <= target:
+                    break
+                meta_path = html_path[:-len('.html.gz')] + '.json'
+                freed = self._files_size(html_path, meta_path)
+                for path in (html_path, meta_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                self.total_bytes -= freed
+
+    def stats(self):
+        """Zwraca liczniki trafień, chybień, rewalidacji i zaoszczędzonych bajtów."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+                'bytes_saved': self.bytes_saved,
+                'total_bytes': self.total_bytes,
+            }
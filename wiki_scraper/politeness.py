@@ -0,0 +1,162 @@
+"""
+Adaptacyjne tempo zapytań do serwera wiki (zamiast stałego --wait).
+
+RateController ustala odstęp między początkami kolejnych zapytań metodą
+AIMD: szybkie odpowiedzi zmniejszają odstęp o stały krok (do dolnej
+granicy), a 429/503 i wyraźnie wolniejsze odpowiedzi mnożą go (do górnej
+granicy). Retry-After wstrzymuje wszystkie zapytania na wskazany czas.
+Kontroler jest pytany tylko przed zapytaniami wysyłanymi do sieci, więc
+strony z cache nie czekają.
+"""
+
+import threading
+import time
+from urllib.robotparser import RobotFileParser
+
+# Odpowiedzi oznaczające przeciążenie serwera
+OVERLOAD_STATUSES = {429, 503}
+
+
+class RateController:
+    """
+    Odstęp między zapytaniami dostosowywany do odpowiedzi serwera (AIMD).
+    Bezpieczny dla wątków – jeden obiekt ogranicza wszystkie wątki
+    pobierające.
+    """
+
+    def __init__(self, min_interval=0.0, max_interval=30.0, step=0.05,
+                 backoff=2.0, slow_factor=3.0, log=None, log_every=10.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        :param min_interval: dolna granica odstępu w sekundach (--wait)
+        :param max_interval: górna granica odstępu
+        :param step: o ile zmniejszać odstęp po szybkiej odpowiedzi
+        :param backoff: mnożnik odstępu po przeciążeniu
+        :param slow_factor: odpowiedź wolniejsza niż slow_factor razy
+                            typowe opóźnienie też zwiększa odstęp
+        :param log: funkcja wywoływana z opisem tempa co log_every sekund
+        :param log_every: jak często zapisywać tempo (sekundy)
+        :param clock: zegar monotoniczny (do testów)
+        :param sleep: funkcja czekania (do testów)
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.step = step
+        self.backoff = backoff
+        self.slow_factor = slow_factor
+        self.log = log
+        self.log_every = log_every
+        self.clock = clock
+        self.sleep = sleep
+        self.interval = min_interval
+        self.latency = None
+        self.history = []
+        self.requests = 0
+        self.slept = 0.0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+        self._pause_until = 0.0
+        self._started = clock()
+        self._window_start = self._started
+        self._window_requests = 0
+
+    def set_crawl_delay(self, delay):
+        """Podnosi dolną granicę odstępu do Crawl-delay z robots.txt."""
+        if delay:
+            with self._lock:
+                self.min_interval = max(self.min_interval, float(delay))
+                self.max_interval = max(self.max_interval, self.min_interval)
+                self.interval = max(self.interval, self.min_interval)
+
+    def wait(self):
+        """
+        Czeka, aż można wysłać kolejne zapytanie, i rezerwuje jego termin.
+
+        :return: czas oczekiwania w sekundach
+        """
+        with self._lock:
+            now = self.clock()
+            start = max(now, self._next_start, self._pause_until)
+            self._next_start = start + self.interval
+            self.requests += 1
+            self._window_requests += 1
+            self._maybe_log(now)
+        delay = start - now
+        if delay > 0:
+            self.sleep(delay)
+            with self._lock:
+                self.slept += delay
+        return max(delay, 0.0)
+
+    def on_response(self, latency, status=200, retry_after=None):
+        """
+        Dostosowuje odstęp do odpowiedzi.
+
+        :param latency: czas odpowiedzi w sekundach (None dla błędu sieci)
+        :param status: kod HTTP (None dla błędu sieci)
+        :param retry_after: opóźnienie z nagłówka Retry-After (sekundy)
+        """
+        with self._lock:
+            overloaded = status in OVERLOAD_STATUSES or status is None
+            if latency is not None and not overloaded:
+                typical = self.latency
+                if typical is not None and latency > self.slow_factor * max(
+                        typical, 0.01):
+                    overloaded = True
+                # Średnia wykładnicza typowego opóźnienia
+                self.latency = (latency if typical is None
+                                else 0.8 * typical + 0.2 * latency)
+            if overloaded:
+                self.interval = min(self.max_interval,
+                                    max(self.interval * self.backoff,
+                                        self.step, self.min_interval))
+            else:
+                self.interval = max(self.min_interval,
+                                    self.interval - self.step)
+            if retry_after:
+                self._pause_until = max(self._pause_until,
+                                        self.clock() + retry_after)
+
+    def _maybe_log(self, now):
+        elapsed = now - self._window_start
+        if elapsed < self.log_every:
+            return
+        rate = self._window_requests / elapsed
+        self.history.append((now - self._started, rate, self.interval))
+        self._window_start = now
+        self._window_requests = 0
+        if self.log is not None:
+            self.log(f"Tempo: {rate:.2f} zapytań/s, odstęp"
+                     f" {self.interval:.2f} s")
+
+    def summary(self):
+        """Opis łącznego tempa do wypisania po zakończeniu."""
+        elapsed = max(self.clock() - self._started, 1e-9)
+        return (f"Zapytania: {self.requests} ({self.requests / elapsed:.2f}/s),"
+                f" łączne oczekiwanie {self.slept:.1f} s, końcowy odstęp"
+                f" {self.interval:.2f} s")
+
+
+def robots_crawl_delay(base_url, fetcher, user_agent='*'):
+    """
+    Odczytuje Crawl-delay (lub Request-rate) z robots.txt wiki.
+
+    :param base_url: bazowy adres wiki
+    :param fetcher: PageFetcher
+    :param user_agent: agent, dla którego szukać reguł
+    :return: odstęp w sekundach lub None, jeśli robots.txt go nie podaje
+    """
+    try:
+        response = fetcher.get(f"{base_url.rstrip('/')}/robots.txt")
+    except Exception:
+        return None
+    if response.status_code != 200:
+        return None
+    parser = RobotFileParser()
+    parser.parse(response.text.splitlines())
+    delay = parser.crawl_delay(user_agent)
+    if delay is None:
+        rate = parser.request_rate(user_agent)
+        if rate is not None and rate.requests:
+            delay = rate.seconds / rate.requests
+    return float(delay) if delay is not None else None
@@ -1,8 +1,54 @@
-import requests
 from bs4 import BeautifulSoup
+from bs4.element import NavigableString, Tag
+from collections import namedtuple
 import re
 from urllib.parse import urljoin
 
+import fast_parser
+import metrics
+from fetcher import get_default_fetcher
+
+# Klasa diva z treścią artykułu (zazwyczaj mw-content-ltr lub mw-content-rtl)
+CONTENT_CLASS_RE = re.compile(r'mw-content-?(ltr|rtl)?')
+
+# Wynik jednokrotnego przejścia po stronie (zob. WikiScraper.extract).
+# W trybie parser='lxml' pole tables zawiera elementy lxml, zamieniane
+# na BeautifulSoup dopiero w get_table.
+PageExtract = namedtuple('PageExtract',
+                         ['full_text', 'first_paragraph', 'links', 'tables'])
+
+
+def _is_content_class(classes):
+    """Czy lista klas pasuje do diva z treścią (jak find(class_=CONTENT_CLASS_RE))."""
+    if not classes:
+        return False
+    if isinstance(classes, str):
+        classes = [classes]
+    return (any(CONTENT_CLASS_RE.search(c) for c in classes)
+            or CONTENT_CLASS_RE.search(' '.join(classes)) is not None)
+
+
+def _is_content_div(tag):
+    """Czy tag to div z treścią artykułu."""
+    return _is_content_class(tag.get('class'))
+
+
+def _subtree_end(tag):
+    """Zwraca pierwszy węzeł dokumentu leżący za poddrzewem tagu."""
+    node = tag
+    while node is not None and node.next_sibling is None:
+        node = node.parent
+    return node.next_sibling if node is not None else None
+
+
+def build_page_url(base_url, page_title):
+    """
+    Tworzy pełny URL artykułu (zamienia spacje na podkreślenia,
+    a '?' – który zacząłby zapytanie – na %3F).
+    """
+    title_underscore = page_title.replace(' ', '_').replace('?', '%3F')
+    return f"{base_url.rstrip('/')}/wiki/{title_underscore}"
+
 
 class WikiScraper:
     """
@@ -11,7 +57,8 @@ class WikiScraper:
     """
 
     def __init__(self, base_url, page_title,
-                 use_local_file=False, local_file_path=None):
+                 use_local_file=False, local_file_path=None, fetcher=None,
+                 parser='bs4', html=None):
         """
         Inicjalizuje scraper i ładuje stronę.
 
@@ -19,47 +66,166 @@ class WikiScraper:
         :param page_title: tytuł artykułu (może zawierać spacje)
         :param use_local_file: czy używać pliku lokalnego zamiast HTTP
         :param local_file_path: ścieżka do lokalnego pliku HTML
+        :param fetcher: obiekt PageFetcher (domyślnie współdzielony
+                        fetcher z modułu fetcher)
+        :param parser: 'bs4' – pełne drzewo BeautifulSoup (domyślnie),
+                       'lxml' – szybki tryb: drzewo lxml, z którego obiekty
+                       Pythona powstają tylko dla treści i linków
+        :param html: gotowa treść HTML (wtedy strona nie jest pobierana)
         """
+        if parser not in ('bs4', 'lxml'):
+            raise Exception(f"Nieznany parser: {parser}")
         self.base_url = base_url.rstrip('/')
         self.page_title = page_title
         self.use_local_file = use_local_file
         self.local_file_path = local_file_path
-        self.soup = None
+        self.fetcher = fetcher
+        self.parser = parser
+        self._soup = None
+        self._html = None
+        self._root = None
+        self._extract = None
         self.page_url = self._build_page_url()
-        self._load_page()
+        self._load_page(html)
+
+    @property
+    def soup(self):
+        """
+        Drzewo BeautifulSoup strony. W trybie parser='lxml' budowane
+        dopiero przy pierwszym odwołaniu.
+        """
+        if self._soup is None and self._html is not None:
+            self._soup = BeautifulSoup(self._html, 'lxml')
+        return self._soup
+
+    @soup.setter
+    def soup(self, value):
+        self._soup = value
 
     def _build_page_url(self):
-        """Tworzy pełny URL artykułu (zamienia spacje na podkreślenia)."""
-        title_underscore = self.page_title.replace(' ', '_')
-        return f"{self.base_url}/wiki/{title_underscore}"
+        """Tworzy pełny URL artykułu (zob. build_page_url)."""
+        return build_page_url(self.base_url, self.page_title)
 
-    def _load_page(self):
+    def _load_page(self, html=None):
         """
-        Ładuje stronę – albo z pliku lokalnego, albo przez HTTP.
-        Ustawia atrybut self.soup (obiekt BeautifulSoup).
+        Ładuje stronę – albo z pliku lokalnego, albo przez HTTP
+        (przez współdzielony PageFetcher z pulą połączeń).
+        Ustawia atrybut self.soup (obiekt BeautifulSoup) lub, w trybie
+        parser='lxml', drzewo lxml.
         """
-        if self.use_local_file:
-            with open(self.local_file_path, 'r', encoding='utf-8') as f:
-                html = f.read()
+        if html is None:
+            if self.use_local_file:
+                with open(self.local_file_path, 'r', encoding='utf-8') as f:
+                    html = f.read()
+            else:
+                fetcher = self.fetcher or get_default_fetcher()
+                html = fetcher.fetch_html(self.page_url, self.page_title)
+        with metrics.stage('parse'):
+            if self.parser == 'lxml':
+                self._root = fast_parser.parse_html(html)
+                if self._root is not None:
+                    self._html = html
+                    return
             self.soup = BeautifulSoup(html, 'lxml')
+
+    def extract(self):
+        """
+        Jednym przejściem po dokumencie wyodrębnia tekst artykułu,
+        pierwszy paragraf, linki wewnętrzne i listę tabel.
+        Wynik jest zapamiętywany, więc kolejne metody get_* nie przechodzą
+        ponownie po drzewie.
+
+        :return: PageExtract(full_text, first_paragraph, links, tables)
+        """
+        if self._extract is None:
+            with metrics.stage('extract'):
+                if self._root is not None:
+                    self._extract = self._extract_lxml()
+                if self._extract is None:
+                    self._extract = self._extract_soup()
+        return self._extract
+
+    def _extract_soup(self):
+        """Odpowiednik extract() dla drzewa BeautifulSoup."""
+        content_div = None
+        content_end = None
+        in_content = False
+        string_types = None
+        texts = []
+        paragraphs = []
+        tables = []
+        hrefs = []
+
+        for node in self.soup.descendants:
+            if in_content and node is content_end:
+                in_content = False
+            if isinstance(node, Tag):
+                name = node.name
+                if name == 'div' and content_div is None \
+                        and _is_content_div(node):
+                    content_div = node
+                    content_end = _subtree_end(node)
+                    in_content = True
+                    string_types = (node.interesting_string_types
+                                    or Tag.MAIN_CONTENT_STRING_TYPES)
+                    if isinstance(string_types, type):
+                        string_types = (string_types,)
+                elif name == 'table':
+                    tables.append(node)
+                elif name == 'a':
+                    href = node.get('href')
+                    if href is not None:
+                        hrefs.append(href)
+                elif name == 'p' and in_content:
+                    paragraphs.append(node)
+            elif in_content and isinstance(node, NavigableString) \
+                    and type(node) in string_types:
+                stripped = node.strip()
+                if stripped:
+                    texts.append(stripped)
+
+        if content_div is not None:
+            full_text = ' '.join(texts)
         else:
-            response = requests.get(self.page_url)
-            if response.status_code == 404:
-                raise Exception(f"Artykuł '{self.page_title}' nie istnieje (404).")
-            response.raise_for_status()
-            self.soup = BeautifulSoup(response.text, 'lxml')
+            # Brak diva z treścią – tak jak wcześniej bierzemy całe <body>
+            full_text = self.soup.body.get_text(separator=' ', strip=True)
+            paragraphs = self.soup.body.find_all('p', recursive=True)
 
-    def get_first_paragraph(self):
+        return PageExtract(
+            full_text=full_text,
+            first_paragraph=self._first_paragraph(paragraphs),
+            links=self._internal_links(hrefs),
+            tables=tables,
+        )
+
+    def _extract_lxml(self):
         """
-        Zwraca tekst pierwszego niepustego paragrafu w głównej treści artykułu.
+        Odpowiednik extract() dla drzewa lxml. Zwraca None, gdy strona nie ma
+        diva z treścią – wtedy używana jest ścieżka BeautifulSoup.
         """
-        # Znajdź div z treścią (klasa zazwyczaj mw-content-ltr lub mw-content-rtl)
-        content_div = self.soup.find('div',
-                                     class_=re.compile(r'mw-content-?(ltr|rtl)?'))
-        if not content_div:
-            content_div = self.soup.body
+        root = self._root
+        content_div = fast_parser.find_content_div(root, _is_content_class)
+        if content_div is None:
+            return None
 
-        paragraphs = content_div.find_all('p', recursive=True)
+        first_paragraph = ""
+        for p in content_div.iter('p'):
+            text = fast_parser.get_text(p)
+            if text and not fast_parser.has_table_ancestor(p):
+                first_paragraph = text
+                break
+
+        hrefs = [a.get('href') for a in root.iter('a')
+                 if a.get('href') is not None]
+        return PageExtract(
+            full_text=fast_parser.get_text(content_div),
+            first_paragraph=first_paragraph,
+            links=self._internal_links(hrefs),
+            tables=list(root.iter('table')),
+        )
+
+    def _first_paragraph(self, paragraphs):
+        """Zwraca tekst pierwszego niepustego paragrafu spoza tabel."""
         for p in paragraphs:
             text = p.get_text(separator=' ', strip=True)
             # Pomijamy puste oraz paragrafy wewnątrz tabel (często szablony)
@@ -67,16 +233,53 @@ class WikiScraper:
                 return text
         return ""
 
+    def _internal_links(self, hrefs):
+        """Zamienia adresy href na tytuły artykułów wewnętrznych."""
+        links = []
+        for href in hrefs:
+            # Link zaczyna się od /wiki/ i nie zawiera dwukropka poza tym prefixem
+            if href.startswith('/wiki/') and ':' not in href.split('/wiki/')[1]:
+                if '/.' in href:
+                    # Segmenty '.' i '..' rozwiązuje dopiero urljoin
+                    href = urljoin(self.base_url, href)
+                path = href.split('/wiki/')[-1]
+                title = path.replace('_', ' ')
+                links.append(title)
+        return links
+
+    def get_first_paragraph(self):
+        """
+        Zwraca tekst pierwszego niepustego paragrafu w głównej treści artykułu.
+        """
+        return self.extract().first_paragraph
+
     def get_full_text(self):
         """
         Zwraca cały tekst artykułu (bez elementów stałych strony,
         takich jak menu, stopka itp.).
         """
-        content_div = self.soup.find('div',
-                                     class_=re.compile(r'mw-content-?(ltr|rtl)?'))
-        if content_div:
-            return content_div.get_text(separator=' ', strip=True)
-        return self.soup.body.get_text(separator=' ', strip=True)
+        return self.extract().full_text
+
+    def iter_text_chunks(self):
+        """
+        Zwraca kolejne fragmenty tekstu artykułu (węzły tekstowe regionu
+        treści) bez sklejania ich w jeden napis; ' '.join(fragmentów)
+        daje dokładnie get_full_text(). Każde wywołanie zwraca nowy
+        generator, więc tekst można przejść kilka razy.
+        """
+        if self._extract is not None:
+            yield self._extract.full_text
+            return
+        if self._root is not None:
+            content_div = fast_parser.find_content_div(self._root,
+                                                       _is_content_class)
+            if content_div is not None:
+                yield from fast_parser.iter_stripped_strings(content_div)
+                return
+        content_div = self.soup.find('div', class_=CONTENT_CLASS_RE)
+        if content_div is None:
+            content_div = self.soup.body
+        yield from content_div.stripped_strings
 
     def get_table(self, table_index):
         """
@@ -86,10 +289,13 @@ class WikiScraper:
         :return: obiekt BeautifulSoup reprezentujący tabelę
         :raises Exception: jeśli tabela o podanym indeksie nie istnieje
         """
-        tables = self.soup.find_all('table')
+        tables = self.extract().tables
         if not tables or table_index > len(tables):
             raise Exception(f"Tabela nr {table_index} nie istnieje.")
-        return tables[table_index - 1]
+        table = tables[table_index - 1]
+        if not isinstance(table, Tag):
+            table = fast_parser.table_to_soup(table)
+        return table
 
     def extract_table_data(self, table_soup, first_row_is_header=False):
         """
@@ -123,18 +329,25 @@ class WikiScraper:
         # pierwszy wiersz pozostanie nagłówkiem – nic nie zmieniamy.
         return rows
 
+    def get_canonical_title(self):
+        """
+        Zwraca tytuł z <link rel="canonical"> (dla przekierowań MediaWiki
+        jest to tytuł strony docelowej) lub None, jeśli go nie ma.
+        """
+        if self._root is not None:
+            hrefs = [link.get('href') for link in self._root.iter('link')
+                     if 'canonical' in (link.get('rel') or '').split()]
+        else:
+            hrefs = [link.get('href')
+                     for link in self.soup.find_all('link', rel='canonical')]
+        for href in hrefs:
+            if href and '/wiki/' in href:
+                return href.split('/wiki/', 1)[1].replace('_', ' ')
+        return None
+
     def get_all_links(self):
         """
         Zwraca listę tytułów artykułów wewnętrznych (wewnętrznych linków wiki)
         znalezionych na stronie. Pomija linki do plików, kategorii itp.
         """
-        links = []
-        for a in self.soup.find_all('a', href=True):
-            href = a['href']
-            # Link zaczyna się od /wiki/ i nie zawiera dwukropka poza tym prefixem
-            if href.startswith('/wiki/') and ':' not in href.split('/wiki/')[1]:
-                full_url = urljoin(self.base_url, href)
-                path = full_url.split('/wiki/')[-1]
-                title = path.replace('_', ' ')
-                links.append(title)
-        return links
+        return list(self.extract().links)
@@ -0,0 +1,159 @@
+"""
+Wiele komend na jednym, „ciepłym” stanie: tryb wsadowy (--batch)
+i lokalny serwer HTTP (--serve).
+
+Pojedyncze wywołanie CLI za każdym razem importuje biblioteki, otwiera
+połączenia, wczytuje magazyn liczników i indeks języka. Sesja robi to
+raz: komendy (w składni CLI, np. ``--summary Pikachu``) korzystają ze
+wspólnego fetchera (pula połączeń keep-alive), licznika słów w pamięci
+i otwartego indeksu języka, więc koszt komendy to tylko jej właściwa
+praca. Opcje globalne (źródło, cache, magazyn liczników, parser) obowiązują
+z wywołania, które uruchomiło sesję.
+
+Serwer wykonuje komendę przesłaną w treści zapytania POST i zwraca jej
+wyjście jako tekst::
+
+    curl --data '--summary Pikachu' http://127.0.0.1:8000/
+
+Zapytania obsługiwane są po kolei (HTTPServer bez wątków) – licznik słów
+nie jest bezpieczny dla wątków, a wyjście komend jest przechwytywane
+przez podmianę sys.stdout.
+"""
+
+import argparse
+import contextlib
+import io
+import shlex
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class LineArgumentParser(argparse.ArgumentParser):
+    """Parser komend sesji: błąd zgłasza wyjątkiem zamiast kończyć program."""
+
+    def error(self, message):
+        raise Exception(message)
+
+    def exit(self, status=0, message=None):
+        raise Exception(message.strip() if message else
+                        f"Komenda zakończona (kod {status})")
+
+
+class Session:
+    """Wspólny stan komend wykonywanych w trybie --batch lub --serve."""
+
+    def __init__(self, parser, execute, word_counter, language_code='en',
+                 index=None):
+        """
+        :param parser: parser linii komend (LineArgumentParser)
+        :param execute: funkcja execute(args, session) wykonująca
+                        sparsowaną komendę
+        :param word_counter: licznik słów wspólny dla wszystkich komend
+                             (zamykany razem z sesją)
+        :param language_code: język indeksu częstotliwości dla analizy
+        :param index: gotowy indeks języka (LanguageIndex); domyślnie
+                      otwierany przy pierwszej analizie
+        """
+        self.parser = parser
+        self.execute = execute
+        self.word_counter = word_counter
+        self.language_code = language_code
+        self.commands = 0
+        self._index = index
+
+    @property
+    def index(self):
+        """Indeks języka (LanguageIndex) otwierany przy pierwszej analizie."""
+        if self._index is None:
+            from language_index import LanguageIndex
+            self._index = LanguageIndex(self.language_code)
+        return self._index
+
+    def run(self, line):
+        """
+        Wykonuje jedną komendę w składni CLI.
+
+        :param line: linia komendy, np. '--count-words "Mr. Mime"'
+        :raises Exception: przy błędnej komendzie lub błędzie wykonania
+        """
+        args = self.parser.parse_args(shlex.split(line))
+        self.execute(args, self)
+        self.commands += 1
+
+    def close(self):
+        """Zapisuje liczniki słów i zamyka indeks języka."""
+        self.word_counter.close()
+        if self._index is not None:
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def run_batch(session, path):
+    """
+    Wykonuje komendy z pliku (path '-' – ze standardowego wejścia),
+    po jednej w linii. Puste linie i linie zaczynające się od '#' są
+    pomijane, a błąd komendy jest wypisywany i nie przerywa reszty.
+
+    :return: liczba komend zakończonych błędem
+    """
+    errors = 0
+    with (contextlib.nullcontext(sys.stdin) if path == '-'
+          else open(path, 'r', encoding='utf-8')) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                session.run(line)
+            except Exception as e:
+                print(f"Błąd w linii {number}: {e}", file=sys.stderr)
+                errors += 1
+            sys.stdout.flush()
+    return errors
+
+
+class SessionHandler(BaseHTTPRequestHandler):
+    """Wykonuje komendę z treści zapytania POST (atrybut klasy session)."""
+
+    session = None
+    protocol_version = 'HTTP/1.1'
+    # Nagłówki i treść idą osobnymi zapisami – bez Nagle'a nie czekają
+    # na opóźnione potwierdzenie przy połączeniach keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        line = self.rfile.read(length).decode('utf-8')
+        output = io.StringIO()
+        status = 200
+        try:
+            with contextlib.redirect_stdout(output):
+                self.session.run(line)
+        except Exception as e:
+            output.write(f"Błąd: {e}\n")
+            status = 400
+        body = output.getvalue().encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_session(session, host='127.0.0.1', port=0):
+    """
+    Tworzy serwer HTTP sesji (uruchamiany przez serve_forever()).
+
+    :param port: port nasłuchiwania (0 – dowolny wolny)
+    :return: obiekt HTTPServer; port w server.server_port
+    """
+    handler = type('Handler', (SessionHandler,), {'session': session})
+    return HTTPServer((host, port), handler)
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Lokalna, generowana wiki w układzie MediaWiki do testów obciążeniowych
+przeszukiwania bez sieci.
+
+Serwer udostępnia /wiki/<tytuł> (HTML z divem mw-content-ltr, paskiem
+nawigacji i <link rel="canonical">), /w/api.php (wikitekst i linki, jak
+dla --source api) oraz /robots.txt. Graf linków, rozmiary stron, rozkład
+opóźnień, odsetek błędów 503 i odpowiedzi 429 oraz przekierowania są
+konfigurowalne, a treść stron zależy tylko od ziarna – ta sama
+konfiguracja daje zawsze tę samą wiki.
+
+Przykład:
+    python3 synthetic_wiki.py --pages 5000 --port 8080 --latency-ms 20
+    python3 wiki_scraper.py --auto-count-words "Page 0" --depth 2 --wait 0 \\
+        --base-url http://127.0.0.1:8080
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, urlsplit, parse_qs
+
+WORDS = ("pokemon trainer team rocket battle type evolution move ability "
+         "kanto johto hoenn sinnoh region gym leader badge league champion "
+         "attack defense speed special wild route city town forest cave "
+         "anime manga game generation item berry stone egg shiny legendary "
+         "aleję zażółć gęślą jaźń über café naïve").split()
+
+
+class SyntheticWiki:
+    """
+    Opis generowanej wiki: strony 'Page 0' … 'Page n-1' i przekierowania
+    'Alias <i>' do strony 'Page <i>'.
+    """
+
+    def __init__(self, n_pages=1000, links_per_page=30, skew=2.0,
+                 sections=10, size_sigma=0.5, nav_links=20, latency_ms=0.0,
+                 latency_sigma=0.5, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1, alias_rate=0.0, seed=0):
+        """
+        :param n_pages: liczba artykułów
+        :param links_per_page: średnia liczba linków w treści strony
+        :param skew: skośność wyboru celów linków (1 – równomiernie,
+                     większe – więcej linków do stron o niskich numerach,
+                     jak do popularnych artykułów)
+        :param sections: mediana liczby sekcji strony (ok. 0,9 KB HTML
+                         na sekcję)
+        :param size_sigma: rozrzut rozmiaru stron (sigma rozkładu
+                           logarytmiczno-normalnego)
+        :param nav_links: liczba linków nawigacyjnych na każdej stronie
+                          (do pierwszych stron wiki, poza treścią)
+        :param latency_ms: mediana opóźnienia odpowiedzi w ms
+        :param latency_sigma: rozrzut opóźnienia (rozkład
+                              logarytmiczno-normalny)
+        :param error_rate: odsetek odpowiedzi 503
+        :param throttle_rate: odsetek odpowiedzi 429 z Retry-After
+        :param retry_after: wartość nagłówka Retry-After (sekundy)
+        :param alias_rate: odsetek linków prowadzących przez
+                           przekierowanie 'Alias <i>'
+        :param seed: ziarno generatora treści
+        """
+        self.n_pages = n_pages
+        self.links_per_page = links_per_page
+        self.skew = skew
+        self.sections = sections
+        self.size_sigma = size_sigma
+        self.nav_links = min(nav_links, n_pages)
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.alias_rate = alias_rate
+        self.seed = seed
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def title(i):
+        """Tytuł i-tej strony."""
+        return f"Page {i}"
+
+    def resolve(self, title):
+        """
+        Zwraca (numer strony, czy to przekierowanie) albo (None, False)
+        dla tytułu spoza wiki.
+        """
+        name, _, number = title.replace('_', ' ').rpartition(' ')
+        if name not in ('Page', 'Alias') or not number.isdigit():
+            return None, False
+        i = int(number)
+        if i >= self.n_pages or number != str(i):
+            return None, False
+        return i, name == 'Alias'
+
+    def _page_rng(self, i):
+        return random.Random(self.seed * 1000003 + i)
+
+    def _body(self, i):
+        """
+        Treść strony: lista sekcji (nagłówek, paragrafy), a paragraf
+        to lista słów i linków – ('w', tekst) lub ('l', tytuł).
+        """
+        rng = self._page_rng(i)
+        n_sections = max(1, round(self.sections * rng.lognormvariate(
+            0, self.size_sigma)))
+        n_links = max(0, round(rng.gauss(self.links_per_page,
+                                         self.links_per_page / 4)))
+        link_slots = Counter(rng.randrange(n_sections * 3)
+                             for _ in range(n_links))
+        sections = []
+        for s in range(n_sections):
+            paragraphs = []
+            for p in range(3):
+                tokens = [('w', ' '.join(rng.choice(WORDS)
+                                         for _ in range(40)))]
+                for _ in range(link_slots[s * 3 + p]):
+                    target = int(self.n_pages * rng.random() ** self.skew)
+                    prefix = ('Alias' if rng.random() < self.alias_rate
+                              else 'Page')
+                    tokens.append(('l', f"{prefix} {target}"))
+                    tokens.append(('w', ' '.join(rng.choice(WORDS)
+                                                 for _ in range(5))))
+                paragraphs.append(tokens)
+            heading = ' '.join(rng.choice(WORDS) for _ in range(3)).title()
+            sections.append((heading, paragraphs))
+        return sections
+
+    def links(self, i):
+        """Linki z treści strony (bez nawigacji), w kolejności."""
+        return [value for _, paragraphs in self._body(i)
+                for tokens in paragraphs
+                for kind, value in tokens if kind == 'l']
+
+    def html(self, i):
+        """Strona HTML w układzie MediaWiki."""
+        title = self.title(i)
+        url_title = title.replace(' ', '_')
+        nav = ''.join(
+            f'<li><a href="/wiki/{self.title(j).replace(" ", "_")}">'
+            f'{self.title(j)}</a></li>' for j in range(self.nav_links))
+        parts = [
+            '<!DOCTYPE html><html><head><meta charset="utf-8">'
+            f'<title>{title} - Synthetic Wiki</title>'
+            f'<link rel="canonical" href="/wiki/{url_title}">'
+            '<script>var wgPageName="' + url_title + '";</script>'
+            '</head><body>'
+            f'<div id="mw-navigation"><ul>{nav}</ul>'
+            '<a href="/wiki/Special:Random">Random</a></div>'
+            f'<h1 id="firstHeading">{title}</h1>'
+            '<div id="mw-content-text" class="mw-body-content">'
+            '<div class="mw-content-ltr mw-parser-output" lang="en">'
+        ]
+        for heading, paragraphs in self._body(i):
+            parts.append(f'<h2><span class="mw-headline">{escape(heading)}'
+                         f'</span></h2>')
+            for tokens in paragraphs:
+                parts.append('<p>')
+                for kind, value in tokens:
+                    if kind == 'w':
+                        parts.append(f'{escape(value)} ')
+                    else:
+                        href = value.replace(' ', '_')
+                        parts.append(f'<a href="/wiki/{href}" title="{value}">'
+                                     f'{value}</a> ')
+                parts.append('</p>')
+        parts.append('<p><a href="/wiki/File:Image.png" class="image">'
+                     '<img alt="" src="/images/Image.png"></a></p>'
+                     '</div></div><div id="catlinks">'
+                     '<a href="/wiki/Category:Synthetic">Synthetic</a></div>'
+                     '<div id="footer">Synthetic Wiki</div></body></html>')
+        return ''.join(parts)
+
+    def wikitext(self, i):
+        """Źródło strony (wikitekst) z tymi samymi słowami i linkami."""
+        parts = []
+        for heading, paragraphs in self._body(i):
+            parts.append(f"== {heading} ==\n")
+            for tokens in paragraphs:
+                parts.append(' '.join(value if kind == 'w' else f"[[{value}]]"
+                                      for kind, value in tokens))
+                parts.append('\n\n')
+        parts.append("[[File:Image.png|thumb]]\n[[Category:Synthetic]]\n")
+        return ''.join(parts)
+
+    def delay(self):
+        """Losuje opóźnienie odpowiedzi w sekundach."""
+        if self.latency_ms <= 0:
+            return 0.0
+        with self._lock:
+            return self._rng.lognormvariate(math.log(self.latency_ms),
+                                            self.latency_sigma) / 1000
+
+    def failure(self):
+        """Losuje kod błędu (429 lub 503) albo None dla zwykłej odpowiedzi."""
+        with self._lock:
+            r = self._rng.random()
+        if r < self.throttle_rate:
+            return 429
+        if r < self.throttle_rate + self.error_rate:
+            return 503
+        return None
+
+    def record(self, status, size):
+        """Zapisuje statystyki odpowiedzi."""
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += size
+            self.stats[status] += 1
+
+    def api_response(self, query, links_per_response=500):
+        """
+        Odpowiedź api.php (action=query, prop=revisions|links,
+        formatversion=2) z rozwiązywaniem przekierowań i kontynuacją
+        listy linków.
+        """
+        requested = query['titles'][0].split('|')
+        redirects = []
+        titles = []
+        missing = []
+        for title in requested:
+            i, alias = self.resolve(title)
+            if i is None:
+                missing.append(title)
+                continue
+            if alias:
+                redirects.append({'from': title, 'to': self.title(i)})
+            titles.append(i)
+        titles = list(dict.fromkeys(titles))
+        all_links = [(i, link) for i in titles for link in self.links(i)]
+        offset = int(query.get('plcontinue', ['0'])[0])
+        end = offset + links_per_response
+        pages = {}
+        if offset == 0:
+            for title in missing:
+                pages[title] = {'title': title, 'missing': True}
+            for i in titles:
+                pages[i] = {'title': self.title(i), 'ns': 0, 'revisions': [
+                    {'slots': {'main': {'content': self.wikitext(i)}}}]}
+        for i, link in all_links[offset:end]:
+            page = pages.setdefault(i, {'title': self.title(i), 'ns': 0})
+            page.setdefault('links', []).append({'ns': 0, 'title': link})
+        data = {'query': {'pages': list(pages.values())}}
+        if redirects:
+            data['query']['redirects'] = redirects
+        if end < len(all_links):
+            data['continue'] = {'plcontinue': str(end), 'continue': '||'}
+        return json.dumps(data)
+
+
+class SyntheticWikiHandler(BaseHTTPRequestHandler):
+    """Obsługa zapytań do SyntheticWiki (atrybut klasy wiki)."""
+
+    wiki = None
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8',
+              headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.wiki.record(status, len(body))
+
+    def do_GET(self):
+        wiki = self.wiki
+        url = urlsplit(self.path)
+        if url.path == '/robots.txt':
+            self._send(200, b"User-agent: *\nDisallow: /w/index.php\n",
+                       'text/plain')
+            return
+        delay = wiki.delay()
+        if delay:
+            time.sleep(delay)
+        status = wiki.failure()
+        if status is not None:
+            headers = ([('Retry-After', str(wiki.retry_after))]
+                       if status == 429 else [])
+            self._send(status, headers=headers)
+            return
+        if url.path.startswith('/wiki/'):
+            i, _ = wiki.resolve(unquote(url.path[len('/wiki/'):]))
+            if i is None:
+                self._send(404, b'<html><body>Brak strony</body></html>')
+                return
+            # Przekierowanie jak w MediaWiki: treść celu z jego
+            # adresem kanonicznym
+            self._send(200, wiki.html(i).encode('utf-8'))
+        elif url.path == '/w/api.php':
+            body = wiki.api_response(parse_qs(url.query))
+            self._send(200, body.encode('utf-8'), 'application/json')
+        else:
+            self._send(404)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_handler(handler, host='127.0.0.1', port=0):
+    """
+    Uruchamia w wątku w tle serwer HTTP z podaną klasą obsługi
+    (np. zastępczym serwerem w testach).
+
+    :return: krotka (serwer, adres http://host:port); serwer zatrzymuje
+             server.shutdown() i server.server_close()
+    """
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def wiki_handler(wiki):
+    """Klasa obsługi (SyntheticWikiHandler) serwująca podaną wiki."""
+    return type('Handler', (SyntheticWikiHandler,), {'wiki': wiki})
+
+
+def serve(wiki, host='127.0.0.1', port=0):
+    """
+    Uruchamia serwer wiki w wątku w tle (zob. serve_handler).
+
+    :return: krotka (serwer, bazowy adres wiki)
+    """
+    return serve_handler(wiki_handler(wiki), host, port)
+
+
+def add_wiki_arguments(parser):
+    """Dodaje do parsera opcje konfiguracji SyntheticWiki."""
+    parser.add_argument('--pages', type=int, default=1000,
+                        help='Liczba artykułów')
+    parser.add_argument('--links', type=int, default=30,
+                        help='Średnia liczba linków w treści strony')
+    parser.add_argument('--skew', type=float, default=2.0,
+                        help='Skośność celów linków (1 – równomiernie)')
+    parser.add_argument('--sections', type=int, default=10,
+                        help='Mediana liczby sekcji strony (rozmiar)')
+    parser.add_argument('--nav-links', type=int, default=20,
+                        help='Linki nawigacyjne na każdej stronie')
+    parser.add_argument('--latency-ms', type=float, default=0.0,
+                        help='Mediana opóźnienia odpowiedzi w ms')
+    parser.add_argument('--latency-sigma', type=float, default=0.5,
+                        help='Rozrzut opóźnienia (log-normalny)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Odsetek odpowiedzi 503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Odsetek odpowiedzi 429')
+    parser.add_argument('--retry-after', type=int, default=1,
+                        help='Retry-After odpowiedzi 429 (sekundy)')
+    parser.add_argument('--alias-rate', type=float, default=0.0,
+                        help='Odsetek linków przez przekierowania')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def wiki_from_args(args):
+    """Tworzy SyntheticWiki z opcji dodanych przez add_wiki_arguments."""
+    return SyntheticWiki(n_pages=args.pages, links_per_page=args.links,
+                         skew=args.skew, sections=args.sections,
+                         nav_links=args.nav_links,
+                         latency_ms=args.latency_ms,
+                         latency_sigma=args.latency_sigma,
+                         error_rate=args.error_rate,
+                         throttle_rate=args.throttle_rate,
+                         retry_after=args.retry_after,
+                         alias_rate=args.alias_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Lokalna generowana wiki do testów obciążeniowych')
+    add_wiki_arguments(parser)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    server, base_url = serve(wiki_from_args(args), args.host, args.port)
+    print(f"Wiki dostępna pod {base_url} (strona startowa: /wiki/Page_0)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
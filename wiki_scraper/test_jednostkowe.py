@@ -1,8 +1,176 @@
 import unittest
+from unittest import mock
+import bz2
+import gzip
 import os
 import tempfile
+import threading
+import contextlib
+import io
+import requests
+import glob
+import hashlib
+import json
+import math
+import random
+import re
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import unquote, urlsplit, parse_qs
 from scraper import WikiScraper
-from word_counter import WordCounter
+from word_counter import (WordCounter, split_chunk, hash_chunks,
+                          count_texts_parallel, count_files_parallel)
+from crawler import AsyncCrawler
+from crawl_state import CrawlState
+from dedup import normalize_title, VisitedSet
+from fetcher import PageFetcher
+from page_cache import PageCache
+from word_store import JsonStore, SqliteStore, BinaryStore
+from compact_vocab import CompactCounts
+from language_index import LanguageIndex, build_index
+from language_analyzer import LanguageAnalyzer
+from heavy_hitters import SpaceSaving, ApproxWordCounter
+from mediawiki_api import MediaWikiAPI, ApiScraper, ApiPage
+from wikitext import strip_wikitext, split_sections
+from dump_reader import ingest_dump
+from politeness import RateController, robots_crawl_delay
+from frontier import PriorityFrontier, CrawlBudget
+from synthetic_wiki import SyntheticWiki, serve_handler, wiki_handler
+import metrics
+from benchmark import bench_startup
+from session import run_batch, serve_session
+import wiki_scraper
+
+
+# Mały graf linków serwowany przez lokalny serwer testowy
+GRAPH = {
+    "Start": ["A", "B", "C"],
+    "A": ["B", "D", "Start"],
+    "B": ["E", "Brak"],
+    "C": ["F", "A"],
+    "D": ["G"],
+    "E": ["G", "H"],
+    "F": [],
+    "G": ["Start"],
+    "H": [],
+}
+
+
+def make_page(title, links):
+    """Buduje prostą stronę w stylu MediaWiki."""
+    anchors = ''.join(f'<a href="/wiki/{link}">{link}</a> ' for link in links)
+    return (f'<html><body><div class="mw-content-ltr">'
+            f'<p>Strona {title} słowo</p>{anchors}</div></body></html>')
+
+
+class WikiHandler(BaseHTTPRequestHandler):
+    """Obsługuje /wiki/<tytuł> na podstawie słownika GRAPH."""
+
+    def do_GET(self):
+        title = unquote(self.path.split('/wiki/', 1)[-1]).replace('_', ' ')
+        if title not in GRAPH:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = make_page(title, GRAPH[title]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_wikitext(title, links):
+    """Źródło strony odpowiadające make_page (te same słowa i linki)."""
+    anchors = ' '.join(f'[[{link}]]' for link in links)
+    return (f"Strona {title} '''słowo'''<ref>przypis</ref>"
+            f"{{{{Szablon|x=[[Ukryty]]}}}}\n\n{anchors}")
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """
+    Zastępczy api.php serwujący GRAPH (action=query z prop=revisions|links).
+    Odpowiedź mieści co najwyżej links_per_response linków – resztę
+    klient musi dociągnąć przez 'continue', jak w prawdziwym MediaWiki.
+    """
+
+    links_per_response = 3
+    redirects = {"Alias": "A"}
+    requests = 0
+
+    def do_GET(self):
+        ApiHandler.requests += 1
+        query = parse_qs(urlsplit(self.path).query)
+        titles = list(dict.fromkeys(self.redirects.get(t, t)
+                                    for t in query['titles'][0].split('|')))
+        offset = int(query.get('plcontinue', ['0'])[0])
+        all_links = [(title, link) for title in titles
+                     for link in GRAPH.get(title, [])]
+        end = offset + self.links_per_response
+        pages = {}
+        if offset == 0:
+            for title in titles:
+                if title not in GRAPH:
+                    pages[title] = {'title': title, 'missing': True}
+                    continue
+                pages[title] = {'title': title, 'ns': 0, 'revisions': [
+                    {'slots': {'main': {
+                        'content': make_wikitext(title, GRAPH[title])}}}]}
+        for title, link in all_links[offset:end]:
+            page = pages.setdefault(title, {'title': title, 'ns': 0})
+            page.setdefault('links', []).append({'ns': 0, 'title': link})
+        data = {'query': {'pages': list(pages.values())}}
+        redirects = [{'from': t, 'to': self.redirects[t]}
+                     for t in query['titles'][0].split('|')
+                     if t in self.redirects]
+        if redirects:
+            data['query']['redirects'] = redirects
+        if end < len(all_links):
+            data['continue'] = {'plcontinue': str(end), 'continue': '||'}
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def reference_bfs(start, depth):
+    """Kolejność odwiedzin sekwencyjnego BFS z wiki_scraper.py."""
+    queue = deque([(start, 0)])
+    visited = {start}
+    order = []
+    while queue:
+        title, d = queue.popleft()
+        if title not in GRAPH:
+            continue
+        order.append(title)
+        if d < depth:
+            for link in GRAPH[title]:
+                if link not in visited:
+                    visited.add(link)
+                    queue.append((link, d + 1))
+    return order
+
+
+def start_server(handler, add_cleanup):
+    """
+    Uruchamia zastępczy serwer (serve_handler) i rejestruje jego
+    zatrzymanie.
+
+    :param add_cleanup: self.addCleanup albo cls.addClassCleanup
+    :return: krotka (serwer, adres http://host:port)
+    """
+    server, base_url = serve_handler(handler)
+    add_cleanup(server.server_close)
+    add_cleanup(server.shutdown)
+    return server, base_url
 
 
 class TestScraperMethods(unittest.TestCase):
@@ -10,6 +178,8 @@ class TestScraperMethods(unittest.TestCase):
     Testy jednostkowe dla klasy WikiScraper i WordCounter.
     """
 
+    parser = 'bs4'
+
     def setUp(self):
         """Przygotowuje tymczasowy plik HTML z przykładową stroną."""
         self.html = """
@@ -41,7 +211,8 @@ class TestScraperMethods(unittest.TestCase):
         """Sprawdza, czy pierwszy paragraf jest poprawnie wyodrębniany."""
         scraper = WikiScraper("http://example.com", "x",
                               use_local_file=True,
-                              local_file_path=self.tmp.name)
+                              local_file_path=self.tmp.name,
+                              parser=self.parser)
         self.assertEqual(scraper.get_first_paragraph(),
                          "To jest pierwszy paragraf.")
 
@@ -52,7 +223,8 @@ class TestScraperMethods(unittest.TestCase):
         """
         scraper = WikiScraper("http://example.com", "x",
                               use_local_file=True,
-                              local_file_path=self.tmp.name)
+                              local_file_path=self.tmp.name,
+                              parser=self.parser)
         links = scraper.get_all_links()
         self.assertIn("Strona1", links)
         self.assertIn("Strona2", links)
@@ -62,13 +234,28 @@ class TestScraperMethods(unittest.TestCase):
         """Sprawdza poprawne wyodrębnianie danych z tabeli."""
         scraper = WikiScraper("http://example.com", "x",
                               use_local_file=True,
-                              local_file_path=self.tmp.name)
+                              local_file_path=self.tmp.name,
+                              parser=self.parser)
         table = scraper.get_table(1)
         rows = scraper.extract_table_data(table)
         self.assertEqual(len(rows), 2)
         self.assertEqual(rows[0], ["H1", "H2"])
         self.assertEqual(rows[1], ["a", "b"])
 
+    def test_extract_single_pass_is_memoized(self):
+        """extract() zwraca wszystkie dane naraz i zapamiętuje wynik."""
+        scraper = WikiScraper("http://example.com", "x",
+                              use_local_file=True,
+                              local_file_path=self.tmp.name,
+                              parser=self.parser)
+        page = scraper.extract()
+        self.assertIs(scraper.extract(), page)
+        self.assertEqual(page.full_text,
+                         "To jest pierwszy paragraf. Drugi paragraf.")
+        self.assertEqual(page.first_paragraph, "To jest pierwszy paragraf.")
+        self.assertEqual(page.links, ["Strona1", "Strona2"])
+        self.assertEqual(len(page.tables), 1)
+
     def test_count_words_in_text(self):
         """Sprawdza, czy WordCounter poprawnie zlicza słowa."""
         with tempfile.NamedTemporaryFile(mode='w',
@@ -88,5 +275,1258 @@ class TestScraperMethods(unittest.TestCase):
             os.unlink(temp_json)
 
 
+class TestScraperMethodsLxml(TestScraperMethods):
+    """Te same testy dla szybkiego parsera lxml."""
+
+    parser = 'lxml'
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'fixtures')
+
+
+class TestFastParserParity(unittest.TestCase):
+    """Parser lxml musi dawać te same wyniki co BeautifulSoup."""
+
+    def test_fixture_corpus(self):
+        """Porównuje wszystkie publiczne metody na stronach z fixtures/."""
+        paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+        self.assertTrue(paths)
+        for path in paths:
+            with self.subTest(page=os.path.basename(path)):
+                slow = WikiScraper("http://example.com", "x",
+                                   use_local_file=True, local_file_path=path)
+                fast = WikiScraper("http://example.com", "x",
+                                   use_local_file=True, local_file_path=path,
+                                   parser='lxml')
+                self.assertEqual(fast.get_full_text(), slow.get_full_text())
+                self.assertEqual(fast.get_first_paragraph(),
+                                 slow.get_first_paragraph())
+                self.assertEqual(fast.get_all_links(), slow.get_all_links())
+                n_tables = len(slow.extract().tables)
+                self.assertEqual(len(fast.extract().tables), n_tables)
+                for i in range(1, n_tables + 1):
+                    slow_table = slow.get_table(i)
+                    fast_table = fast.get_table(i)
+                    self.assertEqual(str(fast_table), str(slow_table))
+                    self.assertEqual(fast.extract_table_data(fast_table),
+                                     slow.extract_table_data(slow_table))
+
+
+class TestStreamingTokenizer(unittest.TestCase):
+    """Strumieniowe zliczanie musi dawać te same tokeny co pełny tekst."""
+
+    TEXT = ("Ala ma kota. Kot ma Alę, a ΟΔΟΣ.Α i İstanbul_2 abc123 "
+            "naïve\tcafé\nzażółć gęślą jaźń ΣΊΣΥΦΟΣ x_y ł ")
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.wc = WordCounter(json_path=os.path.join(self.dir.name, 'a.json'))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_chunks_match_full_text(self):
+        """Zliczenia z węzłów tekstowych równe zliczeniom sklejonego tekstu."""
+        chunks = self.TEXT.split(' ')
+        self.assertEqual(self.wc.count_words_in_chunks(chunks),
+                         self.wc.count_words_in_text(' '.join(chunks)))
+        self.assertEqual(self.wc.count_words_in_chunks(chunks)['alę'], 1)
+
+    def test_split_chunk_keeps_tokens(self):
+        """Dzielenie długiego fragmentu nie rozcina słów."""
+        text = self.TEXT * 50 + "bardzodlugieslowo" * 20
+        expected = self.wc.count_words_in_text(text)
+        for size in (1, 7, 64, 1000):
+            pieces = list(split_chunk(text, size))
+            self.assertEqual(''.join(pieces), text)
+            counter = Counter()
+            for piece in pieces:
+                counter.update(self.wc.count_words_in_text(piece))
+            self.assertEqual(counter, expected)
+
+    def test_update_chunks_matches_update(self):
+        """update_chunks i update dają ten sam skrót i te same liczniki."""
+        chunks = self.TEXT.split(' ')
+        text = ' '.join(chunks)
+        self.assertEqual(hash_chunks(chunks),
+                         hashlib.sha1(text.encode('utf-8')).hexdigest())
+        streamed = WordCounter(json_path=os.path.join(self.dir.name, 'b.json'))
+        streamed.update_chunks(iter(chunks), article="A")
+        self.wc.update(text)
+        self.assertEqual(streamed.get_counts(), self.wc.get_counts())
+        self.assertFalse(streamed.update(text, article="A"))
+
+
+    def test_text_chunks_join_to_full_text(self):
+        """iter_text_chunks sklejone spacją dają get_full_text()."""
+        for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))):
+            for parser in ('bs4', 'lxml'):
+                with self.subTest(page=os.path.basename(path), parser=parser):
+                    page = WikiScraper("http://example.com", "x",
+                                       use_local_file=True,
+                                       local_file_path=path, parser=parser)
+                    joined = ' '.join(page.iter_text_chunks())
+                    self.assertEqual(joined, page.get_full_text())
+
+
+class TestParallelCounting(unittest.TestCase):
+    """Zliczanie w puli procesów daje ten sam wynik co sekwencyjne."""
+
+    TEXTS = [f"Ala ma kota {i} razy, zażółć gęślą jaźń nr {i % 7}"
+             for i in range(200)]
+
+    def test_texts_parallel_matches_sequential(self):
+        """Scalone częściowe zliczenia równe zliczeniom całości."""
+        expected = Counter(re.findall(r'\b[^\W\d_]+\b',
+                                      ' '.join(self.TEXTS).lower()))
+        self.assertEqual(count_texts_parallel(self.TEXTS, workers=2,
+                                              batch_chars=500), expected)
+        self.assertEqual(count_texts_parallel(self.TEXTS, workers=1), expected)
+
+    def test_files_parallel_and_update_counts(self):
+        """Pliki są zliczane w procesach i dodawane jedną aktualizacją."""
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(3):
+                path = os.path.join(tmp, f'{i}.txt')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write("kot\nma kota\n")
+                paths.append(path)
+            counts = count_files_parallel(paths, workers=2, batch_bytes=1)
+            wc = WordCounter(json_path=os.path.join(tmp, 'c.json'))
+            wc.update_counts(counts)
+            self.assertEqual(wc.get_counts(), {'kot': 3, 'ma': 3, 'kota': 3})
+
+    def test_ingest_dump(self):
+        """Zrzut XML (surowy, bz2, gz) – tylko artykuły, ostatnie wersje."""
+        dump = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/">
+          <siteinfo><sitename>Bulbapedia</sitename></siteinfo>
+          <page><title>Pikachu</title><ns>0</ns><revision>
+            <text>'''Pikachu''' to [[Electric type|elektryczny]] {{p|Pokémon}}
+            kot</text></revision></page>
+          <page><title>Pika</title><ns>0</ns><redirect title="Pikachu"/>
+            <revision><text>#REDIRECT [[Pikachu]]</text></revision></page>
+          <page><title>Bulbapedia:About</title><ns>4</ns>
+            <revision><text>strona projektu</text></revision></page>
+          <page><title>Kot</title><ns>0</ns>
+            <revision><text>stara wersja</text></revision>
+            <revision><text>kot ma [[Pikachu|kota]]</text></revision></page>
+        </mediawiki>"""
+        expected = {'pikachu': 1, 'to': 1, 'elektryczny': 1, 'kot': 2,
+                    'ma': 1, 'kota': 1}
+        with tempfile.TemporaryDirectory() as tmp:
+            for suffix, opener in (('', open), ('.bz2', bz2.open),
+                                   ('.gz', gzip.open)):
+                for workers in (1, 2):
+                    with self.subTest(suffix=suffix, workers=workers):
+                        path = os.path.join(tmp, f'dump.xml{suffix}')
+                        with opener(path, 'wb') as f:
+                            f.write(dump.encode('utf-8'))
+                        wc = WordCounter(json_path=os.path.join(
+                            tmp, f'{suffix}{workers}.json'))
+                        with mock.patch.object(
+                                wc.store, 'save',
+                                wraps=wc.store.save) as save:
+                            stats = ingest_dump(path, wc, workers=workers,
+                                                batch_chars=10)
+                        # Paczki są scalane w pamięci – jeden zapis
+                        self.assertEqual(save.call_count, 1)
+                        self.assertEqual(wc.get_counts(), expected)
+                        self.assertEqual((stats['pages'], stats['skipped']),
+                                         (2, 2))
+
+
+class TestLanguageIndex(unittest.TestCase):
+    """Indeks języka daje te same tabele co pełny, posortowany słownik."""
+
+    LANG = {'the': 0.05, 'to': 0.03, 'and': 0.03, 'über': 0.02,
+            'café': 0.01, 'a': 0.03, 'zebra': 0.0001}
+    COUNTS = {'the': 4, 'über': 2, 'pokemon': 4, 'a': 1}
+
+    def reference_table(self, mode, n):
+        """Dotychczasowy algorytm: normalizacja i sortowanie całości."""
+        def normalize(freqs):
+            max_val = max(freqs.values())
+            return {k: v / max_val for k, v in freqs.items()}
+
+        norm_article = normalize(self.COUNTS)
+        norm_lang = normalize(self.LANG)
+        source = norm_article if mode == 'article' else norm_lang
+        words = [w for w, _ in sorted(source.items(), key=lambda x: x[1],
+                                      reverse=True)[:n]]
+        return [(w, norm_article.get(w, 0), norm_lang.get(w, 0))
+                for w in words]
+
+    def test_matches_full_sort(self):
+        """Tabele z indeksu równe tabelom z pełnego sortowania."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lang.idx')
+            build_index(path, self.LANG)
+            index = LanguageIndex(path=path)
+            analyzer = LanguageAnalyzer(word_counts=self.COUNTS, index=index)
+            for mode in ('article', 'language'):
+                for n in (1, 3, 10):
+                    with self.subTest(mode=mode, n=n):
+                        df = analyzer.prepare_table(mode=mode, n=n)
+                        self.assertEqual(
+                            sorted(df.itertuples(index=False, name=None)),
+                            sorted(self.reference_table(mode, n)))
+            self.assertEqual(len(index), len(self.LANG))
+            self.assertIn('über', index)
+            self.assertEqual(index.get('pokemon', None), None)
+            index.close()
+
+    def test_score_modes(self):
+        """Wyniki porównawcze zgodne z definicjami na małym przykładzie."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lang.idx')
+            build_index(path, self.LANG)
+            index = LanguageIndex(path=path)
+            analyzer = LanguageAnalyzer(word_counts=self.COUNTS, index=index)
+            total = sum(self.COUNTS.values())
+            p = {w: c / total for w, c in self.COUNTS.items()}
+            q = {w: self.LANG.get(w, 0.0001 / 2) for w in self.COUNTS}
+            q_sum = sum(q.values())
+            kl = sum(p[w] * math.log2(p[w] / (q[w] / q_sum)) for w in p)
+            self.assertAlmostEqual(analyzer.divergence('kl'), kl)
+            self.assertTrue(0 <= analyzer.divergence('js') <= 1)
+
+            df = analyzer.prepare_table(mode='log-ratio', n=2)
+            self.assertEqual(df['word'].tolist(), ['pokemon', 'über'])
+            self.assertAlmostEqual(df['log_ratio'].iloc[1],
+                                   math.log2(p['über'] / 0.02))
+            keyness = analyzer.prepare_table(mode='keyness', n=4)
+            self.assertEqual(keyness['word'].iloc[0], 'pokemon')
+            self.assertTrue((keyness['keyness'].diff().dropna() <= 0).all())
+            with self.assertRaises(Exception):
+                analyzer.prepare_table(mode='nieznany')
+            index.close()
+
+
+class TestSpaceSaving(unittest.TestCase):
+    """Przybliżone top-k w stałej pamięci z gwarancjami błędu."""
+
+    def test_error_bounds_and_top(self):
+        """Oszacowania nie mniejsze od prawdy i zawyżone najwyżej o błąd."""
+        rnd = random.Random(3)
+        words = [f"w{i}" for i in range(2000)]
+        weights = [1 / (rank + 1) for rank in range(len(words))]
+        truth = Counter()
+        sketch = SpaceSaving(capacity=200)
+        for _ in range(50):
+            page = Counter(rnd.choices(words, weights, k=500))
+            truth.update(page)
+            sketch.update(page)
+        self.assertEqual(len(sketch), 200)
+        self.assertEqual(sketch.total, sum(truth.values()))
+        for word, count, error in sketch.top(200):
+            self.assertGreaterEqual(count, truth[word])
+            self.assertLessEqual(count - truth[word], error)
+            self.assertLessEqual(error, sketch.error_bound)
+        self.assertEqual([w for w, _, _ in sketch.top(10)],
+                         [w for w, _ in truth.most_common(10)])
+
+        restored = SpaceSaving.from_dict(sketch.to_dict())
+        self.assertEqual(restored.counts(), sketch.counts())
+        restored.update({'nowe': 1})
+        self.assertEqual(len(restored), 200)
+
+    def test_approx_word_counter(self):
+        """Licznik przybliżony: rejestr skrótów i trwały stan."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'counts.topk.json')
+            with ApproxWordCounter(path, capacity=2) as wc:
+                self.assertTrue(wc.update("kot kot ma psa", article="A"))
+                self.assertFalse(wc.update("kot kot ma psa", article="A"))
+            with ApproxWordCounter(path, capacity=2) as wc:
+                self.assertFalse(wc.update("kot kot ma psa", article="A"))
+                counts = wc.get_counts()
+                self.assertEqual(len(counts), 2)
+                self.assertEqual(counts['kot'], 2)
+                self.assertLessEqual(wc.error_bound(), 2)
+
+    def test_approx_ledger_is_bounded(self):
+        """Rejestr skrótów pamięta tylko ledger_size ostatnich artykułów."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'counts.topk.json')
+            with ApproxWordCounter(path, ledger_size=2) as wc:
+                for article in "ABC":
+                    wc.update("kot", article=article)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual([title for title, _ in
+                                  json.load(f)['articles']], ["B", "C"])
+            with ApproxWordCounter(path, ledger_size=2) as wc:
+                self.assertFalse(wc.update("kot", article="B"))
+                # Wypchnięty artykuł jest doliczany ponownie (zawyżenie)
+                self.assertTrue(wc.update("kot", article="A"))
+                self.assertEqual(wc.get_counts(), {'kot': 4})
+
+
+class TestWordStores(unittest.TestCase):
+    """Testy magazynów liczników słów."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.dir.name, 'word-counts.json')
+        self.db_path = os.path.join(self.dir.name, 'word-counts.sqlite')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_sqlite_migrates_json_once(self):
+        """Dane z JSON trafiają do bazy tylko przy pierwszym otwarciu."""
+        with WordCounter(json_path=self.json_path) as wc:
+            wc.update("kot ma kota")
+        for _ in range(2):
+            store = SqliteStore(self.db_path, legacy_json_path=self.json_path)
+            with WordCounter(store=store) as wc:
+                self.assertEqual(wc.get_counts(), {'kot': 1, 'ma': 1,
+                                                   'kota': 1})
+
+    def test_sqlite_batched_flush(self):
+        """Zmiany są utrwalane co flush_every aktualizacji i przy close."""
+        store = SqliteStore(self.db_path, legacy_json_path=None)
+        wc = WordCounter(store=store, flush_every=2)
+        wc.update("ala")
+        self.assertEqual(store.load(), {})
+        wc.update("ala ola")
+        self.assertEqual(store.load(), {'ala': 2, 'ola': 1})
+        wc.update("ola")
+        wc.close()
+        reopened = SqliteStore(self.db_path, legacy_json_path=None)
+        self.assertEqual(reopened.load(), {'ala': 2, 'ola': 2})
+        reopened.close()
+
+    def test_article_ledger(self):
+        """Ponowne zliczenie artykułu nie podwaja liczników."""
+        expected = {'kot': 1, 'ma': 2, 'psa': 1, 'pies': 1, 'kota': 1}
+        for kind in ('json', 'sqlite', 'binary'):
+            with self.subTest(store=kind):
+                path = os.path.join(self.dir.name, kind)
+
+                def make():
+                    if kind == 'json':
+                        return WordCounter(json_path=path + '.json')
+                    if kind == 'binary':
+                        return WordCounter(store=BinaryStore(
+                            path + '.bin', legacy_json_path=None))
+                    return WordCounter(store=SqliteStore(
+                        path + '.sqlite', legacy_json_path=None))
+
+                with make() as wc:
+                    self.assertTrue(wc.update("kot ma kota", article="A"))
+                    self.assertFalse(wc.update("kot ma kota", article="A"))
+                    wc.update("pies ma kota", article="B")
+                with make() as wc:
+                    self.assertFalse(wc.update("kot ma kota", article="A"))
+                    self.assertTrue(wc.update("kot ma psa", article="A"))
+                    self.assertEqual(wc.get_counts(), expected)
+                with make() as wc:
+                    self.assertEqual(wc.get_counts(), expected)
+
+    def test_default_flush_interval(self):
+        """Przeszukiwanie domyślnie zapisuje liczniki co punkt kontrolny,
+        pojedynczy artykuł – od razu."""
+        cases = ((['--count-words', 'A'], 1),
+                 (['--auto-count-words', 'A', '--checkpoint-every', '7'], 7),
+                 (['--auto-count-words', 'A', '--flush-every', '3'], 3))
+        for argv, expected in cases:
+            with self.subTest(argv=argv):
+                args = wiki_scraper.build_parser().parse_args(
+                    argv + ['--store-path', self.json_path])
+                with wiki_scraper.open_word_counter(args) as wc:
+                    self.assertEqual(wc.flush_every, expected)
+
+    def test_json_ledger_recovery(self):
+        """Przerwany zapis nie rozdziela liczników i rejestru artykułów."""
+        ledger_path = os.path.join(self.dir.name, 'word-counts.articles.jsonl')
+        store = JsonStore(self.json_path)
+        store.load()
+        store.save({'kot': 1}, {}, {'A': ('h1', {'kot': 1})})
+        real_replace = os.replace
+
+        def crash(src, dst):
+            if src.endswith('.staged'):
+                raise OSError("awaria")
+            real_replace(src, dst)
+
+        # Awaria po zatwierdzeniu dziennika: podmiana liczników jest
+        # dokańczana przy wczytaniu
+        with mock.patch.object(os, 'replace', crash):
+            with self.assertRaises(OSError):
+                store.save({'kot': 1, 'pies': 2}, {},
+                           {'B': ('h2', {'pies': 2})})
+        store = JsonStore(self.json_path)
+        self.assertEqual(store.load(), {'kot': 1, 'pies': 2})
+        self.assertEqual(store.get_article('B'), ('h2', {'pies': 2}))
+        # Awaria w trakcie dopisywania: niezatwierdzona partia znika
+        with mock.patch.object(os, 'fsync', side_effect=OSError("awaria")):
+            with self.assertRaises(OSError):
+                store.save({'kot': 1, 'pies': 2, 'ryba': 1}, {},
+                           {'C': ('h3', {'ryba': 1})})
+        with open(ledger_path, 'a', encoding='utf-8') as f:
+            f.write('{"title": "C", "hash": "h3", "counts": {"ry')
+        store = JsonStore(self.json_path)
+        self.assertEqual(store.load(), {'kot': 1, 'pies': 2})
+        self.assertIsNone(store.get_article('C'))
+        self.assertEqual(store.get_article('A'), ('h1', {'kot': 1}))
+        self.assertEqual(glob.glob(self.json_path + '.*.staged'), [])
+        with open(ledger_path, encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines()[-1], '{"commit": 2}')
+
+    def test_compact_counts_mapping(self):
+        """Zwarty słownik zachowuje się jak dict i przeżywa zapis."""
+        path = os.path.join(self.dir.name, 'counts.bin')
+        expected = {'żółw': 3, 'kot': 2, 'ala': 1}
+        counts = CompactCounts(path)
+        counts.update(expected)
+        counts.save()
+        counts['kot'] += 5
+        counts['zebra'] = 1
+        del counts['ala']
+        expected.update(kot=7, zebra=1)
+        del expected['ala']
+        self.assertEqual(dict(counts.items()), expected)
+        self.assertEqual(len(counts), 3)
+        self.assertNotIn('ala', counts)
+        counts.save()
+        counts.close()
+        reopened = CompactCounts(path)
+        self.assertEqual(dict(reopened), expected)
+        self.assertEqual(sorted(reopened.values()), [1, 3, 7])
+        reopened.close()
+
+    def test_binary_store_migrates_json(self):
+        """Magazyn binarny importuje liczniki i rejestr z JSON."""
+        with WordCounter(json_path=self.json_path) as wc:
+            wc.update("kot ma kota", article="A")
+        bin_path = os.path.join(self.dir.name, 'word-counts.bin')
+        store = BinaryStore(bin_path, legacy_json_path=self.json_path)
+        with WordCounter(store=store) as wc:
+            self.assertFalse(wc.update("kot ma kota", article="A"))
+            self.assertEqual(dict(wc.get_counts()), {'kot': 1, 'ma': 1,
+                                                     'kota': 1})
+            index_path = os.path.join(self.dir.name, 'lang.idx')
+            build_index(index_path, {'ma': 0.5, 'kot': 0.1})
+            analyzer = LanguageAnalyzer(word_counts=wc.get_counts(),
+                                        index=LanguageIndex(path=index_path))
+            df = analyzer.prepare_table(mode='article', n=3)
+            self.assertEqual(sorted(df['word']), ['kot', 'kota', 'ma'])
+            self.assertEqual(df['frequency_in_language'].max(), 1.0)
+            analyzer.index.close()
+
+    def test_corrupted_json_is_backed_up(self):
+        """Uszkodzony plik JSON nie jest po cichu nadpisywany."""
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            f.write('{"kot": 3,')
+        wc = WordCounter(json_path=self.json_path)
+        self.assertEqual(wc.get_counts(), {})
+        self.assertTrue(os.path.exists(self.json_path + '.corrupt'))
+
+
+class TestAsyncCrawler(unittest.TestCase):
+    """Testy asynchronicznego BFS na lokalnym serwerze."""
+
+    @classmethod
+    def setUpClass(cls):
+        _, cls.base_url = start_server(WikiHandler, cls.addClassCleanup)
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.dir.name, 'word-counts.json')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_same_order_as_sequential_bfs(self):
+        """Kolejność i zbiór stron muszą być takie jak w BFS sekwencyjnym."""
+        for depth in range(4):
+            wc = WordCounter(json_path=self.json_path)
+            crawler = AsyncCrawler(self.base_url, wc, concurrency=4)
+            processed = crawler.crawl("Start", depth)
+            self.assertEqual(processed, reference_bfs("Start", depth))
+
+    def test_counts_words_from_all_pages(self):
+        """Każda przetworzona strona jest zliczona dokładnie raz."""
+        wc = WordCounter(json_path=self.json_path)
+        processed = AsyncCrawler(self.base_url, wc,
+                                 concurrency=8).crawl("Start", 3)
+        self.assertEqual(wc.get_counts()['słowo'], len(processed))
+
+    def test_unchanged_pages_not_tokenized(self):
+        """Przy ponownym przeszukiwaniu niezmienione strony są tylko
+        haszowane – słowa nie są zliczane ponownie."""
+        wc = WordCounter(json_path=self.json_path)
+        AsyncCrawler(self.base_url, wc, concurrency=4).crawl("Start", 3)
+        expected = dict(wc.get_counts())
+        with mock.patch('crawler.count_chunks') as count_chunks:
+            processed = AsyncCrawler(self.base_url, wc,
+                                     concurrency=4).crawl("Start", 3)
+        self.assertEqual(processed, reference_bfs("Start", 3))
+        count_chunks.assert_not_called()
+        self.assertEqual(wc.get_counts(), expected)
+
+    def test_parse_in_worker_processes(self):
+        """Parsowanie w puli procesów daje ten sam wynik; etapy są liczone."""
+        wc = WordCounter(json_path=self.json_path)
+        crawler = AsyncCrawler(self.base_url, wc, concurrency=4, processes=2)
+        processed = crawler.crawl("Start", 3)
+        self.assertEqual(processed, reference_bfs("Start", 3))
+        self.assertEqual(wc.get_counts()['słowo'], len(processed))
+        stages = crawler.stats.stages
+        self.assertEqual(stages['parse'].items, len(processed))
+        self.assertEqual(stages['write'].items, len(processed))
+        self.assertEqual(stages['fetch'].items, len(processed) + 1)  # 404
+        for stage in stages.values():
+            self.assertEqual(stage.waiting, 0)
+        self.assertIn('parse', crawler.stats_report())
+
+    def test_stats_after_time_budget(self):
+        """Po przerwaniu budżetem czasu żadne zadanie nie zostaje
+        w kolejce statystyk etapów."""
+
+        class TickingBudget(CrawlBudget):
+            def page_done(self):
+                super().page_done()
+                self.clock.sleep(1)
+
+        clock = FakeClock()
+        wc = WordCounter(json_path=self.json_path)
+        crawler = AsyncCrawler(self.base_url, wc, concurrency=4)
+        processed = crawler.crawl(
+            "Start", 3, budget=TickingBudget(max_seconds=2, clock=clock))
+        self.assertEqual(len(processed), 2)
+        stages = crawler.stats.stages
+        self.assertEqual(stages['write'].items, len(processed))
+        for stage in stages.values():
+            self.assertEqual(stage.waiting, 0)
+        self.assertGreaterEqual(stages['parse'].items,
+                                stages['write'].items
+                                + stages['write'].dropped)
+
+    def test_resume_after_interruption(self):
+        """Wznowione przeszukiwanie kończy BFS bez podwójnego zliczania."""
+        expected = reference_bfs("Start", 3)
+
+        class Interrupted(Exception):
+            pass
+
+        class CrashingCounter(WordCounter):
+            def update_counted(self, *args, **kwargs):
+                if self.calls == 4:
+                    raise Interrupted()
+                self.calls += 1
+                return super().update_counted(*args, **kwargs)
+
+        for every in (1, 3):
+            with self.subTest(checkpoint_every=every):
+                json_path = os.path.join(self.dir.name, f'{every}.json')
+                state_path = os.path.join(self.dir.name, f'{every}.state')
+                wc = CrashingCounter(json_path=json_path)
+                wc.calls = 0
+                state = CrawlState(state_path, checkpoint_every=every)
+                state.start("Start", 3)
+                with self.assertRaises(Interrupted):
+                    AsyncCrawler(self.base_url, wc, concurrency=2).crawl(
+                        "Start", 3, state=state)
+
+                wc = WordCounter(json_path=json_path)
+                state = CrawlState(state_path, checkpoint_every=every)
+                self.assertTrue(state.start("Start", 3, resume=True))
+                rest = AsyncCrawler(self.base_url, wc, concurrency=2).crawl(
+                    "Start", 3, state=state)
+                state.close(wc)
+                if every == 1:
+                    self.assertEqual(expected[:4] + rest, expected)
+                self.assertEqual(wc.get_counts()['słowo'], len(expected))
+                self.assertEqual(len(state.frontier), 0)
+
+
+    def test_priority_frontier_with_page_budget(self):
+        """Kolejka priorytetowa: strony z większą liczbą linków do nich
+        idą pierwsze, a przerwane limitem stron przeszukiwanie wznawia się
+        bez podwójnego zliczania."""
+        expected = ["Start", "A", "B", "C", "D", "E", "G", "F", "H"]
+        crawler = AsyncCrawler(self.base_url,
+                               WordCounter(json_path=self.json_path),
+                               concurrency=1, window=1)
+        state = CrawlState(frontier=PriorityFrontier())
+        state.start("Start", 3)
+        self.assertEqual(crawler.crawl("Start", 3, state=state), expected)
+
+        state_path = os.path.join(self.dir.name, 'priority.state')
+        wc = WordCounter(json_path=self.json_path + '.2')
+        state = CrawlState(state_path, checkpoint_every=2,
+                           frontier=PriorityFrontier())
+        state.start("Start", 3)
+        first = AsyncCrawler(self.base_url, wc, concurrency=1,
+                             window=1).crawl("Start", 3, state=state,
+                                             budget=CrawlBudget(max_pages=5))
+        state.close(wc)
+        self.assertEqual(first, expected[:5])
+
+        state = CrawlState(state_path, frontier=PriorityFrontier())
+        self.assertTrue(state.start("Start", 3, resume=True))
+        rest = AsyncCrawler(self.base_url, wc, concurrency=1,
+                            window=1).crawl("Start", 3, state=state)
+        self.assertEqual(first + rest, expected)
+        self.assertEqual(wc.get_counts()['słowo'], len(expected))
+
+
+class TestPriorityFrontier(unittest.TestCase):
+    """Kopiec stron z aktualizowanymi priorytetami."""
+
+    def test_order_updates_and_head(self):
+        """Linki podnoszą priorytet, filtr tytułów ma pierwszeństwo,
+        a strony już przeniesione do głowy nie zmieniają kolejności."""
+        frontier = PriorityFrontier(title_filter=r'^Poke')
+        for title in ("A", "B", "C", "Pokedex", "D"):
+            frontier.append((title, 1))
+        self.assertTrue(frontier.bump("C"))
+        self.assertTrue(frontier.bump("C"))
+        self.assertTrue(frontier.bump("B"))
+        self.assertFalse(frontier.bump("Brak"))
+        self.assertEqual(frontier[0], ("Pokedex", 1))
+        self.assertEqual(frontier[1], ("C", 1))
+        self.assertFalse(frontier.bump("C"))  # już w głowie
+        frontier.append(("E", 0))
+        self.assertEqual(list(frontier), [("Pokedex", 1), ("C", 1),
+                                          ("B", 1), ("E", 0), ("A", 1),
+                                          ("D", 1)])
+        self.assertTrue(frontier.remove("A"))
+        restored = PriorityFrontier(title_filter=r'^Poke')
+        restored.load(frontier.snapshot())
+        self.assertEqual(frontier.popleft(), ("Pokedex", 1))
+        self.assertEqual(restored.popleft(), ("Pokedex", 1))
+        self.assertEqual(len(restored), 4)
+
+    def test_many_updates_stay_compact(self):
+        """Wielokrotne podnoszenie priorytetów nie rozdyma kopca."""
+        frontier = PriorityFrontier()
+        for i in range(5000):
+            frontier.append((f"T{i}", 1))
+        rng = random.Random(0)
+        for _ in range(50000):
+            frontier.bump(f"T{rng.randrange(5000)}")
+        self.assertLessEqual(len(frontier._heap), 2 * 5000 + 1024)
+        counts = [frontier._entries[f"T{i}"][3] for i in range(5000)]
+        first = frontier.popleft()[0]
+        self.assertEqual(counts[int(first[1:])], max(counts))
+
+    def test_budget(self):
+        """Limit stron i czasu."""
+        clock = FakeClock()
+        budget = CrawlBudget(max_pages=2, max_seconds=10, clock=clock)
+        budget.page_done()
+        self.assertIsNone(budget.exhausted())
+        self.assertEqual(budget.remaining_pages(), 1)
+        clock.now = 10
+        self.assertIn("10 s", budget.exhausted())
+
+
+class TestDedup(unittest.TestCase):
+    """Normalizacja tytułów i zbiór odwiedzonych stron."""
+
+    def test_normalize_title(self):
+        cases = {
+            'Team_Rocket#Members': 'Team Rocket',
+            'team rocket': 'Team rocket',
+            'Pok%C3%A9mon_Center': 'Pokémon Center',
+            '  Ash__Ketchum ': 'Ash Ketchum',
+            '#Sekcja': '',
+        }
+        for raw, expected in cases.items():
+            with self.subTest(raw=raw):
+                self.assertEqual(normalize_title(raw), expected)
+
+    def test_page_done_skips_variants_and_aliases(self):
+        """Warianty tytułu i przekierowania nie są pobierane ponownie."""
+        state = CrawlState()
+        state.start("Start", 2)
+        self.assertEqual(state.page_done(
+            "Start", ['B#Sekcja', 'b', 'B', 'C%C3%B3w', 'Ców', 'Redir'], 1),
+            "Start")
+        self.assertEqual([t for t, _ in state.frontier],
+                         ['B', 'Ców', 'Redir'])
+        self.assertEqual(state.stats['duplicates'], 3)
+        self.assertEqual(state.stats['normalized_duplicates'], 1)
+        self.assertEqual(state.page_done("B", [], 2), "B")
+        self.assertIsNone(state.page_done("Ców", ['Nowa'], 2, canonical='B'))
+        self.assertEqual(state.page_done("Redir", [], 2,
+                                         canonical='Cel#x'), "Cel")
+        self.assertIn("Cel", state.visited)
+        self.assertEqual(len(state.frontier), 0)
+        self.assertEqual(state.stats['alias_duplicates'], 1)
+
+    def test_visited_set_bloom_with_exact_fallback(self):
+        """Filtr Blooma nie gubi stron ani nie przepuszcza obcych tytułów."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'visited.sqlite')
+            visited = VisitedSet(capacity=100, error_rate=0.2, path=path)
+            titles = [f"Strona {i}" for i in range(300)]
+            for title in titles:
+                visited.add(title)
+            visited.add(titles[0])
+            self.assertEqual(len(visited), 300)
+            self.assertEqual(visited.false_positives, 0)
+            self.assertTrue(all(t in visited for t in titles))
+            others = [f"Inna {i}" for i in range(300)]
+            self.assertFalse(any(t in visited for t in others))
+            # Każdy fałszywy pozytyw filtru liczony raz (przy sprawdzeniu)
+            expected = sum(1 for t in others if t in visited.bloom)
+            self.assertGreater(expected, 0)
+            self.assertEqual(visited.false_positives, expected)
+            visited.close()
+            reopened = VisitedSet(capacity=100, path=path)
+            self.assertEqual(len(reopened), 300)
+            self.assertIn("Strona 7", reopened)
+            reopened.close()
+
+    def test_canonical_title(self):
+        html = ('<html><head><link rel="canonical" href="https://x/wiki/'
+                'Team_Rocket"></head><body><div class="mw-content-ltr">'
+                '<p>t</p></div></body></html>')
+        for parser in ('bs4', 'lxml'):
+            with self.subTest(parser=parser):
+                scraper = WikiScraper("https://x", "Rocket", html=html,
+                                      parser=parser)
+                self.assertEqual(scraper.get_canonical_title(), "Team Rocket")
+
+
+class TestMediaWikiAPI(unittest.TestCase):
+    """Źródło api.php: partie tytułów, kontynuacje i zgodność z HTML."""
+
+    @classmethod
+    def setUpClass(cls):
+        _, cls.api_url = start_server(ApiHandler, cls.addClassCleanup)
+        _, cls.html_url = start_server(WikiHandler, cls.addClassCleanup)
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        ApiHandler.requests = 0
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_strip_wikitext(self):
+        text = strip_wikitext(
+            "'''Pikachu''' is an [[Electric type|Electric]]-type"
+            " {{p|Pokémon}}<ref>x</ref>.<!-- uwaga -->\n"
+            "[[File:Pikachu.png|thumb|Obraz [[Ash]]]]\n"
+            "== Biology ==\n* [[Ash Ketchum]] [http://x.org strona]\n"
+            "{| class=\"wikitable\"\n|-\n! Nr !! Nazwa\n|-\n"
+            "| style=\"a\" | 25 || [[Pikachu]]\n|}")
+        self.assertEqual(split_sections(text), [
+            ('', 'Pikachu is an Electric-type .'),
+            ('Biology', 'Ash Ketchum strona\n\nNr\nNazwa\n25\nPikachu'),
+        ])
+
+    def test_batch_with_continuation_and_redirects(self):
+        """Jedna partia tytułów, linki scalone z kolejnych odpowiedzi."""
+        api = MediaWikiAPI(self.api_url, fetcher=PageFetcher())
+        pages = api.fetch_pages(list(GRAPH) + ["Brak", "Alias"])
+        n_links = sum(len(links) for links in GRAPH.values())
+        self.assertEqual(ApiHandler.requests,
+                         math.ceil(n_links / ApiHandler.links_per_response))
+        for title, links in GRAPH.items():
+            self.assertEqual(pages[title].links, links)
+        self.assertTrue(pages["Brak"].missing)
+        self.assertEqual(pages["Alias"].title, "A")
+        scraper = ApiScraper(api, "Start", page=pages["Start"])
+        self.assertEqual(scraper.get_first_paragraph(), "Strona Start słowo")
+        with self.assertRaises(Exception):
+            ApiScraper(api, "Brak", page=pages["Brak"])
+
+    def test_crawl_matches_html_source(self):
+        """BFS przez API odwiedza te same strony i liczy te same słowa."""
+        results = []
+        for api in (None, MediaWikiAPI(self.api_url, fetcher=PageFetcher(),
+                                       batch_size=4)):
+            wc = WordCounter(json_path=os.path.join(
+                self.dir.name, f'{len(results)}.json'))
+            processed = AsyncCrawler(self.html_url, wc, concurrency=2,
+                                     api=api).crawl("Start", 3)
+            results.append((processed, wc.get_counts()))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][0], reference_bfs("Start", 3))
+        self.assertLess(ApiHandler.requests, len(results[1][0]))
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Odpowiada 503 z Retry-After na pierwsze zapytania, potem 200."""
+
+    failures_left = 0
+    retry_after = '0'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if FlakyHandler.failures_left > 0:
+            FlakyHandler.failures_left -= 1
+            self.send_response(503)
+            self.send_header('Retry-After', FlakyHandler.retry_after)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = make_page("Flaky", []).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSyntheticWiki(unittest.TestCase):
+    """Lokalna generowana wiki do testów obciążeniowych."""
+
+    def test_html_api_and_redirects(self):
+        """HTML i api.php opisują te same strony, a przekierowanie
+        wskazuje tytuł kanoniczny celu."""
+        wiki = SyntheticWiki(n_pages=50, links_per_page=10, nav_links=3,
+                             alias_rate=0.3)
+        _, base_url = start_server(wiki_handler(wiki), self.addCleanup)
+        fetcher = PageFetcher()
+        page = WikiScraper(base_url, "Page 7", fetcher=fetcher)
+        self.assertEqual(page.get_all_links(),
+                         ["Page 0", "Page 1", "Page 2"] + wiki.links(7))
+        self.assertEqual(WikiScraper(base_url, "Alias 7", fetcher=fetcher)
+                         .get_canonical_title(), "Page 7")
+        api = MediaWikiAPI(base_url, fetcher=fetcher)
+        scraper = ApiScraper(api, "Alias 7")
+        self.assertEqual(scraper.get_all_links(), wiki.links(7))
+        self.assertEqual(scraper.get_canonical_title(), "Page 7")
+        self.assertEqual(scraper.get_full_text().split(),
+                         page.get_full_text().split())
+        with self.assertRaises(Exception):
+            WikiScraper(base_url, "Page 50", fetcher=fetcher)
+
+    def test_summary_same_from_html_and_api(self):
+        """--summary daje ten sam akapit z HTML i z api.php, także dla
+        artykułu bez wstępu (pierwszy akapit w sekcji)."""
+        _, base_url = start_server(wiki_handler(SyntheticWiki(n_pages=5)),
+                                   self.addCleanup)
+        fetcher = PageFetcher()
+        outputs = []
+        for api in (None, MediaWikiAPI(base_url, fetcher=fetcher)):
+            output = io.StringIO()
+            with mock.patch.object(wiki_scraper, 'BASE_URL', base_url), \
+                    contextlib.redirect_stdout(output):
+                wiki_scraper.cmd_summary("Page 3", fetcher=fetcher, api=api)
+            outputs.append(output.getvalue())
+        self.assertGreater(len(outputs[0].strip()), 0)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_api_first_paragraph_spans_lines(self):
+        """Akapit wikitekstu rozbity na wiersze jest zwracany w całości."""
+        page = ApiPage("X", split_sections(
+            "== Opis ==\nPierwszy wiersz\ndrugi wiersz\n\nDrugi akapit"),
+            [], False)
+        self.assertEqual(ApiScraper(None, "X", page=page)
+                         .get_first_paragraph(),
+                         "Pierwszy wiersz drugi wiersz")
+
+    def test_throttling_and_latency(self):
+        """Odpowiedzi 429 mają Retry-After, a opóźnienie jest doliczane."""
+        wiki = SyntheticWiki(n_pages=5, throttle_rate=1.0, retry_after=7,
+                             latency_ms=20, latency_sigma=0.01)
+        _, base_url = start_server(wiki_handler(wiki), self.addCleanup)
+        fetcher = PageFetcher(max_retries=0)
+        response = fetcher.get(base_url + "/wiki/Page_1")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '7')
+        self.assertGreaterEqual(response.elapsed.total_seconds(), 0.015)
+        self.assertEqual(wiki.stats[429], 1)
+
+
+class TestPageFetcher(unittest.TestCase):
+    """Testy ponowień w PageFetcher."""
+
+    def setUp(self):
+        _, base_url = start_server(FlakyHandler, self.addCleanup)
+        self.url = f"{base_url}/wiki/Flaky"
+
+    def test_retries_after_503(self):
+        """Po 503 z Retry-After fetcher ponawia i zwraca stronę."""
+        FlakyHandler.failures_left = 2
+        fetcher = PageFetcher(max_retries=3, backoff=0)
+        html = fetcher.fetch_html(self.url)
+        self.assertIn("Strona Flaky", html)
+        self.assertEqual(fetcher.retries, 2)
+
+    def test_gives_up_after_max_retries(self):
+        """Po wyczerpaniu ponowień zgłaszany jest błąd HTTP."""
+        FlakyHandler.failures_left = 5
+        fetcher = PageFetcher(max_retries=1, backoff=0)
+        with self.assertRaises(Exception):
+            fetcher.fetch_html(self.url)
+
+
+class TestMetrics(unittest.TestCase):
+    """Pomiary etapów (--metrics)."""
+
+    def setUp(self):
+        metrics.REGISTRY.clear()
+        self.addCleanup(metrics.REGISTRY.clear)
+        self.addCleanup(metrics.disable)
+        _, self.base_url = start_server(
+            wiki_handler(SyntheticWiki(n_pages=5)), self.addCleanup)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def count_page(self):
+        page = WikiScraper(self.base_url, "Page 1", fetcher=PageFetcher())
+        with WordCounter(os.path.join(self.tmp.name, 'wc.json')) as wc:
+            wc.update(page.get_full_text(), article="Page 1")
+
+    def test_disabled_records_nothing(self):
+        """Wyłączone pomiary nic nie zbierają (pusty wspólny kontekst)."""
+        self.assertIs(metrics.stage('a'), metrics.stage('b'))
+        self.count_page()
+        self.assertEqual(metrics.REGISTRY.counters, {})
+        self.assertEqual(metrics.REGISTRY.histograms, {})
+
+    def test_stages_and_output_formats(self):
+        """Etapy strony trafiają do histogramów, a oba formaty pliku
+        zawierają te same liczby."""
+        metrics.enable()
+        self.count_page()
+        histograms = metrics.REGISTRY.histograms
+        for stage in ('fetch', 'parse', 'extract', 'tokenize', 'save'):
+            self.assertEqual(histograms[stage].count, 1, stage)
+        self.assertEqual(metrics.REGISTRY.counters['fetch.status.200'], 1)
+
+        path = os.path.join(self.tmp.name, 'metrics.jsonl')
+        metrics.write(path)
+        with open(path, encoding='utf-8') as f:
+            lines = {entry['name']: entry for entry in map(json.loads, f)}
+        self.assertEqual(sum(lines['parse']['buckets'].values()), 1)
+        self.assertEqual(lines['fetch.bytes']['value'],
+                         metrics.REGISTRY.counters['fetch.bytes'])
+
+        path = os.path.join(self.tmp.name, 'metrics.prom')
+        metrics.write(path, 'prometheus')
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        self.assertIn('wiki_scraper_stage_seconds_bucket{stage="parse",'
+                      'le="+Inf"} 1\n', text)
+        self.assertIn('wiki_scraper_stage_seconds_count{stage="save"} 1\n',
+                      text)
+        self.assertIn('wiki_scraper_fetch_status_200_total 1\n', text)
+
+
+class TestStartup(unittest.TestCase):
+    """Budżet startu komend CLI (benchmark.py startup)."""
+
+    def test_no_forbidden_imports(self):
+        """Komendy nie importują zbędnych ciężkich modułów (budżet czasu
+        sprawdza benchmark.py startup – zależy od maszyny)."""
+        for res in bench_startup(repeat=1):
+            with self.subTest(res['name']):
+                self.assertEqual(res['forbidden'], [])
+
+
+class TestSession(unittest.TestCase):
+    """Tryb wsadowy (--batch) i serwer (--serve) na wspólnym stanie."""
+
+    def setUp(self):
+        _, base_url = start_server(wiki_handler(SyntheticWiki(n_pages=10)),
+                                   self.addCleanup)
+        old_base_url = wiki_scraper.BASE_URL
+        wiki_scraper.BASE_URL = base_url
+        self.addCleanup(setattr, wiki_scraper, 'BASE_URL', old_base_url)
+        self.base_url = base_url
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        index_path = os.path.join(self.tmp.name, 'en.idx')
+        build_index(index_path, {'trainer': 1e-4, 'page': 1e-3})
+        args = wiki_scraper.build_parser().parse_args(
+            ['--batch', '-', '--store-path',
+             os.path.join(self.tmp.name, 'wc.json')])
+        self.fetcher = PageFetcher()
+        self.session = wiki_scraper.open_session(
+            args, self.fetcher, index=LanguageIndex(path=index_path))
+        self.addCleanup(self.session.close)
+
+    def test_batch(self):
+        """Komendy z pliku korzystają ze wspólnego licznika słów,
+        a błędna linia nie przerywa reszty."""
+        path = os.path.join(self.tmp.name, 'komendy.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('--summary "Page 1"\n'
+                    '# komentarz\n'
+                    '--count-words "Page 2"\n'
+                    '--summary "Page 99"\n'
+                    '--analyze-relative-word-frequency --mode article'
+                    ' --count 3\n')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), \
+                contextlib.redirect_stderr(io.StringIO()):
+            errors = run_batch(self.session, path)
+        self.assertEqual(errors, 1)
+        self.assertEqual(self.session.commands, 3)
+        first = WikiScraper(self.base_url, "Page 1",
+                            fetcher=self.fetcher).get_first_paragraph()
+        self.assertIn(first, output.getvalue())
+        counts = self.session.word_counter.get_counts()
+        top = max(counts, key=counts.get)
+        self.assertRegex(output.getvalue(), rf"\n\s*{top}\s+1\.0")
+
+    def test_server(self):
+        """Serwer zwraca wyjście komendy, a dla błędnej komendy 400."""
+        server = serve_session(self.session)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/"
+        with requests.Session() as http:
+            response = http.post(url, data='--count-words "Page 3"')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("Page 3", response.text)
+            response = http.post(url, data='--count-words "Page 3"')
+            self.assertIn("nie zmienił się", response.text)
+            response = http.post(url, data='--analyze-relative-word-frequency'
+                                            ' --mode nope --count 3')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("nieznany tryb", response.text)
+            response = http.post(url, data='--batch -')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.session.commands, 2)
+
+    def test_count_words_canonical_title(self):
+        """Inny zapis tytułu i przekierowanie nie doliczają artykułu
+        drugi raz."""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.session.run('--count-words "Page 1"')
+            counts = dict(self.session.word_counter.get_counts())
+            for line in ('--count-words Page_1', '--count-words "Alias 1"'):
+                with self.subTest(line=line):
+                    self.session.run(line)
+                    self.assertEqual(self.session.word_counter.get_counts(),
+                                     counts)
+        self.assertEqual(output.getvalue().count("nie zmienił się"), 2)
+
+    def test_server_rejects_file_options(self):
+        """Komendy serwera nie czytają ani nie zapisują plików o ścieżkach
+        z zapytania, a serwer nasłuchuje tylko lokalnie."""
+        args = wiki_scraper.build_parser().parse_args(
+            ['--serve', '0', '--store-path',
+             os.path.join(self.tmp.name, 'serve.json')])
+        session = wiki_scraper.open_session(args, self.fetcher)
+        self.addCleanup(session.close)
+        for line in ('--table "Page 1"', '--count-files /etc/passwd',
+                     '--count-words "Page 1" --state-path /tmp/x',
+                     '--analyze-relative-word-frequency --mode article'
+                     ' --count 3 --chart /tmp/x.png'):
+            with self.subTest(line=line):
+                with self.assertRaisesRegex(Exception, "--serve"):
+                    session.run(line)
+        with contextlib.redirect_stdout(io.StringIO()):
+            session.run('--summary "Page 1"')
+        self.assertEqual(session.commands, 1)
+        self.assertTrue(wiki_scraper.is_loopback('127.0.0.1'))
+        self.assertTrue(wiki_scraper.is_loopback('::1'))
+        self.assertFalse(wiki_scraper.is_loopback('0.0.0.0'))
+
+    def test_crawl(self):
+        """Przeszukiwanie w sesji dostaje własny kontroler tempa,
+        zdejmowany ze wspólnego fetchera po komendzie."""
+        state_path = os.path.join(self.tmp.name, 'state.json')
+        output = io.StringIO()
+        wc = self.session.word_counter
+        with contextlib.redirect_stdout(output), \
+                contextlib.redirect_stderr(io.StringIO()), \
+                mock.patch.object(wc.store, 'save',
+                                  wraps=wc.store.save) as save:
+            self.session.run(f'--auto-count-words "Page 0" --depth 1'
+                             f' --wait 0 --state-path {state_path}')
+        self.assertIn("Zakończono przetwarzanie.", output.getvalue())
+        self.assertIsNone(self.fetcher.rate)
+        # Zapis w punktach kontrolnych (co 20 stron), a nie po każdej
+        pages = output.getvalue().count("Przetwarzanie:")
+        self.assertGreater(pages, 2)
+        self.assertLess(save.call_count, pages)
+        self.assertEqual(wc.flush_every, 1)
+        self.assertTrue(self.session.word_counter.get_counts())
+        self.assertEqual(self.session.commands, 1)
+
+
+class FakeClock:
+    """Zegar i czekanie bez upływu prawdziwego czasu."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RobotsHandler(BaseHTTPRequestHandler):
+    """Serwuje robots.txt z Crawl-delay i zwykłe strony."""
+
+    def do_GET(self):
+        if self.path == '/robots.txt':
+            body = b"User-agent: *\nCrawl-delay: 2\nDisallow: /w/\n"
+        else:
+            body = make_page("A", []).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRateController(unittest.TestCase):
+    """Testy adaptacyjnego tempa zapytań (politeness.RateController)."""
+
+    def test_aimd_stays_within_bounds(self):
+        """429 mnoży odstęp do górnej granicy, szybkie odpowiedzi go
+        zmniejszają do dolnej granicy (--wait)."""
+        clock = FakeClock()
+        rate = RateController(min_interval=0.1, max_interval=1.0, step=0.1,
+                              clock=clock, sleep=clock.sleep)
+        for _ in range(10):
+            rate.on_response(0.05, 429)
+        self.assertEqual(rate.interval, 1.0)
+        for _ in range(20):
+            rate.on_response(0.05, 200)
+        self.assertAlmostEqual(rate.interval, 0.1)
+        rate.on_response(1.0, 200)
+        self.assertAlmostEqual(rate.interval, 0.2)
+        # Kolejne zapytania startują co najmniej co interval sekund
+        starts = []
+        for _ in range(3):
+            rate.wait()
+            starts.append(clock())
+        self.assertAlmostEqual(starts[2] - starts[1], 0.2)
+
+    def test_retry_after_pauses_requests(self):
+        """Retry-After wstrzymuje następne zapytanie na wskazany czas."""
+        clock = FakeClock()
+        rate = RateController(clock=clock, sleep=clock.sleep)
+        rate.wait()
+        rate.on_response(0.01, 503, retry_after=5)
+        self.assertAlmostEqual(rate.wait(), 5.0)
+
+    def test_fetcher_reports_to_controller(self):
+        """Fetcher czeka tylko przed zapytaniami do sieci – strona z cache
+        nie jest liczona – i zgłasza odpowiedzi 503."""
+        _, base_url = start_server(FlakyHandler, self.addCleanup)
+        url = f"{base_url}/wiki/Flaky"
+        FlakyHandler.failures_left = 2
+        with tempfile.TemporaryDirectory() as cache_dir:
+            rate = RateController(step=0.01)
+            fetcher = PageFetcher(backoff=0, rate=rate,
+                                  cache=PageCache(cache_dir, ttl=3600))
+            fetcher.fetch_html(url)
+            fetcher.fetch_html(url)
+        self.assertEqual(rate.requests, 3)
+        self.assertAlmostEqual(rate.interval, 0.01)
+
+    def test_retry_after_waited_once(self):
+        """Retry-After z 503 jest odczekiwany raz – przez kontroler tempa,
+        a nie dodatkowo przez fetcher."""
+        _, base_url = start_server(FlakyHandler, self.addCleanup)
+        FlakyHandler.failures_left = 1
+        FlakyHandler.retry_after = '5'
+        self.addCleanup(setattr, FlakyHandler, 'retry_after', '0')
+        clock = FakeClock()
+        rate = RateController(clock=clock, sleep=clock.sleep)
+        fetcher = PageFetcher(rate=rate)
+        with mock.patch('fetcher.time.sleep') as sleep:
+            fetcher.fetch_html(f"{base_url}/wiki/Flaky")
+        sleep.assert_not_called()
+        self.assertEqual(fetcher.retries, 1)
+        self.assertGreaterEqual(clock.now, 5.0)
+        self.assertLess(clock.now, 10.0)
+
+    def test_robots_crawl_delay(self):
+        """Crawl-delay z robots.txt podnosi dolną granicę odstępu."""
+        _, base = start_server(RobotsHandler, self.addCleanup)
+        delay = robots_crawl_delay(base, PageFetcher())
+        self.assertEqual(delay, 2.0)
+        rate = RateController(min_interval=0.5)
+        rate.set_crawl_delay(delay)
+        self.assertEqual((rate.min_interval, rate.interval), (2.0, 2.0))
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """Serwuje strony z nagłówkiem ETag i odpowiada 304 na If-None-Match."""
+
+    requests_seen = 0
+
+    def do_GET(self):
+        ETagHandler.requests_seen += 1
+        etag = '"v1"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        title = self.path.split('/wiki/', 1)[-1]
+        body = make_page(title, []).encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPageCache(unittest.TestCase):
+    """Testy dyskowego cache stron."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        _, base_url = start_server(ETagHandler, self.addCleanup)
+        self.base = f"{base_url}/wiki/"
+        ETagHandler.requests_seen = 0
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_conditional_revalidation(self):
+        """Drugie pobranie jest rewalidowane odpowiedzią 304."""
+        cache = PageCache(self.dir.name)
+        fetcher = PageFetcher(cache=cache)
+        first = fetcher.fetch_html(self.base + "A")
+        second = fetcher.fetch_html(self.base + "A")
+        self.assertEqual(first, second)
+        stats = cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['revalidated'], 1)
+        self.assertEqual(stats['bytes_saved'], len(first.encode('utf-8')))
+
+    def test_ttl_and_offline_need_no_network(self):
+        """Świeże wpisy i tryb offline nie wysyłają zapytań."""
+        PageFetcher(cache=PageCache(self.dir.name)).fetch_html(self.base + "A")
+        fresh = PageFetcher(cache=PageCache(self.dir.name, ttl=3600))
+        fresh.fetch_html(self.base + "A")
+        offline = PageFetcher(cache=PageCache(self.dir.name, offline=True))
+        offline.fetch_html(self.base + "A")
+        self.assertEqual(ETagHandler.requests_seen, 1)
+        with self.assertRaises(Exception):
+            offline.fetch_html(self.base + "B")
+
+    def test_lru_eviction(self):
+        """Po przekroczeniu limitu usuwany jest najdawniej używany wpis."""
+        cache = PageCache(self.dir.name, max_bytes=10 ** 6)
+        cache.store("u1", "a" * 1000)
+        cache.store("u2", "b" * 1000)
+        os.utime(cache._paths(cache._key("u1"))[0], (1, 1))
+        cache.max_bytes = cache.total_bytes - 1
+        cache.evict()
+        self.assertIsNone(cache.lookup("u1"))
+        self.assertIsNotNone(cache.lookup("u2"))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,33 +4,57 @@ Główny skrypt CLI do scrapowania Bulbapedii i analizy słów.
 """
 
 import argparse
+import contextlib
+import signal
 import sys
 import time
-from collections import deque
 import io
-
-import pandas as pd
-
-from scraper import WikiScraper
-from word_counter import WordCounter
-from language_analyzer import LanguageAnalyzer
+from itertools import islice
+
+# Moduły z ciężkimi zależnościami (requests, bs4, pandas, numpy, matplotlib,
+# wordfreq, asyncio) importowane są dopiero w komendach, które ich używają –
+# krótkie wywołania nie płacą za import całości
+from word_counter import WordCounter, hash_chunks, count_files_parallel
+from crawl_state import CrawlState
+from dedup import VisitedSet, normalize_title
+from word_store import make_store
+from heavy_hitters import ApproxWordCounter
+from frontier import PriorityFrontier, CrawlBudget
+import metrics
 
 BASE_URL = "https://bulbapedia.bulbagarden.net"
 LANGUAGE = "en"
 
 
-def cmd_summary(fraza):
+def make_scraper(fraza, fetcher=None, parser='bs4', api=None, ahead=()):
+    """
+    Tworzy scraper artykułu: WikiScraper (HTML) albo ApiScraper,
+    jeśli podano obiekt MediaWikiAPI.
+
+    :param ahead: tytuły pobierane przez API w tym samym zapytaniu
+    """
+    if api is not None:
+        from mediawiki_api import ApiScraper
+        return ApiScraper(api, fraza, ahead=ahead)
+    from scraper import WikiScraper
+    return WikiScraper(BASE_URL, fraza, fetcher=fetcher, parser=parser)
+
+
+def cmd_summary(fraza, fetcher=None, parser='bs4', api=None):
     """Wyświetla pierwszy paragraf artykułu."""
-    scraper = WikiScraper(BASE_URL, fraza)
+    scraper = make_scraper(fraza, fetcher, parser, api)
     print(scraper.get_first_paragraph())
 
 
-def cmd_table(fraza, number, first_row_is_header):
+def cmd_table(fraza, number, first_row_is_header, fetcher=None,
+              parser='bs4'):
     """
     Zapisuje tabelę z artykułu do pliku CSV.
     Dodatkowo wypisuje częstotliwości wartości w kolumnach.
     """
-    scraper = WikiScraper(BASE_URL, fraza)
+    import pandas as pd
+    from scraper import WikiScraper
+    scraper = WikiScraper(BASE_URL, fraza, fetcher=fetcher, parser=parser)
     table_soup = scraper.get_table(number)
 
     # Próba wczytania tabeli przez pandas.read_html (łatwiejsze)
@@ -72,66 +96,417 @@ def cmd_table(fraza, number, first_row_is_header):
             print(df[col].value_counts().to_string())
 
 
-def cmd_count_words(fraza):
-    """Zlicza słowa w artykule i aktualizuje plik JSON."""
-    scraper = WikiScraper(BASE_URL, fraza)
-    full_text = scraper.get_full_text()
-    counter = WordCounter()
-    counter.update(full_text)
-    print(f"Zaktualizowano liczniki słów dla '{fraza}'.")
+def cmd_count_words(fraza, fetcher=None, word_counter=None, parser='bs4',
+                    api=None):
+    """Zlicza słowa w artykule i aktualizuje magazyn liczników."""
+    scraper = make_scraper(fraza, fetcher, parser, api)
+    counter = word_counter or WordCounter()
+    # Rejestr jest kluczowany tytułem kanonicznym, jak w CrawlState.page_done
+    # – 'Page_1', 'page 1' i przekierowanie to ten sam artykuł
+    article = (normalize_title(scraper.get_canonical_title() or fraza)
+               or normalize_title(fraza))
+    # Tekst trafia do licznika strumieniowo, węzeł po węźle
+    content_hash = hash_chunks(scraper.iter_text_chunks())
+    changed = counter.update_chunks(scraper.iter_text_chunks(),
+                                    article=article,
+                                    content_hash=content_hash)
+    counter.flush()
+    if changed:
+        print(f"Zaktualizowano liczniki słów dla '{fraza}'.")
+    else:
+        print(f"Artykuł '{fraza}' nie zmienił się – liczniki bez zmian.")
+
+
+def cmd_count_files(paths, workers=None, word_counter=None):
+    """
+    Zlicza słowa w plikach tekstowych równolegle (pula procesów)
+    i dodaje wynik do magazynu liczników.
+    """
+    counter = word_counter or WordCounter()
+    counts = count_files_parallel(paths, workers=workers)
+    counter.update_counts(counts)
+    counter.flush()
+    print(f"Zliczono {sum(counts.values())} słów ({len(counts)} różnych)"
+          f" w {len(paths)} plikach.")
 
 
-def cmd_analyze(mode, count, chart):
+def cmd_ingest_dump(path, workers=None, word_counter=None):
+    """
+    Zlicza słowa ze zrzutu XML MediaWiki (także .bz2 / .gz) strumieniowo,
+    bez pobierania stron, i dodaje je do magazynu liczników.
+    """
+    from dump_reader import ingest_dump
+    counter = word_counter or WordCounter()
+    stats = ingest_dump(path, counter, workers=workers or 1)
+    mb = stats['bytes'] / 2 ** 20
+    print(f"Zliczono {stats['words']} słów z {stats['pages']} artykułów"
+          f" (pominięto {stats['skipped']} stron) – {mb:.1f} MB"
+          f" w {stats['seconds']:.1f} s"
+          f" ({mb / max(stats['seconds'], 1e-9):.1f} MB/s).")
+
+
+def cmd_analyze(mode, count, chart, word_counter=None, index=None):
     """
     Przeprowadza analizę częstotliwości słów na podstawie
-    zebranych danych (z pliku JSON) i języka wzorcowego.
+    zebranych danych (z magazynu liczników) i języka wzorcowego.
+
+    :param index: otwarty już indeks języka (LanguageIndex) – domyślnie
+                  otwierany na nowo
     """
-    wc = WordCounter()
+    from language_analyzer import LanguageAnalyzer
+    wc = word_counter or WordCounter()
     analyzer = LanguageAnalyzer(language_code=LANGUAGE,
-                                word_counts=wc.get_counts())
+                                word_counts=wc.get_counts(),
+                                index=index)
     df = analyzer.prepare_table(mode=mode, n=count)
     print(df.to_string(index=False))
+    if mode in ('kl', 'js'):
+        name = 'Kullbacka-Leiblera' if mode == 'kl' else 'Jensena-Shannona'
+        print(f"Dywergencja {name}: {analyzer.divergence(mode):.4f} bit")
+    if isinstance(wc, ApproxWordCounter):
+        print(f"Tryb przybliżony: {wc.sketch.total} słów,"
+              f" {len(wc.sketch)} monitorowanych; oszacowania liczb zawyżone"
+              f" najwyżej o {wc.error_bound():.0f}")
 
     if chart:
         analyzer.plot_chart(df, chart)
         print(f"Wykres zapisany do {chart}")
 
 
-def cmd_auto_count_words(poczatkowa, depth, wait):
+def cmd_auto_count_words(poczatkowa, depth, wait, concurrency=None,
+                         per_host=None, fetcher=None, word_counter=None,
+                         parser='bs4', state=None, resume=False, api=None,
+                         parse_workers=0, rate=None, budget=None):
     """
     Automatyczne przechodzenie po linkach (BFS) i zliczanie słów
     z odwiedzonych artykułów.
-    """
-    queue = deque()
-    queue.append((poczatkowa, 0))
-    visited = {poczatkowa}
-    wc = WordCounter()
 
-    while queue:
-        fraza, curr_depth = queue.popleft()
+    Jeśli podano concurrency, strony są pobierane asynchronicznie
+    (wiele naraz), a wait oznacza minimalny odstęp między zapytaniami
+    do jednego hosta zamiast pauzy po każdej stronie.
+
+    Stan przeszukiwania (CrawlState z plikiem) jest okresowo zapisywany;
+    z resume=True przeszukiwanie jest kontynuowane od zapisanego miejsca.
+
+    Z obiektem api (MediaWikiAPI) strony są pobierane przez api.php
+    partiami – po kilkadziesiąt tytułów z początku kolejki naraz.
+
+    W trybie asynchronicznym parse_workers > 0 przenosi parsowanie
+    i zliczanie słów do puli procesów; po przeszukiwaniu wypisywane są
+    statystyki etapów potoku (pobieranie, parsowanie, zapis).
+
+    Z obiektem rate (politeness.RateController, podpiętym do fetchera)
+    odstępy między zapytaniami wyznacza kontroler – na podstawie czasu
+    odpowiedzi, 429/503 i Retry-After – a wait jest tylko ich dolną
+    granicą; strony z cache nie czekają wcale. Bez niego po każdej
+    stronie następuje stała pauza wait.
+
+    Kolejność stron wyznacza state.frontier (FIFO albo kolejka
+    priorytetowa), a budget (frontier.CrawlBudget) kończy przeszukiwanie
+    po limicie stron lub czasu – reszta kolejki zostaje w stanie
+    do wznowienia.
+    """
+    wc = word_counter or WordCounter()
+    state = state or CrawlState()
+    if state.start(poczatkowa, depth, resume=resume):
+        print(f"Wznowiono przeszukiwanie: {state.pages} stron przetworzonych,"
+              f" {len(state.frontier)} w kolejce.")
+    if concurrency:
+        from crawler import AsyncCrawler
+        crawler = AsyncCrawler(BASE_URL, wc,
+                               concurrency=concurrency,
+                               per_host=per_host,
+                               min_interval=0.0 if rate else wait,
+                               fetcher=fetcher,
+                               parser=parser,
+                               api=api,
+                               processes=parse_workers)
+        crawler.crawl(poczatkowa, depth, state=state, budget=budget)
+        state.close(wc)
+        wc.flush()
+        print(state.summary())
+        print(crawler.stats_report())
+        if rate is not None:
+            print(rate.summary())
+        print("Zakończono przetwarzanie.")
+        return
+
+    while state.frontier:
+        reason = budget.exhausted() if budget is not None else None
+        if reason:
+            print(f"Zatrzymano przeszukiwanie: {reason}.")
+            break
+        fraza, curr_depth = state.frontier[0]
         print(f"Przetwarzanie: {fraza} (głębokość {curr_depth})")
+        ahead = ([title for title, _ in islice(state.frontier, api.batch_size)]
+                 if api is not None else ())
         try:
-            scraper = WikiScraper(BASE_URL, fraza)
+            scraper = make_scraper(fraza, fetcher, parser, api, ahead)
         except Exception as e:
             print(f"Błąd dla {fraza}: {e}")
+            state.page_done(fraza)
+            if budget is not None:
+                budget.page_done()
             continue
 
-        full_text = scraper.get_full_text()
-        wc.update(full_text)
+        links = scraper.get_all_links() if curr_depth < depth else []
+        article = state.page_done(fraza, links, curr_depth + 1,
+                                  canonical=scraper.get_canonical_title())
+        if article is not None:
+            content_hash = hash_chunks(scraper.iter_text_chunks())
+            wc.update_chunks(scraper.iter_text_chunks(), article=article,
+                             content_hash=content_hash)
+        state.maybe_checkpoint(wc)
+        if budget is not None:
+            budget.page_done()
+
+        if rate is None:
+            time.sleep(wait)
+
+    state.close(wc)
+    wc.flush()
+    print(state.summary())
+    if rate is not None:
+        print(rate.summary())
+    print("Zakończono przetwarzanie.")
+
 
-        if curr_depth < depth:
-            for link in scraper.get_all_links():
-                if link not in visited:
-                    visited.add(link)
-                    queue.append((link, curr_depth + 1))
+def open_word_counter(args):
+    """
+    Tworzy WordCounter z magazynem wybranym w opcjach CLI
+    (lub ApproxWordCounter, jeśli podano --approx-top).
+    """
+    # Przeszukiwanie domyślnie zapisuje liczniki tylko w punktach
+    # kontrolnych – przy magazynie json każdy zapis to cały plik
+    flush_every = args.flush_every or (
+        args.checkpoint_every if args.auto_count_words else 1)
+    if args.approx_top:
+        return ApproxWordCounter(args.store_path or 'word-counts.topk.json',
+                                 capacity=args.approx_top,
+                                 flush_every=flush_every)
+    return WordCounter(store=make_store(args.store, args.store_path),
+                       flush_every=flush_every)
 
-        time.sleep(wait)
 
-    print("Zakończono przetwarzanie.")
+COMMANDS = ('summary', 'table', 'count_words', 'count_files', 'ingest_dump',
+            'analyze_relative_word_frequency', 'auto_count_words', 'batch',
+            'serve')
 
 
-def main():
-    parser = argparse.ArgumentParser(
+def command_name(args):
+    """Nazwa wybranej komendy (do nazw etapów w pomiarach)."""
+    return next((name for name in COMMANDS
+                 if getattr(args, name) not in (None, False)), 'help')
+
+
+def session_word_counter(args, session=None):
+    """
+    Licznik słów dla komendy: wspólny licznik sesji (--batch, --serve),
+    zamykany dopiero z sesją, albo nowy z opcji CLI.
+    """
+    if session is not None:
+        return contextlib.nullcontext(session.word_counter)
+    return open_word_counter(args)
+
+
+# Opcje komend czytające lub zapisujące pliki o ścieżkach z komendy –
+# niedostępne w komendach przesłanych do serwera (--serve)
+SERVE_FILE_OPTIONS = ('table', 'count_files', 'ingest_dump', 'chart',
+                      'state_path', 'store_path', 'cache_dir', 'metrics',
+                      'profile')
+
+
+def check_serve_line(line_args, parser):
+    """
+    Odrzuca komendę serwera z opcją dostępu do plików
+    (SERVE_FILE_OPTIONS).
+
+    :raises Exception: dla opcji innej niż domyślna
+    """
+    for name in SERVE_FILE_OPTIONS:
+        if getattr(line_args, name) != parser.get_default(name):
+            raise Exception(f"--{name.replace('_', '-')} nie działa"
+                            f" w trybie --serve (dostęp do plików)")
+
+
+def open_session(args, fetcher, api=None, page_parser='bs4', index=None):
+    """
+    Tworzy sesję (session.Session) dla --batch i --serve: komendy
+    korzystają ze wspólnego fetchera, licznika słów z opcji CLI i indeksu
+    języka. W trybie --serve komendy z opcjami dostępu do plików są
+    odrzucane (check_serve_line).
+
+    :param index: gotowy indeks języka (domyślnie otwierany przy
+                  pierwszej analizie)
+    """
+    from session import LineArgumentParser, Session
+
+    def execute(line_args, session):
+        if line_args.batch or line_args.serve is not None:
+            raise Exception("--batch i --serve nie działają wewnątrz sesji")
+        if args.serve is not None:
+            check_serve_line(line_args, session.parser)
+        with metrics.stage(f"command.{command_name(line_args)}"):
+            run_command(line_args, session.parser, fetcher, api, None,
+                        page_parser, session=session)
+
+    return Session(build_parser(LineArgumentParser), execute,
+                   open_word_counter(args), LANGUAGE, index=index)
+
+
+def is_loopback(host):
+    """Czy host to adres pętli zwrotnej (127.0.0.0/8, ::1, localhost)."""
+    import ipaddress
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def make_rate_controller(args):
+    """Kontroler tempa zapytań (politeness.RateController) z opcji CLI."""
+    from politeness import RateController
+    return RateController(min_interval=args.wait, max_interval=args.max_wait,
+                          log=lambda line: print(line, file=sys.stderr))
+
+
+def run_crawl(args, fetcher, api, rate, page_parser, session=None):
+    """
+    Przeszukiwanie --auto-count-words z opcjami CLI: zbiór odwiedzonych,
+    kolejka, plik stanu, budżet i licznik słów.
+    """
+    visited = None
+    if args.bloom_visited:
+        visited = VisitedSet(args.bloom_visited,
+                             path=args.state_path + '.visited.sqlite')
+    frontier = None
+    if args.frontier == 'priority' or args.title_filter:
+        frontier = PriorityFrontier(title_filter=args.title_filter)
+    state = CrawlState(args.state_path,
+                       checkpoint_every=args.checkpoint_every,
+                       visited=visited,
+                       frontier=frontier)
+    budget = None
+    if args.max_pages is not None or args.max_seconds is not None:
+        budget = CrawlBudget(args.max_pages, args.max_seconds)
+    with session_word_counter(args, session) as wc:
+        # Licznik sesji jest otwierany z opcjami sesji – odstęp zapisów
+        # przeszukiwania (open_word_counter) ustalamy na czas komendy
+        session_flush_every = wc.flush_every
+        wc.flush_every = args.flush_every or args.checkpoint_every
+        try:
+            cmd_auto_count_words(args.auto_count_words, args.depth, args.wait,
+                                 concurrency=args.concurrency,
+                                 per_host=args.per_host,
+                                 fetcher=fetcher,
+                                 word_counter=wc,
+                                 parser=page_parser,
+                                 state=state,
+                                 resume=args.resume,
+                                 api=api,
+                                 parse_workers=args.parse_workers,
+                                 rate=rate,
+                                 budget=budget)
+        finally:
+            wc.flush_every = session_flush_every
+    if visited is not None:
+        visited.close()
+
+
+def run_command(args, parser, fetcher, api, rate, page_parser, session=None):
+    """
+    Wykonuje komendę wybraną w argumentach wywołania.
+
+    :param session: sesja (session.Session), w której wykonywana jest
+                    komenda z linii --batch lub zapytania --serve –
+                    dostarcza licznik słów i indeks języka
+    """
+    if args.summary:
+        cmd_summary(args.summary, fetcher=fetcher, parser=page_parser,
+                    api=api)
+    elif args.table:
+        if args.number is None:
+            parser.error("--table wymaga podania --number")
+        cmd_table(args.table, args.number, args.first_row_is_header,
+                  fetcher=fetcher, parser=page_parser)
+    elif args.count_words:
+        with session_word_counter(args, session) as wc:
+            cmd_count_words(args.count_words, fetcher=fetcher,
+                            word_counter=wc, parser=page_parser, api=api)
+    elif args.count_files:
+        with session_word_counter(args, session) as wc:
+            cmd_count_files(args.count_files, workers=args.workers,
+                            word_counter=wc)
+    elif args.ingest_dump:
+        with session_word_counter(args, session) as wc:
+            cmd_ingest_dump(args.ingest_dump, workers=args.workers,
+                            word_counter=wc)
+    elif args.analyze_relative_word_frequency:
+        if args.mode is None or args.count is None:
+            parser.error("--analyze-relative-word-frequency wymaga --mode i --count")
+        from language_analyzer import MODES
+        if args.mode not in MODES:
+            parser.error(f"nieznany tryb --mode {args.mode}"
+                         f" (dostępne: {', '.join(MODES)})")
+        with session_word_counter(args, session) as wc:
+            cmd_analyze(args.mode, args.count, args.chart, word_counter=wc,
+                        index=session.index if session else None)
+    elif args.auto_count_words:
+        if args.depth is None or args.wait is None:
+            parser.error("--auto-count-words wymaga --depth i --wait")
+        # W sesji (--batch/--serve) fetcher jest wspólny, a kontroler
+        # tempa powstaje osobno dla każdej komendy przeszukiwania
+        own_rate = rate is None and fetcher is not None
+        if own_rate:
+            rate = fetcher.rate = make_rate_controller(args)
+        try:
+            if not (args.offline or args.ignore_crawl_delay):
+                from politeness import robots_crawl_delay
+                rate.set_crawl_delay(robots_crawl_delay(BASE_URL, fetcher))
+            run_crawl(args, fetcher, api, rate, page_parser, session)
+        finally:
+            if own_rate:
+                fetcher.rate = None
+    elif args.batch or args.serve is not None:
+        from session import run_batch, serve_session
+        with open_session(args, fetcher, api, page_parser) as shared:
+            if args.batch:
+                errors = run_batch(shared, args.batch)
+                print(f"Wykonano komend: {shared.commands},"
+                      f" błędy: {errors}", file=sys.stderr)
+                if errors:
+                    sys.exit(1)
+            else:
+                server = serve_session(shared, args.host, args.serve)
+                print(f"Serwer działa pod http://{args.host}:"
+                      f"{server.server_port} (Ctrl+C kończy)",
+                      file=sys.stderr)
+                # SIGTERM kończy serwer tak jak Ctrl+C – z zapisem liczników
+                signal.signal(signal.SIGTERM, _raise_interrupt)
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    server.server_close()
+    else:
+        parser.print_help()
+
+
+def build_parser(parser_class=argparse.ArgumentParser):
+    """
+    Tworzy parser argumentów CLI.
+
+    :param parser_class: klasa parsera (np. session.LineArgumentParser
+                         dla komend w liniach --batch i zapytaniach --serve)
+    """
+    parser = parser_class(
         description='WikiScraper - narzędzie do scrapowania Bulbapedii'
     )
 
@@ -143,19 +518,46 @@ def main():
                        help='Zapisz tabelę do CSV (wymaga --number)')
     group.add_argument('--count-words', metavar='fraza',
                        help='Zlicz słowa w artykule')
+    group.add_argument('--count-files', metavar='PLIK', nargs='+',
+                       help='Zlicz słowa w plikach tekstowych (równolegle,'
+                            ' liczba procesów: --workers)')
+    group.add_argument('--ingest-dump', metavar='PLIK',
+                       help='Zlicz słowa ze zrzutu XML MediaWiki'
+                            ' (.xml, .xml.bz2, .xml.gz) bez pobierania stron'
+                            ' (procesy robocze: --workers)')
     group.add_argument('--analyze-relative-word-frequency',
                        action='store_true',
                        help='Analiza częstotliwości (wymaga --mode i --count)')
     group.add_argument('--auto-count-words', metavar='fraza',
                        help='Automatyczne zliczanie słów z podążaniem za linkami'
                             ' (wymaga --depth i --wait)')
-
+    group.add_argument('--batch', metavar='PLIK',
+                       help='Wykonaj komendy z pliku (- – ze standardowego'
+                            ' wejścia), po jednej w linii, np. --summary'
+                            ' Pikachu; połączenia, liczniki słów i indeks'
+                            ' języka są wspólne dla wszystkich')
+    group.add_argument('--serve', metavar='PORT', type=int,
+                       help='Uruchom lokalny serwer HTTP wykonujący komendy'
+                            ' z treści zapytań POST (jak linie --batch)'
+                            ' na stanie trzymanym w pamięci. Serwer nie ma'
+                            ' uwierzytelniania: każdy użytkownik tej maszyny'
+                            ' może wykonywać komendy z uprawnieniami'
+                            ' procesu, dlatego nasłuchuje tylko na adresie'
+                            ' lokalnym, a opcje czytające lub zapisujące'
+                            ' pliki (--table, --count-files, --chart,'
+                            ' --state-path itd.) są odrzucane')
+
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Adres nasłuchiwania serwera (dla --serve;'
+                             ' tylko adres pętli zwrotnej)')
     parser.add_argument('--number', type=int,
                         help='Numer tabeli (dla --table)')
     parser.add_argument('--first-row-is-header', action='store_true',
                         help='Czy pierwszy wiersz tabeli to nagłówek (dla --table)')
-    parser.add_argument('--mode', choices=['article', 'language'],
-                        help='Tryb analizy (dla --analyze-relative-word-frequency)')
+    parser.add_argument('--mode',
+                        help='Tryb analizy: article, language lub wynik'
+                             ' porównawczy log-ratio, keyness, kl, js'
+                             ' (dla --analyze-relative-word-frequency)')
     parser.add_argument('--count', type=int,
                         help='Liczba słów do analizy (dla --analyze-relative-word-frequency)')
     parser.add_argument('--chart', metavar='PLIK_PNG',
@@ -164,29 +566,178 @@ def main():
     parser.add_argument('--depth', type=int,
                         help='Głębokość przechodzenia (dla --auto-count-words)')
     parser.add_argument('--wait', type=float,
-                        help='Czas oczekiwania między zapytaniami'
+                        help='Minimalny odstęp między zapytaniami w sekundach'
+                             ' – tempo dobierane jest adaptacyjnie, nie'
+                             ' szybciej niż co --wait (dla --auto-count-words)')
+    parser.add_argument('--max-wait', type=float, default=30.0,
+                        help='Maks. odstęp między zapytaniami po spowolnieniu'
+                             ' przy 429/503 lub wolnych odpowiedziach')
+    parser.add_argument('--ignore-crawl-delay', action='store_true',
+                        help='Nie stosuj Crawl-delay z robots.txt')
+    parser.add_argument('--frontier', choices=['bfs', 'priority'],
+                        default='bfs',
+                        help='Kolejność odwiedzania: wszerz (domyślnie) lub'
+                             ' najpierw strony z największą liczbą'
+                             ' odnalezionych linków do nich'
+                             ' (dla --auto-count-words)')
+    parser.add_argument('--title-filter', metavar='REGEX',
+                        help='Odwiedzaj najpierw strony, których tytuł pasuje'
+                             ' do wyrażenia (włącza --frontier priority)')
+    parser.add_argument('--max-pages', type=int,
+                        help='Zakończ po przetworzeniu tylu stron'
                              ' (dla --auto-count-words)')
+    parser.add_argument('--max-seconds', type=float,
+                        help='Zakończ po tylu sekundach'
+                             ' (dla --auto-count-words)')
+    parser.add_argument('--concurrency', type=int,
+                        help='Liczba stron pobieranych równocześnie – włącza'
+                             ' tryb asynchroniczny (dla --auto-count-words)')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Liczba procesów parsujących strony i zliczających'
+                             ' słowa (dla --auto-count-words z --concurrency;'
+                             ' domyślnie 0 – parsowanie w wątkach)')
+    parser.add_argument('--per-host', type=int,
+                        help='Maks. liczba równoczesnych zapytań do jednego'
+                             ' hosta (dla --auto-count-words z --concurrency)')
+    parser.add_argument('--base-url', metavar='URL',
+                        help=f'Bazowy adres wiki (domyślnie {BASE_URL}),'
+                             ' np. lokalnej wiki z synthetic_wiki.py')
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help='Limit czasu odpowiedzi HTTP w sekundach')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='Maks. liczba ponowień zapytania po błędzie'
+                             ' 429/5xx lub błędzie sieci')
+    parser.add_argument('--cache-dir', metavar='KATALOG',
+                        help='Katalog dyskowego cache stron (włącza cache)')
+    parser.add_argument('--cache-ttl', type=float,
+                        help='Czas świeżości wpisu cache w sekundach'
+                             ' (bez tego każdy wpis jest rewalidowany)')
+    parser.add_argument('--cache-max-mb', type=float, default=512,
+                        help='Maks. rozmiar cache w MB (usuwanie LRU)')
+    parser.add_argument('--offline', action='store_true',
+                        help='Korzystaj wyłącznie z cache, bez sieci'
+                             ' (wymaga --cache-dir)')
+    parser.add_argument('--workers', type=int,
+                        help='Liczba procesów roboczych (dla --count-files –'
+                             ' domyślnie liczba rdzeni – i --ingest-dump –'
+                             ' domyślnie 1)')
+    parser.add_argument('--source', choices=['html', 'api'], default='html',
+                        help='Źródło artykułów: renderowany HTML (domyślnie)'
+                             ' lub api.php MediaWiki – tekst i linki wielu'
+                             ' artykułów w jednym zapytaniu (bez --table)')
+    parser.add_argument('--api-path', default='/w/api.php',
+                        help='Ścieżka do api.php na serwerze wiki'
+                             ' (dla --source api)')
+    parser.add_argument('--fast-parse', action='store_true',
+                        help='Szybkie parsowanie przez lxml (obiekty tworzone'
+                             ' tylko dla treści artykułu i linków)')
+    parser.add_argument('--store', choices=['json', 'sqlite', 'binary'],
+                        default='json',
+                        help='Magazyn liczników słów (domyślnie json;'
+                             ' binary – zwarty plik mapowany do pamięci)')
+    parser.add_argument('--store-path', metavar='PLIK',
+                        help='Ścieżka do magazynu liczników (domyślnie'
+                             ' word-counts.json, word-counts.sqlite'
+                             ' lub word-counts.bin)')
+    parser.add_argument('--flush-every', type=int,
+                        help='Co ile stron zapisywać liczniki słów'
+                             ' (domyślnie po każdej, a przy'
+                             ' --auto-count-words co --checkpoint-every)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Wznów przerwane przeszukiwanie z zapisanego'
+                             ' stanu (dla --auto-count-words)')
+    parser.add_argument('--state-path', metavar='PLIK',
+                        default='crawl-state.json',
+                        help='Plik stanu przeszukiwania (kolejka i odwiedzone'
+                             ' strony; dziennik w PLIK.journal)')
+    parser.add_argument('--checkpoint-every', type=int, default=20,
+                        help='Co ile stron zapisywać liczniki i stan'
+                             ' przeszukiwania')
+    parser.add_argument('--bloom-visited', type=int, metavar='N',
+                        help='Zbiór odwiedzonych stron jako filtr Blooma na'
+                             ' ok. N stron (pełna lista w SQLite na dysku)'
+                             ' zamiast zbioru w pamięci')
+    parser.add_argument('--approx-top', type=int, metavar='K',
+                        help='Przybliżone zliczanie w stałej pamięci:'
+                             ' monitoruj K najczęstszych słów (Space-Saving,'
+                             ' stan w word-counts.topk.json)')
+
+    parser.add_argument('--metrics', metavar='PLIK',
+                        help='Zbieraj liczniki i histogramy czasów etapów'
+                             ' (pobieranie, parsowanie, tokenizacja, zapis'
+                             ' itd.) i zapisz je na koniec do pliku')
+    parser.add_argument('--metrics-format', choices=['jsonl', 'prometheus'],
+                        default='jsonl',
+                        help='Format pliku --metrics: JSON lines (domyślnie)'
+                             ' lub tekstowy format Prometheusa')
+    parser.add_argument('--profile', metavar='PLIK',
+                        help='Profiluj wykonanie komendy i zapisz wynik'
+                             ' do pliku')
+    parser.add_argument('--profile-mode', choices=['cpu', 'memory'],
+                        default='cpu',
+                        help='cpu – cProfile (plik pstats), memory –'
+                             ' tracemalloc (szczyt i miejsca alokacji)')
+    return parser
 
-    args = parser.parse_args()
 
-    if args.summary:
-        cmd_summary(args.summary)
-    elif args.table:
-        if args.number is None:
-            parser.error("--table wymaga podania --number")
-        cmd_table(args.table, args.number, args.first_row_is_header)
-    elif args.count_words:
-        cmd_count_words(args.count_words)
-    elif args.analyze_relative_word_frequency:
-        if args.mode is None or args.count is None:
-            parser.error("--analyze-relative-word-frequency wymaga --mode i --count")
-        cmd_analyze(args.mode, args.count, args.chart)
-    elif args.auto_count_words:
-        if args.depth is None or args.wait is None:
-            parser.error("--auto-count-words wymaga --depth i --wait")
-        cmd_auto_count_words(args.auto_count_words, args.depth, args.wait)
-    else:
-        parser.print_help()
+def main():
+    global BASE_URL
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.base_url:
+        BASE_URL = args.base_url.rstrip('/')
+    page_parser = 'lxml' if args.fast_parse else 'bs4'
+    if args.offline and not args.cache_dir:
+        parser.error("--offline wymaga --cache-dir")
+    if args.approx_top is not None and args.store != 'json':
+        parser.error("--approx-top działa tylko z magazynem json")
+    if args.source == 'api' and (args.table or args.offline):
+        parser.error("--source api nie obsługuje --table ani --offline")
+    if args.serve is not None and not is_loopback(args.host):
+        parser.error("--serve nasłuchuje tylko na adresie lokalnym"
+                     " (np. 127.0.0.1)")
+
+    cache = None
+    rate = None
+    fetcher = None
+    api = None
+    if (args.summary or args.table or args.count_words or args.auto_count_words
+            or args.batch or args.serve is not None):
+        from fetcher import PageFetcher
+        from page_cache import PageCache
+        if args.cache_dir:
+            cache = PageCache(args.cache_dir,
+                              max_bytes=int(args.cache_max_mb * 1024 * 1024),
+                              ttl=args.cache_ttl,
+                              offline=args.offline)
+        if args.auto_count_words and args.wait is not None:
+            rate = make_rate_controller(args)
+        # Jeden fetcher (pula połączeń keep-alive) na całe uruchomienie
+        fetcher = PageFetcher(timeout=(min(5.0, args.timeout), args.timeout),
+                              max_retries=args.retries,
+                              cache=cache,
+                              rate=rate)
+        if args.source == 'api':
+            from mediawiki_api import MediaWikiAPI
+            api = MediaWikiAPI(BASE_URL, fetcher=fetcher,
+                               api_path=args.api_path)
+
+    if args.metrics:
+        metrics.enable()
+    profiler = (metrics.profile(args.profile, args.profile_mode)
+                if args.profile else contextlib.nullcontext())
+    try:
+        with profiler, metrics.stage(f"command.{command_name(args)}"):
+            run_command(args, parser, fetcher, api, rate, page_parser)
+    finally:
+        if args.metrics:
+            metrics.write(args.metrics, args.metrics_format)
+            print(f"Pomiary zapisane do {args.metrics}", file=sys.stderr)
+        if args.profile:
+            print(f"Profil zapisany do {args.profile}", file=sys.stderr)
+
+    if cache is not None:
+        print(f"Cache: {cache.stats()}", file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,122 @@
+"""
+Zamiana źródła wikitekstu (MediaWiki) na zwykły tekst i sekcje.
+
+To uproszczony konwerter oparty na wyrażeniach regularnych: usuwa
+szablony, przypisy, komentarze, znaczniki HTML i formatowanie, a z linków
+zostawia widoczny tekst. Wystarcza do zliczania słów i streszczeń.
+"""
+
+import re
+
+COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+REF_RE = re.compile(r'<ref[^>/]*/>|<ref[^>]*>.*?</ref>', re.S | re.I)
+SKIP_TAGS_RE = re.compile(r'<(math|gallery|nowiki|pre|score|syntaxhighlight)'
+                          r'[^>]*>.*?</\1>', re.S | re.I)
+TEMPLATE_RE = re.compile(r'\{\{[^{}]*\}\}')
+TABLE_RE = re.compile(r'\{\|.*?\n\|\}', re.S)
+# [[Plik:...]] / [[Kategoria:...]] itp. – usuwane razem z opisem
+NAMESPACED_LINK_RE = re.compile(r'\[\[[^\[\]|:]*:[^\[\]]*\]\]')
+LINK_RE = re.compile(r'\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]')
+ARTICLE_LINK_RE = re.compile(r'\[\[([^\[\]|:]*)(?:\|([^\[\]]*))?\]\]')
+EXTERNAL_LINK_RE = re.compile(r'\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]')
+TAG_RE = re.compile(r'</?[a-zA-Z][^>]*>')
+FORMAT_RE = re.compile(r"'{2,}")
+MAGIC_RE = re.compile(r'__[A-Z]+__')
+HEADING_RE = re.compile(r'^(=+)\s*(.*?)\s*\1\s*$', re.M)
+LIST_PREFIX_RE = re.compile(r'^[*#:;]+\s*', re.M)
+CELL_SEP_RE = re.compile(r'\|\||!!')
+
+
+def _link_text(match):
+    target, label = match.group(1), match.group(2)
+    return label if label is not None else target.split('#', 1)[0]
+
+
+def _table_text(match):
+    """Zostawia tekst komórek tabeli (bez atrybutów i znaczników)."""
+    cells = []
+    for line in match.group(0).split('\n'):
+        line = line.strip()
+        if not line or line.startswith(('{|', '|}', '|-', '|+')):
+            continue
+        if line[0] in '|!':
+            for cell in CELL_SEP_RE.split(line[1:]):
+                # "atrybuty | treść" – atrybuty pomijamy
+                if '|' in cell and '[[' not in cell.split('|', 1)[0]:
+                    cell = cell.split('|', 1)[1]
+                cells.append(cell.strip())
+        else:
+            cells.append(line)
+    return '\n' + '\n'.join(cells) + '\n'
+
+
+def _remove_nested(pattern, text):
+    """Usuwa wzorzec od najgłębszego zagnieżdżenia na zewnątrz."""
+    while True:
+        text, count = pattern.subn('', text)
+        if not count:
+            return text
+
+
+def _replace_links(text):
+    """
+    Zamienia linki na ich tekst, a linki do plików i kategorii usuwa –
+    od najgłębszych, bo opis pliku może zawierać zwykłe linki.
+    """
+    while True:
+        text, articles = ARTICLE_LINK_RE.subn(_link_text, text)
+        text, others = NAMESPACED_LINK_RE.subn('', text)
+        if not articles and not others:
+            return text
+
+
+def strip_wikitext(text):
+    """
+    Zamienia wikitekst na zwykły tekst (nagłówki sekcji zostają
+    w postaci == Tytuł ==, aby dało się podzielić tekst na sekcje).
+
+    :param text: źródło strony w wikitekście
+    :return: tekst bez znaczników
+    """
+    text = COMMENT_RE.sub('', text)
+    text = REF_RE.sub('', text)
+    text = SKIP_TAGS_RE.sub('', text)
+    text = _remove_nested(TEMPLATE_RE, text)
+    text = TABLE_RE.sub(_table_text, text)
+    text = _replace_links(text)
+    text = EXTERNAL_LINK_RE.sub(r'\1', text)
+    text = TAG_RE.sub('', text)
+    text = FORMAT_RE.sub('', text)
+    text = MAGIC_RE.sub('', text)
+    text = LIST_PREFIX_RE.sub('', text)
+    return text
+
+
+def split_sections(text):
+    """
+    Dzieli tekst (po strip_wikitext) na sekcje.
+
+    :return: lista krotek (nagłówek, tekst); wstęp ma nagłówek ''
+    """
+    sections = []
+    heading = ''
+    start = 0
+    for match in HEADING_RE.finditer(text):
+        sections.append((heading, text[start:match.start()].strip()))
+        heading = match.group(2)
+        start = match.end()
+    sections.append((heading, text[start:].strip()))
+    return [(h, body) for h, body in sections if h or body]
+
+
+def wiki_links(text):
+    """
+    Zwraca cele linków wewnętrznych [[...]] z przestrzeni głównej
+    (bez dwukropka), w kolejności wystąpienia.
+    """
+    links = []
+    for match in LINK_RE.finditer(COMMENT_RE.sub('', text)):
+        target = match.group(1).split('#', 1)[0].strip()
+        if target and ':' not in target:
+            links.append(target)
+    return links
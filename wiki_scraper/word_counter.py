@@ -1,43 +1,246 @@
-import json
+import hashlib
 import os
 import re
 from collections import Counter
+from functools import partial
+from concurrent.futures import FIRST_COMPLETED, as_completed, wait
+
+import metrics
+from word_store import JsonStore
+
+# \b[^\W\d_]+\b  - dopasowuje słowa składające się wyłącznie z liter
+WORD_RE = re.compile(r'\b[^\W\d_]+\b')
+
+# Maks. rozmiar fragmentu tekstu tokenizowanego naraz (w znakach)
+CHUNK_SIZE = 1 << 16
+
+
+def split_chunk(chunk, size=CHUNK_SIZE):
+    """
+    Dzieli długi fragment tekstu na kawałki o długości ok. size, tnąc
+    wyłącznie na białych znakach – słowa (i kontekst zamiany na małe
+    litery) nigdy nie są rozcinane, więc tokeny pozostają takie same.
+    """
+    start = 0
+    n = len(chunk)
+    while n - start > size:
+        cut = -1
+        for i in range(start + size, start, -1):
+            if chunk[i].isspace():
+                cut = i
+                break
+        if cut < 0:
+            # Brak odstępu w oknie – tniemy na najbliższym następnym
+            cut = next((i for i in range(start + size, n)
+                        if chunk[i].isspace()), n)
+        yield chunk[start:cut]
+        start = cut
+    if start < n:
+        yield chunk[start:]
+
+
+def hash_chunks(chunks):
+    """
+    Zwraca skrót SHA-1 tekstu ' '.join(chunks) bez sklejania go w pamięci
+    (taki sam jak skrót całego tekstu w WordCounter.update).
+    """
+    digest = hashlib.sha1()
+    first = True
+    for chunk in chunks:
+        if not first:
+            digest.update(b' ')
+        digest.update(chunk.encode('utf-8'))
+        first = False
+    return digest.hexdigest()
+
+
+def count_chunks(chunks):
+    """
+    Zlicza słowa we fragmentach tekstu (tekst to ' '.join(chunks)).
+    Implementacja WordCounter.count_words_in_chunks, dostępna też
+    jako funkcja modułu (np. dla procesów roboczych).
+    """
+    counter = Counter()
+    findall = WORD_RE.findall
+    # Krótkie fragmenty (typowe węzły tekstowe) są grupowane w paczki
+    # do CHUNK_SIZE znaków, żeby nie płacić narzutu wywołań za każdy węzeł
+    batch = []
+    batch_len = 0
+    for chunk in chunks:
+        if len(chunk) > CHUNK_SIZE:
+            for piece in split_chunk(chunk):
+                counter.update(findall(piece.lower()))
+            continue
+        batch.append(chunk)
+        batch_len += len(chunk) + 1
+        if batch_len >= CHUNK_SIZE:
+            counter.update(findall(' '.join(batch).lower()))
+            batch = []
+            batch_len = 0
+    if batch:
+        counter.update(findall(' '.join(batch).lower()))
+    return counter
+
+
+def _count_texts_batch(texts, preprocess=None):
+    """
+    Zlicza słowa w paczce tekstów (w procesie roboczym), opcjonalnie
+    przekształcając najpierw każdy tekst funkcją preprocess.
+    """
+    if preprocess is not None:
+        texts = map(preprocess, texts)
+    return dict(count_chunks(texts))
+
+
+def _count_files_batch(paths):
+    """Zlicza słowa w paczce plików tekstowych (w procesie roboczym)."""
+    counter = Counter()
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            counter.update(count_chunks(f))
+    return dict(counter)
+
+
+def _batches(items, size_of, max_size):
+    """Grupuje elementy w paczki o łącznym rozmiarze ok. max_size."""
+    batch = []
+    batch_size = 0
+    for item in items:
+        batch.append(item)
+        batch_size += size_of(item)
+        if batch_size >= max_size:
+            yield batch
+            batch = []
+            batch_size = 0
+    if batch:
+        yield batch
+
+
+def _map_unordered(worker, batches, workers=None):
+    """
+    Rozdziela paczki między procesy robocze i zwraca ich wyniki
+    w kolejności ukończenia. Liczba paczek w toku jest ograniczona
+    (2 * workers), więc wejście może być dowolnie długim generatorem.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for batch in batches:
+            yield worker(batch)
+        return
+
+    # Import puli procesów (multiprocessing) dopiero, gdy jest potrzebna
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for batch in batches:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(worker, batch))
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def _map_reduce(worker, batches, workers=None):
+    """Jak _map_unordered, ale scala częściowe zliczenia w jeden Counter."""
+    total = Counter()
+    for counts in _map_unordered(worker, batches, workers):
+        total.update(counts)
+    return total
+
+
+def count_texts_parallel(texts, workers=None, batch_chars=1 << 20):
+    """
+    Zlicza słowa w wielu tekstach, rozdzielając je między procesy.
+    Każdy proces zlicza swoją paczkę lokalnie i odsyła tylko słownik
+    częściowych zliczeń, które są tu scalane.
+
+    :param texts: iterowalna kolekcja tekstów
+    :param workers: liczba procesów (domyślnie liczba rdzeni)
+    :param batch_chars: przybliżony rozmiar paczki w znakach
+    :return: obiekt collections.Counter ze słowami
+    """
+    return _map_reduce(_count_texts_batch,
+                       _batches(texts, len, batch_chars), workers)
+
+
+def iter_counts_parallel(texts, workers=None, batch_chars=1 << 20,
+                         preprocess=None):
+    """
+    Jak count_texts_parallel, ale zamiast jednego wyniku zwraca
+    częściowe zliczenia kolejnych paczek (w kolejności ukończenia) –
+    można je dodawać do licznika na bieżąco.
+
+    :param texts: iterowalna kolekcja tekstów
+    :param workers: liczba procesów (domyślnie liczba rdzeni)
+    :param batch_chars: przybliżony rozmiar paczki w znakach
+    :param preprocess: funkcja modułu wywoływana w procesie roboczym
+                       dla każdego tekstu przed zliczeniem (np.
+                       wikitext.strip_wikitext)
+    :return: generator słowników {słowo: liczba}
+    """
+    worker = _count_texts_batch
+    if preprocess is not None:
+        worker = partial(_count_texts_batch, preprocess=preprocess)
+    return _map_unordered(worker, _batches(texts, len, batch_chars), workers)
+
+
+def count_files_parallel(paths, workers=None, batch_bytes=4 << 20):
+    """
+    Jak count_texts_parallel, ale dla plików tekstowych (UTF-8) –
+    pliki czytają procesy robocze, więc tekst nie jest przesyłany
+    między procesami.
+
+    :param paths: ścieżki do plików
+    :param workers: liczba procesów (domyślnie liczba rdzeni)
+    :param batch_bytes: przybliżony rozmiar paczki w bajtach
+    :return: obiekt collections.Counter ze słowami
+    """
+    return _map_reduce(_count_files_batch,
+                       _batches(paths, os.path.getsize, batch_bytes), workers)
 
 
 class WordCounter:
     """
     Zarządza zliczaniem słów w przetwarzanych tekstach.
-    Wyniki przechowywane są w pliku JSON.
+    Wyniki przechowywane są w wymiennym magazynie (domyślnie plik JSON,
+    opcjonalnie SQLite – zob. moduł word_store).
     """
 
-    def __init__(self, json_path='word-counts.json'):
+    def __init__(self, json_path='word-counts.json', store=None,
+                 flush_every=1):
         """
-        Inicjalizuje licznik, ładując istniejące dane z pliku JSON.
+        Inicjalizuje licznik, ładując istniejące dane z magazynu.
 
         :param json_path: ścieżka do pliku JSON z danymi
+                          (gdy nie podano store)
+        :param store: magazyn danych (JsonStore, SqliteStore, ...)
+        :param flush_every: co ile wywołań update zapisywać zmiany;
+                            niezapisane zmiany utrwala flush() lub close()
         """
         self.json_path = json_path
+        self.store = store if store is not None else JsonStore(json_path)
+        self.flush_every = max(1, flush_every)
+        self._pending = {}
+        self._pending_articles = {}
+        self._updates_since_flush = 0
         self.word_counts = self._load()
 
     def _load(self):
-        """
-        Wczytuje słownik z pliku JSON.
-        Jeśli plik nie istnieje lub jest uszkodzony, zwraca pusty słownik.
-        """
-        if os.path.exists(self.json_path):
-            try:
-                with open(self.json_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                # Jeśli plik jest pusty lub uszkodzony, zwróć pusty słownik
-                return {}
-        return {}
+        """Wczytuje słownik zliczeń z magazynu."""
+        return self.store.load()
 
+    @metrics.timed('save')
     def _save(self):
-        """Zapisuje bieżący słownik do pliku JSON."""
-        with open(self.json_path, 'w', encoding='utf-8') as f:
-            json.dump(self.word_counts, f, indent=2, ensure_ascii=False)
+        """Utrwala bieżący stan (i przyrosty) w magazynie."""
+        self.store.save(self.word_counts, self._pending,
+                        self._pending_articles)
+        self._pending = {}
+        self._pending_articles = {}
+        self._updates_since_flush = 0
 
+    @metrics.timed('tokenize')
     def count_words_in_text(self, text):
         """
         Zlicza słowa w podanym tekście.
@@ -47,19 +250,178 @@ class WordCounter:
         :param text: tekst do analizy
         :return: obiekt collections.Counter ze słowami
         """
-        # \b[^\W\d_]+\b  - dopasowuje słowa składające się wyłącznie z liter
-        words = re.findall(r'\b[^\W\d_]+\b', text.lower())
+        words = WORD_RE.findall(text.lower())
         return Counter(words)
 
-    def update(self, text):
+    @metrics.timed('tokenize')
+    def count_words_in_chunks(self, chunks):
+        """
+        Zlicza słowa strumieniowo w kolejnych fragmentach tekstu
+        (np. węzłach tekstowych strony). Wynik jest taki sam jak
+        count_words_in_text(' '.join(chunks)), ale szczytowe zużycie
+        pamięci zależy od rozmiaru fragmentu, a nie całego tekstu.
+
+        :param chunks: iterowalna kolekcja fragmentów tekstu
+        :return: obiekt collections.Counter ze słowami
+        """
+        return count_chunks(chunks)
+
+    def _get_article(self, article):
+        """Zwraca wpis rejestru artykułu (także jeszcze niezapisany)."""
+        if article in self._pending_articles:
+            return self._pending_articles[article]
+        return self.store.get_article(article)
+
+    def article_hash(self, article):
+        """
+        Zwraca skrót treści artykułu z rejestru (None, jeśli artykuł nie
+        był zliczany) – np. żeby proces roboczy mógł pominąć zliczanie
+        niezmienionej strony.
+        """
+        entry = self._get_article(article)
+        return entry[0] if entry is not None else None
+
+    def _apply(self, deltas):
+        """Dodaje przyrosty (także ujemne) do sumarycznych liczników."""
+        for word, delta in deltas.items():
+            if not delta:
+                continue
+            count = self.word_counts.get(word, 0) + delta
+            if count > 0:
+                self.word_counts[word] = count
+            else:
+                self.word_counts.pop(word, None)
+            self._pending[word] = self._pending.get(word, 0) + delta
+
+    def update(self, text, article=None):
         """
         Aktualizuje liczniki słów na podstawie nowego tekstu
-        i zapisuje zmiany do pliku.
+        i (co flush_every wywołań) zapisuje zmiany do magazynu.
+
+        Jeśli podano tytuł artykułu, zliczenia strony są zapamiętywane
+        w rejestrze razem ze skrótem treści: niezmieniona strona jest
+        pomijana bez tokenizacji, a dla zmienionej odejmowany jest jej
+        poprzedni wkład i dodawany nowy.
+
+        :param text: tekst do zliczenia
+        :param article: tytuł artykułu (opcjonalnie)
+        :return: True, jeśli liczniki zostały zmienione
+        """
+        content_hash = None
+        if article is not None:
+            content_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return self._update(lambda: self.count_words_in_text(text),
+                            article, content_hash)
+
+    def update_chunks(self, chunks, article=None, content_hash=None):
+        """
+        Jak update, ale tekst podawany jest strumieniowo we fragmentach
+        (tekst to ' '.join(chunks)) i nigdy nie jest sklejany w całości.
+
+        :param chunks: fragmenty tekstu
+        :param article: tytuł artykułu (opcjonalnie)
+        :param content_hash: gotowy skrót treści (hash_chunks); bez niego
+                             fragmenty są przeglądane dwukrotnie – jeśli
+                             chunks to jednorazowy iterator, zostanie
+                             zamieniony na listę
+        :return: True, jeśli liczniki zostały zmienione
+        """
+        if article is not None and content_hash is None:
+            if iter(chunks) is chunks:
+                chunks = list(chunks)
+            content_hash = hash_chunks(chunks)
+        return self._update(lambda: self.count_words_in_chunks(chunks),
+                            article, content_hash)
+
+    def update_counted(self, counts, article=None, content_hash=None):
+        """
+        Jak update, ale z gotowymi zliczeniami tekstu (np. policzonymi
+        w procesie roboczym – zob. crawler.parse_page).
+
+        :param counts: słownik {słowo: liczba} dla całego tekstu (None
+                       dopuszczalne, gdy content_hash jest równy skrótowi
+                       z rejestru – artykuł jest wtedy pomijany)
+        :param article: tytuł artykułu (opcjonalnie)
+        :param content_hash: skrót treści (hash_chunks) – wymagany
+                             razem z tytułem artykułu
+        :return: True, jeśli liczniki zostały zmienione
+        """
+        return self._update(lambda: counts, article, content_hash)
+
+    def _update(self, count, article, content_hash):
+        """
+        Wspólna logika update/update_chunks.
+
+        :param count: funkcja zwracająca Counter dla tekstu (wywoływana
+                      tylko, gdy tekst trzeba zliczyć)
+        """
+        if article is None:
+            self._apply(count())
+        else:
+            entry = self._get_article(article)
+            if entry is not None and entry[0] == content_hash:
+                metrics.count('articles.unchanged')
+                return False
+            counts = dict(count())
+            deltas = dict(counts)
+            if entry is not None:
+                for word, n in entry[1].items():
+                    deltas[word] = deltas.get(word, 0) - n
+            self._apply(deltas)
+            self._pending_articles[article] = self._ledger_entry(
+                content_hash, counts)
+        self._after_update()
+        return True
+
+    def _ledger_entry(self, content_hash, counts):
+        """Wpis rejestru zapisywany dla zliczonego artykułu."""
+        return content_hash, counts
+
+    def _after_update(self):
+        """Zapisuje zmiany, jeśli minęło flush_every aktualizacji."""
+        self._updates_since_flush += 1
+        if self._updates_since_flush >= self.flush_every:
+            self._save()
+
+    def update_counts(self, counts):
         """
-        counter = self.count_words_in_text(text)
-        for word, count in counter.items():
-            self.word_counts[word] = self.word_counts.get(word, 0) + count
-        self._save()
+        Dodaje gotowe zliczenia (np. scalone z procesów roboczych)
+        jedną aktualizacją liczników.
+
+        :param counts: słownik lub Counter {słowo: liczba}
+        """
+        self._apply(counts)
+        self._after_update()
+
+    def update_many(self, texts, workers=None):
+        """
+        Zlicza wiele tekstów równolegle (count_texts_parallel)
+        i dodaje wynik jedną aktualizacją. Nie korzysta z rejestru
+        artykułów.
+
+        :param texts: iterowalna kolekcja tekstów
+        :param workers: liczba procesów (domyślnie liczba rdzeni)
+        :return: Counter ze zliczeniami dodanymi w tym wywołaniu
+        """
+        counter = count_texts_parallel(texts, workers=workers)
+        self.update_counts(counter)
+        return counter
+
+    def flush(self):
+        """Zapisuje niezapisane zmiany."""
+        if self._updates_since_flush:
+            self._save()
+
+    def close(self):
+        """Zapisuje zmiany i zamyka magazyn."""
+        self.flush()
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def get_counts(self):
         """Zwraca słownik zliczeń słów."""
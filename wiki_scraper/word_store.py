@@ -0,0 +1,379 @@
+"""
+Wymienne magazyny trwałe dla liczników słów (JSON, SQLite lub zwarty
+plik binarny).
+"""
+
+import json
+import os
+import sqlite3
+import sys
+
+from compact_vocab import CompactCounts
+
+
+def atomic_write_json(path, obj, indent=None):
+    """
+    Zapisuje obiekt do pliku JSON atomowo: najpierw do pliku tymczasowego,
+    potem os.replace – przerwany zapis nie psuje istniejącego pliku.
+    """
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_json_counts(path):
+    """
+    Wczytuje słownik zliczeń z pliku JSON.
+    Brak pliku lub pusty plik daje pusty słownik. Uszkodzony plik jest
+    odkładany jako <plik>.corrupt (z ostrzeżeniem), zamiast być po cichu
+    nadpisany przy następnym zapisie.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        backup = path + '.corrupt'
+        os.replace(path, backup)
+        print(f"Uwaga: plik {path} jest uszkodzony,"
+              f" przeniesiono go do {backup}.", file=sys.stderr)
+        return {}
+
+
+class JsonStore:
+    """
+    Magazyn zgodny z dotychczasowym formatem word-counts.json.
+    Każdy zapis serializuje cały słownik, ale robi to atomowo.
+
+    Rejestr artykułów (skrót treści i zliczenia każdej strony) jest
+    dziennikiem JSON lines <nazwa>.articles.jsonl: zapis dopisuje tylko
+    zmienione wpisy i znacznik {"commit": n}, więc jego koszt nie rośnie
+    z liczbą zliczonych stron. Liczniki i rejestr są utrwalane razem:
+    liczniki trafiają najpierw do pliku pośredniego <plik>.<n>.staged,
+    potem dziennik dostaje wpisy ze znacznikiem (moment zatwierdzenia),
+    a na końcu plik pośredni zastępuje plik liczników. Po przerwaniu
+    zapisu load() odrzuca niezatwierdzony koniec dziennika i dokańcza
+    podmianę liczników zatwierdzonej partii.
+    """
+
+    def __init__(self, json_path='word-counts.json'):
+        """:param json_path: ścieżka do pliku JSON z danymi"""
+        self.json_path = json_path
+        root, _ = os.path.splitext(json_path)
+        self.ledger_path = root + '.articles.jsonl'
+        self.legacy_ledger_path = root + '.articles.json'
+        self._ledger = None
+        self._generation = 0
+
+    def load(self):
+        """Zwraca słownik {słowo: liczba} z pliku."""
+        self._load_ledger()
+        return read_json_counts(self.json_path)
+
+    def _load_ledger(self):
+        if self._ledger is None:
+            if (not os.path.exists(self.ledger_path)
+                    and os.path.exists(self.legacy_ledger_path)):
+                self._migrate_ledger()
+            self._ledger, superseded = self._read_ledger()
+            self._recover()
+            if superseded > max(len(self._ledger), 1000):
+                self._write_ledger(self._ledger)
+        return self._ledger
+
+    def _migrate_ledger(self):
+        """Przepisuje rejestr z dawnego pliku JSON do dziennika."""
+        self._write_ledger(read_json_counts(self.legacy_ledger_path))
+        os.remove(self.legacy_ledger_path)
+
+    def _read_ledger(self):
+        """
+        Odtwarza rejestr z dziennika; niezatwierdzony koniec dziennika
+        (przerwany zapis) jest odcinany.
+
+        :return: krotka (rejestr, liczba nadpisanych wpisów)
+        """
+        ledger = {}
+        pending = []
+        superseded = 0
+        committed_end = 0
+        if not os.path.exists(self.ledger_path):
+            return ledger, superseded
+        with open(self.ledger_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if 'commit' in record:
+                    for entry in pending:
+                        if entry['title'] in ledger:
+                            superseded += 1
+                        ledger[entry['title']] = {'hash': entry['hash'],
+                                                  'counts': entry['counts']}
+                    pending = []
+                    self._generation = record['commit']
+                    committed_end = f.tell()
+                else:
+                    pending.append(record)
+            end = f.tell()
+        if end != committed_end:
+            with open(self.ledger_path, 'r+b') as f:
+                f.truncate(committed_end)
+        return ledger, superseded
+
+    def _recover(self):
+        """
+        Dokańcza podmianę liczników ostatniej zatwierdzonej partii
+        i usuwa pliki pośrednie partii niezatwierdzonych.
+        """
+        directory = os.path.dirname(self.json_path) or '.'
+        prefix = os.path.basename(self.json_path) + '.'
+        for name in os.listdir(directory):
+            if not (name.startswith(prefix)
+                    and name.endswith(('.staged', '.staged.tmp'))):
+                continue
+            path = os.path.join(directory, name)
+            if name == f"{prefix}{self._generation}.staged":
+                os.replace(path, self.json_path)
+            else:
+                os.remove(path)
+
+    def _write_ledger(self, ledger):
+        """Zapisuje cały rejestr jako nowy dziennik (atomowo)."""
+        tmp = f"{self.ledger_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for title, entry in ledger.items():
+                f.write(json.dumps({'title': title, 'hash': entry['hash'],
+                                    'counts': entry['counts']},
+                                   ensure_ascii=False) + '\n')
+            f.write(json.dumps({'commit': self._generation}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.ledger_path)
+
+    def get_article(self, title):
+        """
+        Zwraca wpis rejestru dla artykułu.
+
+        :param title: tytuł artykułu
+        :return: krotka (skrót treści, {słowo: liczba}) lub None
+        """
+        entry = self._load_ledger().get(title)
+        if entry is None:
+            return None
+        return entry['hash'], entry['counts']
+
+    def save(self, word_counts, deltas, articles=None):
+        """
+        Utrwala stan liczników; ze zmienionymi wpisami rejestru –
+        razem z nimi (zob. opis klasy).
+
+        :param word_counts: pełny słownik zliczeń
+        :param deltas: przyrosty od ostatniego zapisu (tu nieużywane)
+        :param articles: zmienione wpisy rejestru
+                         {tytuł: (skrót, {słowo: liczba})}
+        """
+        if not articles:
+            self._write_counts(word_counts, self.json_path)
+            return
+        ledger = self._load_ledger()
+        generation = self._generation + 1
+        staged = f"{self.json_path}.{generation}.staged"
+        self._write_counts(word_counts, staged)
+        with open(self.ledger_path, 'a', encoding='utf-8') as f:
+            for title, (content_hash, counts) in articles.items():
+                f.write(json.dumps({'title': title, 'hash': content_hash,
+                                    'counts': counts},
+                                   ensure_ascii=False) + '\n')
+            f.write(json.dumps({'commit': generation}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._generation = generation
+        for title, (content_hash, counts) in articles.items():
+            ledger[title] = {'hash': content_hash, 'counts': counts}
+        os.replace(staged, self.json_path)
+
+    def _write_counts(self, word_counts, path):
+        """Zapisuje liczniki do pliku (atomowo)."""
+        atomic_write_json(path, word_counts, indent=2)
+
+    def close(self):
+        """Nic do zamknięcia."""
+
+
+class SqliteStore:
+    """
+    Magazyn w bazie SQLite. Zapis to wsadowy upsert samych przyrostów
+    w jednej transakcji, więc koszt zależy od liczby zmienionych słów,
+    a nie od rozmiaru całego słownika. Rejestr artykułów jest zapisywany
+    w tej samej transakcji co liczniki.
+    """
+
+    def __init__(self, db_path='word-counts.sqlite',
+                 legacy_json_path='word-counts.json'):
+        """
+        :param db_path: ścieżka do pliku bazy
+        :param legacy_json_path: plik JSON do jednorazowej migracji
+                                 (importowany, jeśli baza jest nowa)
+        """
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS word_counts ('
+                              'word TEXT PRIMARY KEY, '
+                              'count INTEGER NOT NULL) WITHOUT ROWID')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS articles ('
+                              'title TEXT PRIMARY KEY, '
+                              'hash TEXT NOT NULL, '
+                              'counts TEXT NOT NULL) WITHOUT ROWID')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS meta ('
+                              'key TEXT PRIMARY KEY, value TEXT)')
+        self._migrate()
+
+    def _migrate(self):
+        """Jednorazowo importuje dane z pliku JSON do bazy."""
+        done = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+        if done or not self.legacy_json_path:
+            return
+        counts = read_json_counts(self.legacy_json_path)
+        with self.conn:
+            self._upsert(counts)
+            self.conn.execute(
+                "INSERT INTO meta(key, value) VALUES ('migrated_from', ?)",
+                (os.path.abspath(self.legacy_json_path),))
+
+    def _upsert(self, deltas):
+        self.conn.executemany(
+            'INSERT INTO word_counts(word, count) VALUES (?, ?) '
+            'ON CONFLICT(word) DO UPDATE SET count = count + excluded.count',
+            deltas.items())
+        # Słowa, których liczba spadła do zera, znikają ze słownika
+        self.conn.executemany(
+            'DELETE FROM word_counts WHERE word = ? AND count <= 0',
+            ((word,) for word, delta in deltas.items() if delta < 0))
+
+    def load(self):
+        """Zwraca słownik {słowo: liczba} z bazy."""
+        return dict(self.conn.execute('SELECT word, count FROM word_counts'))
+
+    def get_article(self, title):
+        """
+        Zwraca wpis rejestru dla artykułu.
+
+        :param title: tytuł artykułu
+        :return: krotka (skrót treści, {słowo: liczba}) lub None
+        """
+        row = self.conn.execute(
+            'SELECT hash, counts FROM articles WHERE title = ?',
+            (title,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def save(self, word_counts, deltas, articles=None):
+        """
+        Utrwala przyrosty i rejestr artykułów w jednej transakcji (atomowo).
+
+        :param word_counts: pełny słownik zliczeń (tu nieużywany)
+        :param deltas: przyrosty {słowo: liczba} od ostatniego zapisu
+        :param articles: zmienione wpisy rejestru
+                         {tytuł: (skrót, {słowo: liczba})}
+        """
+        with self.conn:
+            self._upsert(deltas)
+            if articles:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO articles(title, hash, counts) '
+                    'VALUES (?, ?, ?)',
+                    ((title, content_hash,
+                      json.dumps(counts, ensure_ascii=False))
+                     for title, (content_hash, counts) in articles.items()))
+
+    def close(self):
+        """Zamyka połączenie z bazą."""
+        self.conn.close()
+
+
+class BinaryStore(JsonStore):
+    """
+    Magazyn w zwartym pliku binarnym (zob. compact_vocab): load() tylko
+    mapuje plik do pamięci, a zliczenia zwracane są jako CompactCounts
+    zamiast słownika. Rejestr artykułów jest dziennikiem jak w JsonStore,
+    w pliku <plik>.articles.jsonl.
+    """
+
+    def __init__(self, bin_path='word-counts.bin',
+                 legacy_json_path='word-counts.json'):
+        """
+        :param bin_path: ścieżka do pliku binarnego
+        :param legacy_json_path: plik JSON do jednorazowej migracji
+                                 (importowany razem z rejestrem artykułów,
+                                 jeśli pliku binarnego brak)
+        """
+        super().__init__(bin_path)
+        self.bin_path = bin_path
+        self.ledger_path = bin_path + '.articles.jsonl'
+        self.legacy_ledger_path = bin_path + '.articles.json'
+        self.legacy_json_path = legacy_json_path
+        self._counts = None
+
+    def load(self):
+        """Zwraca zliczenia jako CompactCounts zmapowany z pliku."""
+        self._load_ledger()
+        if not os.path.exists(self.bin_path) and self.legacy_json_path:
+            legacy = JsonStore(self.legacy_json_path)
+            counts = CompactCounts()
+            counts.update(legacy.load())
+            if legacy._load_ledger():
+                self._ledger = dict(legacy._ledger)
+                self._write_ledger(self._ledger)
+            counts.save(self.bin_path)
+            counts.close()
+        self._counts = CompactCounts(self.bin_path)
+        return self._counts
+
+    def _write_counts(self, word_counts, path):
+        """
+        Zapisuje liczniki do pliku binarnego (atomowo).
+
+        :param word_counts: zliczenia (CompactCounts z load() lub słownik)
+        """
+        if not isinstance(word_counts, CompactCounts):
+            counts = CompactCounts()
+            counts.update(word_counts)
+            word_counts = counts
+        word_counts.save(path)
+        # Plik pośredni jest potem przenoszony na miejsce pliku liczników
+        word_counts.path = self.json_path
+
+    def close(self):
+        """Zwalnia mapowanie pliku."""
+        if self._counts is not None:
+            self._counts.close()
+
+
+def make_store(kind, path=None):
+    """
+    Tworzy magazyn o podanym rodzaju.
+
+    :param kind: 'json', 'sqlite' lub 'binary'
+    :param path: ścieżka do pliku (domyślna zależna od rodzaju)
+    """
+    if kind == 'json':
+        return JsonStore(path or 'word-counts.json')
+    if kind == 'sqlite':
+        return SqliteStore(path or 'word-counts.sqlite')
+    if kind == 'binary':
+        return BinaryStore(path or 'word-counts.bin')
+    raise Exception(f"Nieznany rodzaj magazynu: {kind}")